@@ -30,7 +30,15 @@ def add_subparser_solve(subparsers):
     parser_solve.add_argument(
         '-v', '--verbose',
         action='store_true',
-        help='print detailed solution output (not yet implemented)')
+        help='print a summary of the solution of each period: iterations, '
+             'time taken, final convergence norm and the slowest-converging '
+             'variables')
+    # Add 'static' argument
+    parser_solve.add_argument(
+        '--static',
+        action='store_true',
+        help='run a static (one-step-ahead) simulation, taking lags from the '
+             'input data rather than from the solutions for earlier periods')
     # Add 'input' and 'output' file arguments
     parser_solve.add_argument(
         '-f', '--input',
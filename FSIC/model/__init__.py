@@ -5,9 +5,18 @@ model
 
 FSIC subpackage of code for the solution and analysis of macroeconomic models.
 
-The subpackage contains the following module:
+The subpackage contains the following modules:
 
 * `model`, which defines the `Model` class, a base class for user-defined
   macroeconomic models
+* `scenarios`, to solve multiple scenarios of a model in parallel
+* `diagnostics`, which defines the `Diagnostics` class, to record the
+  solution of a model period by period
+* `stacked`, to solve a model over a span of periods at once, as a single
+  system, for models with leads
+* `jacobian`, to estimate sparse Jacobians of the model equations, with one
+  perturbation per column colour
+* `functions`, of functions for use in model equations (e.g. `max()`), with
+  the same results on scalars and on arrays
 
 """
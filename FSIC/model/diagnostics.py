@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+diagnostics
+===========
+FSIC class to record the progress of a model solution, period by period, for
+inspection and export.
+
+"""
+
+
+import json
+import time
+
+import numpy as np
+from pandas import DataFrame
+
+
+# Clock to time each period: `time.perf_counter()` is only available from
+# Python 3.3
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class Diagnostics:
+    """Record of a model solution, with one entry per period solved.
+
+    Each entry in `self.records` is a Dictionary of the form:
+        'period' : Series index
+            The identifier of the period
+        'iterations' : integer, `None` or list
+            Number of iterations to convergence (`None` if the period failed to
+            converge; one value per scenario for models with multiple
+            scenarios)
+        'norms' : list of floats
+            The convergence norm at each iteration (the largest across
+            scenarios, for models with multiple scenarios)
+        'largest_changes' : list of (string, float) tuples
+            The endogenous variables with the largest absolute changes in the
+            final iteration, in descending order: the variables still moving
+            when the solution stopped, and so the slowest to converge
+        'time' : float
+            Wall-clock time to solve the period, in seconds
+
+    Notes
+    =====
+    Models only record diagnostics when solved with `diagnostics=True` (see
+    FSIC.model.model.Model.solve()), such that an ordinary solution only pays
+    for a check on `None` per iteration.
+
+    For models solved in blocks, the norms of successive blocks are recorded
+    in sequence and the largest changes are taken across all blocks.
+
+    """
+
+    def __init__(self, variables, top=5):
+        """Initialise the record.
+
+        Parameters
+        ==========
+        variables : list of strings
+            Names of the endogenous variables, in the order in which the model
+            stores their values (see `ENDOGENOUS`)
+        top : integer
+            Number of variables to record in 'largest_changes'
+
+        """
+        self.variables = list(variables)
+        self.top = top
+        self.records = []
+        self.current = None
+        self.changes = None
+        self.timer = None
+
+    def start_period(self, period):
+        """Start a new entry, for `period`.
+
+        Parameters
+        ==========
+        period : Series index
+            The identifier of the period about to be solved
+
+        """
+        self.current = {
+            'period': period,
+            'iterations': None,
+            'norms': [],
+            'largest_changes': [],
+            'time': None, }
+        self.changes = None
+        self.timer = clock()
+
+    def record_iteration(self, norm):
+        """Record the convergence norm of the latest iteration.
+
+        Parameters
+        ==========
+        norm : float or NumPy array
+            Convergence norm (one per scenario for models with multiple
+            scenarios)
+
+        """
+        self.current['norms'].append(float(np.max(norm)))
+
+    def record_changes(self, diff):
+        """Record the changes in the endogenous variables over an iteration.
+
+        Parameters
+        ==========
+        diff : NumPy array
+            Changes in the endogenous variables, with one element (row, for
+            models with multiple scenarios) per variable
+
+        """
+        changes = np.abs(diff)
+        if changes.ndim > 1:
+            changes = changes.reshape((len(changes), -1)).max(axis=1)
+        if self.changes is None:
+            self.changes = changes.copy()
+        else:
+            np.maximum(self.changes, changes, out=self.changes)
+
+    def end_period(self, num_iter):
+        """Complete the current entry and add it to `self.records`.
+
+        Parameters
+        ==========
+        num_iter : integer, `None` or NumPy array
+            Number of iterations to convergence, as returned by
+            FSIC.model.model.Model.iterate()
+
+        """
+        elapsed = clock() - self.timer
+        if np.ndim(num_iter):
+            num_iter = [None if np.isnan(n) else int(n) for n in num_iter]
+        elif num_iter is not None:
+            num_iter = int(num_iter)
+        self.current['iterations'] = num_iter
+        self.current['time'] = elapsed
+        if self.changes is not None:
+            order = np.argsort(-self.changes, kind='mergesort')[:self.top]
+            self.current['largest_changes'] = [
+                (self.variables[i], float(self.changes[i])) for i in order]
+        self.records.append(self.current)
+        self.current = None
+
+    def to_frame(self):
+        """Return a summary of the records as a DataFrame, one row per period.
+
+        Returns
+        =======
+        summary : pandas DataFrame
+            Contains, indexed by period:
+                'iterations' : Number of iterations to convergence
+                'time' : Wall-clock time to solve the period, in seconds
+                'final_norm' : Convergence norm at the final iteration
+                'largest_changes' : Comma-separated names of the variables
+                                    with the largest changes in the final
+                                    iteration
+
+        """
+        index = [r['period'] for r in self.records]
+        summary = DataFrame({
+            'iterations': [r['iterations'] for r in self.records],
+            'time': [r['time'] for r in self.records],
+            'final_norm': [r['norms'][-1] if len(r['norms']) else np.nan
+                           for r in self.records],
+            'largest_changes': [', '.join([v for v, c in
+                                           r['largest_changes']])
+                                for r in self.records], },
+            index=index,
+            columns=['iterations', 'time', 'final_norm', 'largest_changes'])
+        return summary
+
+    def to_json(self, path=None):
+        """Return the records as a JSON string, optionally also saving to `path`.
+
+        Parameters
+        ==========
+        path : string or `None`
+            Location of the file to write to (if `None`, just return the string)
+
+        Returns
+        =======
+        records : string
+            JSON representation of `self.records`, with periods as strings
+
+        """
+        records = []
+        for r in self.records:
+            r = dict(r)
+            r['period'] = str(r['period'])
+            r['largest_changes'] = [list(c) for c in r['largest_changes']]
+            records.append(r)
+        records = json.dumps(records, indent=2)
+        if path is not None:
+            with open(path, 'wt') as f:
+                f.write(records)
+        return records
+
+    def to_csv(self, path):
+        """Save the summary from `to_frame()` to `path`, as a CSV file.
+
+        Parameters
+        ==========
+        path : string
+            Location of the file to write to
+
+        """
+        self.to_frame().to_csv(path, index_label='period')
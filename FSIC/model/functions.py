@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+functions
+=========
+Functions for use in model equations, which give the same results on scalars
+(as in the period-by-period solution of a single scenario) and on NumPy arrays
+(as in 'batch' storage mode, with one element per scenario, and in generated
+code that evaluates equations over a span of periods at once).
+
+FSIC.parser.code.translate() maps calls to these functions in model equations
+to this module, which generated model scripts import, such that:
+    PQ = max(Q, PQ[-1])
+becomes:
+    self.PQ[period] = functions.max(self.Q[period], self.PQ[period-1])
+
+Scalars take the faster route through the Python builtins and the `math`
+module, with special cases to match NumPy where the two differ (NaNs,
+overflow and logarithms of non-positive numbers).
+
+Lags, leads and differences (`lag()`, `lead()` and `diff()`) are not
+functions of values and so are expanded into variable references by
+FSIC.parser.code.translate() instead (see FSIC.parser.code.expand()).
+
+"""
+
+
+import builtins
+from functools import reduce
+import math
+
+import numpy as np
+
+
+# Functions available to model equations, by name
+__all__ = ['max', 'min', 'abs', 'exp', 'log', 'where']
+
+# Special values (not `math.nan` and `math.inf`, which need Python 3.5)
+NAN = float('nan')
+INF = float('inf')
+
+
+def arrays(args):
+    """Return `True` if any of `args` is a NumPy array."""
+    for a in args:
+        if isinstance(a, np.ndarray):
+            return True
+    return False
+
+
+def max(*args):
+    """Return the (element-wise) largest of `args`, or NaN if any is NaN."""
+    if arrays(args):
+        return reduce(np.maximum, args)
+    for a in args:
+        if a != a:
+            return NAN
+    return builtins.max(args)
+
+
+def min(*args):
+    """Return the (element-wise) smallest of `args`, or NaN if any is NaN."""
+    if arrays(args):
+        return reduce(np.minimum, args)
+    for a in args:
+        if a != a:
+            return NAN
+    return builtins.min(args)
+
+
+def abs(x):
+    """Return the (element-wise) absolute value of `x`."""
+    return builtins.abs(x)
+
+
+def exp(x):
+    """Return the (element-wise) exponential of `x` (infinite on overflow)."""
+    if isinstance(x, np.ndarray):
+        return np.exp(x)
+    try:
+        return math.exp(x)
+    except OverflowError:
+        return INF
+
+
+def log(x):
+    """Return the (element-wise) natural logarithm of `x`.
+
+    As for NumPy, the logarithm of zero is minus infinity and the logarithm of
+    a negative number is NaN.
+
+    """
+    if isinstance(x, np.ndarray):
+        return np.log(x)
+    if x > 0:
+        return math.log(x)
+    if x == 0:
+        return -INF
+    return NAN
+
+
+def where(condition, x, y):
+    """Return `x` where `condition` is true and `y` elsewhere.
+
+    Parameters
+    ==========
+    condition : boolean or NumPy array of booleans
+        Condition to test (element by element, for arrays)
+    x, y : scalars or NumPy arrays
+        Values to choose between
+
+    Returns
+    =======
+    values : scalar or NumPy array
+        For scalars, as for `x if condition else y` (both `x` and `y` are
+        evaluated); for arrays, as for `numpy.where()`
+
+    """
+    if arrays((condition, x, y)):
+        return np.where(condition, x, y)
+    if condition:
+        return x
+    return y
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+jacobian
+========
+Functions to estimate the Jacobian of a model's equations (the partial
+derivatives of the residuals with respect to the endogenous variables) by
+finite differences, exploiting its sparsity.
+
+Each equation depends on only a few of the endogenous variables, such that
+most of the Jacobian is zero. Columns (endogenous variables) that share no
+rows (equations) can be perturbed at the same time and their derivatives
+still told apart. With the columns grouped by a 'colouring' (see `colour()`),
+an estimate of the whole Jacobian takes one evaluation of the residuals per
+colour, rather than one per endogenous variable: roughly the largest number
+of endogenous variables in any one equation.
+
+"""
+
+
+import numpy as np
+
+from FSIC.settings import dtype
+
+
+def sparsity(model, period=0):
+    """Return the sparsity pattern of the Jacobian of `model`, for one period.
+
+    Parameters
+    ==========
+    model : FSIC.model.model.Model object
+        Model with `EQUATIONS` in translated form e.g.
+            'self.Y[period] = self.C_s[period] + self.G_s[period]'
+    period : integer
+        Position of a period in `model.full_span`, for models that do not
+        define `ENDOGENOUS` (see
+        FSIC.model.model.Model.get_endogenous_variable_names())
+
+    Returns
+    =======
+    rows, columns : NumPy arrays of integers
+        Positions of the (possibly) non-zero elements of the Jacobian: one row
+        per equation, in the order of `EQUATIONS`, and one column per
+        endogenous variable, in the order of `ENDOGENOUS`
+
+    Notes
+    =====
+    The dependencies come from the equation graph (see
+    FSIC.optimise.order.make_graph()): equation `e` depends on its left
+    hand-side variable and the variables with edges into it, counting only
+    the endogenous variables in the current period (lags and leads are fixed
+    within a period). Where more than one equation shares a left hand-side
+    variable, each of those equations takes the dependencies of all of them.
+
+    See also
+    ========
+    FSIC.optimise.order.make_graph()
+
+    """
+    from FSIC.optimise.order import make_graph
+    names = model.get_endogenous_variable_names(period)
+    positions = {'self.%s[period]' % (n): i for i, n in enumerate(names)}
+    G = make_graph(model.EQUATIONS, warn=False)
+    rows = []
+    columns = []
+    for e, equation in enumerate(model.EQUATIONS):
+        lhs = equation.split('=', 1)[0].strip()
+        for node in [lhs] + list(G.predecessors(lhs)):
+            if node in positions:
+                rows.append(e)
+                columns.append(positions[node])
+    return unique(rows, columns, len(names))
+
+
+def unique(rows, columns, size):
+    """Return `rows` and `columns` as arrays, without duplicate pairs."""
+    rows = np.array(rows, dtype=np.int64)
+    columns = np.array(columns, dtype=np.int64)
+    if not len(rows):
+        return rows, columns
+    size = max(size, int(columns.max()) + 1)
+    pairs = np.unique(rows * size + columns)
+    return pairs // size, pairs % size
+
+
+def colour(rows, columns, size=None):
+    """Group the columns of a sparse matrix, with no shared rows in a group.
+
+    Parameters
+    ==========
+    rows, columns : NumPy arrays of integers
+        Positions of the non-zero elements of the matrix
+    size : `None` or integer
+        Number of columns in the matrix (if `None`, one more than the largest
+        column position)
+
+    Returns
+    =======
+    colours : NumPy array of integers
+        Colour (group number, starting from zero) of each column
+
+    Notes
+    =====
+    Greedy colouring: taking the columns in decreasing order of the number of
+    non-zero elements, each column is given the smallest colour not already
+    used by a column that shares a row with it. The number of colours is at
+    least the largest number of non-zero elements in any one row, and usually
+    close to it.
+
+    """
+    if size is None:
+        size = int(columns.max()) + 1 if len(columns) else 0
+    colours = np.full(size, -1, dtype=np.int64)
+    by_row = {}
+    by_column = {}
+    for r, c in zip(rows.tolist(), columns.tolist()):
+        by_row.setdefault(r, []).append(c)
+        by_column.setdefault(c, []).append(r)
+    order = sorted(range(size), key=lambda c: -len(by_column.get(c, [])))
+    for c in order:
+        used = set()
+        for r in by_column.get(c, []):
+            for other in by_row[r]:
+                used.add(colours[other])
+        k = 0
+        while k in used:
+            k += 1
+        colours[c] = k
+    return colours
+
+
+def estimate(model, period, values, residuals, rows, columns, colours,
+             step=1.0e-8, sparse=True):
+    """Return a finite-difference estimate of the Jacobian of `model`.
+
+    Parameters
+    ==========
+    model : FSIC.model.model.Model object
+        Model, which must implement `get_residuals()` and
+        `load_endogenous_variable_values()` (as generated models do)
+    period : integer
+        The position of the period to evaluate in `model.full_span`
+    values : NumPy array
+        Current values of the endogenous variables (as stored by
+        `store_endogenous_variable_values()`)
+    residuals : NumPy array
+        Residuals of the model equations at `values` (as calculated by
+        `get_residuals()`)
+    rows, columns : NumPy arrays of integers
+        Sparsity pattern of the Jacobian (see `sparsity()`)
+    colours : NumPy array of integers
+        Colour of each column (see `colour()`)
+    step : float
+        Relative step size: each endogenous variable is perturbed by `step`
+        times the larger of one and its absolute value
+    sparse : boolean
+        If `True` and SciPy is available, return a `scipy.sparse` matrix;
+        otherwise, a NumPy array
+
+    Returns
+    =======
+    jacobian : SciPy sparse matrix (CSC format) or 2D NumPy array
+        Partial derivatives of the residuals (rows) with respect to the
+        endogenous variables (columns)
+
+    Notes
+    =====
+    This requires one evaluation of the model equations per colour (see
+    `estimate_elements()`). The endogenous variables are reset to `values`
+    on exit.
+
+    """
+    data = estimate_elements(model, period, values, residuals, rows, columns,
+                             colours, step=step)
+    shape = (len(residuals), len(values))
+    if sparse:
+        try:
+            from scipy.sparse import csc_matrix
+        except ImportError:
+            pass
+        else:
+            return csc_matrix((data, (rows, columns)), shape=shape)
+    jacobian = np.zeros(shape, dtype=dtype)
+    jacobian[rows, columns] = data
+    return jacobian
+
+
+def estimate_elements(model, period, values, residuals, rows, columns,
+                      colours, step=1.0e-8, out=None):
+    """Return finite-difference estimates of the non-zero Jacobian elements.
+
+    Parameters
+    ==========
+    model, period, values, residuals, rows, columns, colours, step :
+        As for `estimate()`
+    out : NumPy array or `None`
+        Array to store the estimates in, of the same length as `rows` (if
+        `None`, a new array is allocated)
+
+    Returns
+    =======
+    data : NumPy array
+        Partial derivatives of the residuals with respect to the endogenous
+        variables, one per (`rows`, `columns`) pair
+
+    Notes
+    =====
+    This requires one evaluation of the model equations per colour. The
+    endogenous variables are reset to `values` on exit.
+
+    """
+    sizes = step * np.maximum(np.abs(values), 1.0)
+    shifted = values.copy()
+    perturbed = np.empty_like(residuals)
+    if out is None:
+        out = np.empty(len(rows), dtype=dtype)
+    entries = colours[columns]
+    for k in range(int(colours.max()) + 1 if len(colours) else 0):
+        selected = colours == k
+        shifted[selected] += sizes[selected]
+        model.load_endogenous_variable_values(period, shifted)
+        model.get_residuals(period, perturbed)
+        shifted[selected] = values[selected]
+        selected = entries == k
+        r = rows[selected]
+        out[selected] = ((perturbed[r] - residuals[r]) /
+                         sizes[columns[selected]])
+    model.load_endogenous_variable_values(period, values)
+    return out
@@ -8,16 +8,121 @@ are implemented as derived classes from this one.
 """
 
 
-from pandas import PeriodIndex
+import numpy as np
+from pandas import Period
 from pandas import Series
 
+from FSIC.settings import dtype
+
+
+class SolutionError(ValueError):
+    """Exception raised when the solution of a period fails.
+
+    Attributes
+    ==========
+    period : Series index
+        The period that failed to solve
+    variables : list of strings
+        Names of the endogenous variables that first took non-finite values
+        or, if all are finite, that were changing the most when the solution
+        was stopped
+    scenarios : `None` or NumPy array of booleans
+        For models with multiple scenarios ('batch' storage), the scenarios
+        that failed
+    num_iter : `None` or NumPy array
+        For models with multiple scenarios, the number of iterations to
+        convergence of the scenarios that did converge (NaN elsewhere)
+
+    """
+
+    def __init__(self, message, period=None, variables=None, scenarios=None,
+                 num_iter=None):
+        super().__init__(message)
+        self.period = period
+        if variables is None:
+            variables = []
+        self.variables = variables
+        self.scenarios = scenarios
+        self.num_iter = num_iter
+
 
 class Model:
     """Base class for FSIC models."""
 
+    # Blocks of equations to solve in sequence (see `solve_period()`): if
+    # empty, solve all the model equations together
+    BLOCKS = []
+
+    # Linear simultaneous blocks, to solve directly (see `solve_linear()`):
+    # block method name -> name of the method to set up the linear system
+    LINEAR = {}
+
+    # Sparsity pattern of the Jacobian, as (equation, endogenous variable)
+    # tuples, for models built with an analytic Jacobian (see
+    # `estimate_jacobian()`): if empty, estimate the Jacobian numerically
+    JACOBIAN = []
+
+    # Equations to solve one at a time, for dependency-driven iteration (see
+    # `worklist()`): tuples of (method name, positions of dependent equations)
+    WORKLIST = []
+
+    # Equations solved once, over the whole solution span, after the rest of
+    # the model (see `solve()`)
+    EPILOGUE = []
+
+    # Subexpressions of the equations that only refer to exogenous variables,
+    # calculated over the whole solution span before solving (see `solve()`)
+    PRECOMPUTED = []
+
+    # Equations to solve over a span of periods at once, with fixed lags and
+    # leads, for static simulation (see `solve_static()`)
+    STATIC = []
+
+    # Available solution methods (see `solve_period()`)
+    METHODS = ['gauss-seidel', 'newton', 'anderson', 'broyden', 'worklist',
+               'stacked']
+
+    # Longest lag and lead of any variable in the model equations: the model
+    # can only be solved for periods with at least this many periods before
+    # and after them in `self.full_span`
+    MAX_LAG = 0
+    MAX_LEAD = 0
+
+    # Source chunk identifier of each equation, in solution order, for models
+    # built with profiling counters (see `get_profile()`; equations in
+    # `EPILOGUE` are not instrumented)
+    PROFILE = []
+
     def __init__(self):
         self.initialised = False
         self.solved = False
+        self.buffers = None
+        self.jacobian = None
+        self.inverse_jacobian = None
+        self.history = None
+        self.factorisations = None
+        # Sparsity pattern and column colouring of the Jacobian, and the work
+        # arrays to fill with its elements (see `estimate_jacobian()`)
+        self.sparsity = None
+        self.jacobian_buffers = None
+        # Values of the subexpressions in `PRECOMPUTED`, by period
+        self.precomputed = None
+        # Values of the model variables from before a static solution (see
+        # `solve_static()`)
+        self.frozen = None
+        # Position of the earliest period changed since the last solution
+        # (`None` if unchanged): see `mark_dirty()`
+        self.dirty = None
+        # Record of the last solution, if requested (see `solve()`)
+        self.diagnostics = None
+        # Periods that failed to solve, as `SolutionError` objects (see
+        # `solve()`)
+        self.failures = []
+        # Profiling counters, one row per equation (see `get_profile()`)
+        if len(self.PROFILE):
+            self.profile = np.zeros((len(self.PROFILE), 3), dtype=dtype)
+        else:
+            self.profile = None
 
     def read_data(self, path):
         """Read and store the contents of the file in `path`.
@@ -37,7 +142,7 @@ class Model:
         for frame in data:
             self.update_data(frame)
 
-    def update_data(self, data):
+    def update_data(self, data, scenario=None):
         """Store the contents of `data`.
 
         Parameters
@@ -45,6 +150,9 @@ class Model:
         data : pandas DataFrame
             Data to store; one column per variable, with name matching that of
             the intended model variable
+        scenario : scenario label, list of scenario labels, or `None`
+            For models built with 'batch' storage only, the scenario(s) to
+            store `data` to (all scenarios if `None`)
 
         Returns
         =======
@@ -56,11 +164,38 @@ class Model:
         variables. It is not necessary for all periods in the model to be
         covered by the DataFrame index.
 
+        If the model is initialised, the earliest period in the index of `data`
+        is marked as changed, for `solve(incremental=True)` (see
+        `mark_dirty()`).
+
         See also
         ========
+        mark_dirty()
+
         FSIC.parser.code.translate()
 
         """
+        if self.initialised:
+            positions = self.full_span.get_indexer(data.index)
+            positions = positions[positions >= 0]
+            if len(positions):
+                self.mark_dirty(positions.min())
+        # Batch models: copy directly into the (variables x periods x
+        # scenarios) array of values
+        if getattr(self, 'STORAGE', 'series') == 'batch':
+            variables = self.ENDOGENOUS + self.EXOGENOUS
+            periods = self.full_span.get_indexer(data.index)
+            if scenario is None:
+                scenarios = np.arange(len(self.scenarios))
+            else:
+                if not isinstance(scenario, list):
+                    scenario = [scenario]
+                scenarios = self.scenarios.get_indexer(scenario)
+            for c in data.columns:
+                values = self.values[variables.index(c)]
+                values[np.ix_(periods, scenarios)] = (
+                    data[c].values.reshape((-1, 1)))
+            return
         # Generate a set of statements for execution
         from FSIC.parser.code import translate
         expression = []
@@ -75,7 +210,137 @@ class Model:
         expression = '\n'.join(expression)
         exec(expression)
 
-    def solve(self, start=None, end=None, max_iter=100, min_iter=0, tol=1.0e-8):
+    def set_values(self, name, value, start=None, end=None):
+        """Set the variable `name` to `value` from `start` to `end`.
+
+        Parameters
+        ==========
+        name : string
+            Name of the model variable to set
+        value : float
+            Value to set
+        start : Series index
+            First period to set (the first period of `self.full_span` if
+            `None`)
+        end : Series index
+            Last period to set (the last period of `self.full_span` if `None`)
+
+        Returns
+        =======
+        N/A
+
+        Notes
+        =====
+        As for `update_data()`, `start` is marked as changed, for
+        `solve(incremental=True)`. Changes made directly to the model
+        variables (e.g. `model.G_d.ix['1960':] = 25`) are not tracked: call
+        `mark_dirty()` after any such change.
+
+        """
+        if start is None:
+            start = 0
+        else:
+            start = self.get_position(start)
+        if end is None:
+            end = len(self.full_span) - 1
+        else:
+            end = self.get_position(end)
+        getattr(self, name).iloc[start:end + 1] = value
+        self.mark_dirty(start)
+
+    def mark_dirty(self, period):
+        """Record that the model variables have changed from `period` onwards.
+
+        Parameters
+        ==========
+        period : integer
+            The position in `self.full_span` of the earliest changed period
+
+        Returns
+        =======
+        N/A
+
+        See also
+        ========
+        solve()
+
+        """
+        if self.dirty is None or period < self.dirty:
+            self.dirty = int(period)
+
+    def reset(self, default=0.0):
+        """Reset the model variables to `default`, keeping the current span.
+
+        Parameters
+        ==========
+        default : float
+            Value to reset the model variables to
+
+        Returns
+        =======
+        N/A
+
+        Notes
+        =====
+        Unlike `initialise()`, this function overwrites the existing variables
+        in place, rather than allocating new ones.
+
+        """
+        if not self.initialised:
+            raise ValueError('Model not yet initialised: call `initialise()`')
+        if hasattr(self, 'values'):
+            self.values.fill(default)
+        else:
+            for name in self.ENDOGENOUS + self.EXOGENOUS:
+                getattr(self, name)[:] = default
+        self.iter[:] = default
+        self.solved = False
+        self.dirty = None
+
+    def get_position(self, period):
+        """Return the position of `period` in the model span.
+
+        Parameters
+        ==========
+        period : Series index
+            The identifier of a period in `self.full_span`
+
+        Returns
+        =======
+        position : integer
+            The position of `period` in `self.full_span`
+
+        Notes
+        =====
+        Where `self.full_span` is a contiguous range of periods or integers
+        (e.g. years), the position is the difference from the first period,
+        without a lookup in the index.
+
+        """
+        first = self.full_span[0]
+        last = self.full_span[-1]
+        if isinstance(first, Period):
+            if not isinstance(period, Period):
+                period = Period(period, freq=self.full_span.freq)
+            if (period.freq == first.freq and
+                    last.ordinal - first.ordinal == len(self.full_span) - 1):
+                position = period.ordinal - first.ordinal
+                if 0 <= position < len(self.full_span):
+                    return position
+                raise KeyError(period)
+        elif (isinstance(first, (int, np.integer)) and
+              isinstance(period, (int, np.integer)) and
+              last - first == len(self.full_span) - 1):
+            position = int(period - first)
+            if 0 <= position < len(self.full_span):
+                return position
+            raise KeyError(period)
+        return self.full_span.get_loc(period)
+
+    def solve(self, start=None, end=None, max_iter=100, min_iter=0, tol=1.0e-8,
+              method='gauss-seidel', incremental=False, diagnostics=False,
+              warm_start=None, on_failure=None, patience=5, mode='dynamic',
+              **kwargs):
         """Solve the model.
 
         Parameters
@@ -93,6 +358,95 @@ class Model:
         tol : float
             Tolerance to check convergence, based on the sum of squared
             differences between the endogenous variables between iterations
+        method : string
+            Solution method for each period (see `solve_period()`) or, to
+            solve all the periods at once, as a single system, 'stacked' (see
+            FSIC.model.stacked.solve(), to which any additional keyword
+            arguments are passed, e.g. to set the terminal condition)
+        incremental : boolean
+            If `True` and the model has already been solved, only re-solve
+            from the earliest period changed since (see `mark_dirty()`),
+            keeping the results for the periods before it; if nothing has
+            changed, return without solving. A solution that ends before the
+            last period of the span leaves the periods after `end` to solve
+        diagnostics : boolean
+            If `True`, record the iterations, convergence norms, largest
+            changes and time taken to solve each period, in
+            `self.diagnostics` (see FSIC.model.diagnostics.Diagnostics)
+        warm_start : `None` or string
+            Starting values for the endogenous variables in each period, one
+            of:
+                `None` : the values already in the model (the default)
+                'previous' : the solution for the previous period
+                'extrapolate' : a linear extrapolation of the solutions for
+                                the previous two periods
+            (see `warm_start()`)
+        on_failure : `None` or string
+            What to do if the solution of a period breaks down, with
+            endogenous variables taking non-finite (NaN or infinite) values or
+            with the iterations diverging, one of:
+                `None` : no checks: keep iterating to `max_iter` (the default)
+                'raise' : stop solving and raise a `SolutionError`
+                'skip' : stop solving the period, restore the values of the
+                         endogenous variables from before the attempt and
+                         continue with the next period
+                'mark' : stop solving the period, leaving the values as they
+                         are, and continue with the next period
+            With 'skip' or 'mark', the errors are stored in `self.failures`.
+        patience : integer
+            If `on_failure` is not `None`, the number of consecutive increases
+            in the convergence norm after which the solution is considered to
+            be diverging (see `solve_period()`)
+        mode : string
+            Type of simulation, one of:
+                'dynamic' : each period takes its lags from the solutions for
+                            the periods before it (the default)
+                'static' : each period takes its lags (and leads) from the
+                           values in the model before the solution (e.g.
+                           historical data), such that the periods are
+                           independent of one another (a one-step-ahead
+                           simulation); not available with the 'stacked'
+                           method
+
+        Additional keyword arguments are passed to `solve_period()`.
+
+        Notes
+        =====
+        `start` and `end` are converted to integer positions in
+        `self.full_span` once, before solving: the periods in between are
+        solved by position (see `get_position()`).
+
+        In an incremental solution, the first period to solve is moved back by
+        `MAX_LEAD` periods from the earliest changed period, to account for
+        any leads of the changed values.
+
+        Models with leads can only be solved consistently with the 'stacked'
+        method: period by period, the leads are taken from the values already
+        in the model. The stacked solution stores the same number of
+        iterations for every period and ignores `warm_start` and `on_failure`.
+
+        If the model was built with an epilogue (`EPILOGUE` is not empty),
+        the epilogue equations are left out of the period-by-period solution
+        and solved once all the periods are, over the whole span from `start`
+        to `end` at once, by the generated `solve_epilogue()` method.
+
+        If the model was built with lifted subexpressions (`PRECOMPUTED` is
+        not empty), the generated `precompute()` method evaluates them, from
+        `start` to `end` at once, before the period-by-period solution, which
+        looks them up in `self.precomputed`. The values are discarded once
+        the periods are solved, such that they are never out of date with the
+        exogenous variables (see `solve_period()`).
+
+        In a static simulation, models built with static solution code
+        (`STATIC` is not empty) are solved for all the periods at once by
+        Gauss-Seidel iteration over the whole span (see `solve_static()`),
+        unless `method` is not 'gauss-seidel'. As for the stacked solution,
+        this ignores `warm_start`, `on_failure`, `diagnostics` and any
+        additional keyword arguments. Otherwise, the periods are solved one
+        by one, as for a dynamic simulation, but with the values of each
+        period restored once solved, such that the periods after it still see
+        the values from before the solution. The solutions are only stored
+        once all the periods are solved.
 
         See also
         ========
@@ -102,28 +456,897 @@ class Model:
         # Check for initialisation
         if not self.initialised:
             raise ValueError('Model not yet initialised: call `initialise()`')
+        if method not in self.METHODS:
+            raise ValueError(
+                'Unrecognised solution method \'%s\'' % (method))
+        if warm_start not in (None, 'previous', 'extrapolate'):
+            raise ValueError(
+                'Unrecognised warm-start policy \'%s\'' % (warm_start))
+        if on_failure not in (None, 'raise', 'skip', 'mark'):
+            raise ValueError(
+                'Unrecognised failure policy \'%s\'' % (on_failure))
+        if mode not in ('dynamic', 'static'):
+            raise ValueError(
+                'Unrecognised simulation mode \'%s\'' % (mode))
+        if mode == 'static' and method == 'stacked':
+            raise ValueError(
+                'Static simulation is not available with the stacked method')
         # Set start and end periods
         if start is None:
             start = min(self.span)
         if end is None:
             end = max(self.span)
+        start = self.get_position(start)
+        end = self.get_position(end)
+        if incremental and self.solved:
+            if self.dirty is None:
+                return
+            start = max(start, self.dirty - self.MAX_LEAD)
+        if start < self.MAX_LAG:
+            raise ValueError(
+                'Insufficient periods before the first period to solve: '
+                'model has lags of up to %d period(s)' % (self.MAX_LAG))
+        if end + self.MAX_LEAD >= len(self.full_span):
+            raise ValueError(
+                'Insufficient periods after the last period to solve: '
+                'model has leads of up to %d period(s)' % (self.MAX_LEAD))
+        # Discard any work arrays from a previous solution
+        self.buffers = None
+        self.jacobian_buffers = None
+        self.jacobian = None
+        self.inverse_jacobian = None
+        self.history = None
+        self.factorisations = None
+        # Reset any profiling counters
+        if self.profile is not None:
+            self.profile.fill(0)
+        # Set up diagnostics, if required
+        if diagnostics:
+            from FSIC.model.diagnostics import Diagnostics
+            self.diagnostics = Diagnostics(
+                self.get_endogenous_variable_names(start))
+        else:
+            self.diagnostics = None
+        self.failures = []
         # Solve
-        for period in PeriodIndex(start=start, end=end):
-            self.solve_period(
-                period=period,
-                max_iter=max_iter,
-                min_iter=min_iter,
-                tol=tol)
-        # Update solution state
+        if method == 'stacked':
+            from FSIC.model.stacked import solve as solve_stacked
+            num_iter = solve_stacked(
+                self, start, end, max_iter, min_iter, tol, **kwargs)
+            if num_iter is None:
+                num_iter = np.nan
+            self.iter.iloc[start:end + 1] = num_iter
+        elif (mode == 'static' and len(self.STATIC) and
+              method == 'gauss-seidel'):
+            self.solve_static(start, end, max_iter, min_iter, tol)
+        else:
+            # Discard any precomputed subexpressions afterwards, even if the
+            # solution fails (see `solve_period()`)
+            try:
+                if len(self.PRECOMPUTED):
+                    self.precompute(start, end)
+                if mode == 'static':
+                    # Values before the solution, to restore period by
+                    # period, and the solutions, to store once all the periods
+                    # are solved
+                    shape = np.shape(self.get_buffers(start)[0])
+                    data = np.empty((end - start + 1, ) + shape, dtype=dtype)
+                    solution = np.empty_like(data)
+                    for i, period in enumerate(range(start, end + 1)):
+                        self.store_endogenous_variable_values(period, data[i])
+                for period in range(start, end + 1):
+                    if warm_start is not None:
+                        self.warm_start(period, warm_start)
+                    self.solve_period(
+                        period=period,
+                        max_iter=max_iter,
+                        min_iter=min_iter,
+                        tol=tol,
+                        method=method,
+                        on_failure=on_failure,
+                        patience=patience,
+                        **kwargs)
+                    if mode == 'static':
+                        if len(self.EPILOGUE):
+                            self.solve_epilogue(period, period)
+                        self.store_endogenous_variable_values(
+                            period, solution[period - start])
+                        self.load_endogenous_variable_values(
+                            period, data[period - start])
+                if mode == 'static':
+                    for i, period in enumerate(range(start, end + 1)):
+                        self.load_endogenous_variable_values(
+                            period, solution[i])
+            finally:
+                self.precomputed = None
+        if len(self.EPILOGUE) and mode == 'dynamic':
+            self.solve_epilogue(start, end)
+        # Update solution state: if the solution stopped short of the last
+        # period that can be solved (allowing for leads), the later periods
+        # (which may depend on the periods just solved) still need solving
+        if self.dirty is not None and start <= self.dirty:
+            if (self.dirty <= end and
+                    end >= len(self.full_span) - 1 - self.MAX_LEAD):
+                self.dirty = None
+            else:
+                self.dirty = max(self.dirty, end + 1)
         self.solved = True
 
-    def solve_period(self, period, max_iter=100, min_iter=0, tol=1.0e-8):
+    def solve_static(self, start, end, max_iter=100, min_iter=0, tol=1.0e-8):
+        """Solve the model for all the periods from `start` to `end` at once.
+
+        Parameters
+        ==========
+        start, end : integers
+            The positions of the first and last periods to solve in
+            `self.full_span`
+        max_iter : integer
+            The maximum number of iterations to solve over
+        min_iter : integer
+            The minimum number of iterations to solve over
+        tol : float
+            Tolerance to check convergence, based on the sum of squared
+            differences between the endogenous variables between iterations,
+            for each period
+
+        Returns
+        =======
+        N/A
+
+        Notes
+        =====
+        For models built with static solution code (see
+        FSIC.tools.build.Build.build_static()). The values of all the model
+        variables are first copied to `self.frozen`, for the generated
+        `sweep_static()` method to read the lags and leads from. Each
+        iteration then solves every equation once, for all the periods (and
+        scenarios) at once, with NumPy array operations: Gauss-Seidel
+        iteration, vectorised across time.
+
+        Iteration continues until every period has converged, with the count
+        for each period in `self.iter` being the iteration at which it first
+        met the convergence criterion (NaN if it never did).
+
+        """
+        names = self.ENDOGENOUS
+
+        def endogenous():
+            if hasattr(self, 'values'):
+                return self.values[:len(names), start:end + 1].copy()
+            return np.array([getattr(self, n).values[start:end + 1]
+                             for n in names])
+
+        if hasattr(self, 'values'):
+            self.frozen = self.values.copy()
+        else:
+            self.frozen = np.array([getattr(self, n).values
+                                    for n in names + self.EXOGENOUS])
+        before = endogenous()
+        num_iter = np.full(before.shape[1:], np.nan, dtype=dtype)
+        for i in range(max_iter):
+            self.sweep_static(start, end)
+            after = endogenous()
+            norm = np.sum((after - before) ** 2, axis=0)
+            if (i + 1) >= min_iter:
+                num_iter[(norm < tol) & np.isnan(num_iter)] = i + 1
+                if not np.isnan(num_iter).any():
+                    break
+            before = after
+        self.frozen = None
+        self.iter.iloc[start:end + 1] = num_iter
+
+    def warm_start(self, period, policy='previous'):
+        """Set the endogenous variables in `period` from the preceding periods.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to set in `self.full_span`
+        policy : string
+            One of:
+                'previous' : copy the values from the previous period
+                'extrapolate' : extrapolate linearly from the previous two
+                                periods
+
+        Notes
+        =====
+        With too few preceding periods, 'extrapolate' falls back to
+        'previous', and 'previous' leaves the values unchanged.
+
+        """
+        if period < 1:
+            return
+        values, previous = self.get_buffers(period, 2)
+        self.store_endogenous_variable_values(period - 1, values)
+        if policy == 'extrapolate' and period > 1:
+            self.store_endogenous_variable_values(period - 2, previous)
+            values *= 2
+            values -= previous
+        elif policy not in ('previous', 'extrapolate'):
+            raise ValueError(
+                'Unrecognised warm-start policy \'%s\'' % (policy))
+        self.load_endogenous_variable_values(period, values)
+
+    def solve_period(self, period, max_iter=100, min_iter=0, tol=1.0e-8,
+                     method='gauss-seidel', on_failure=None, patience=5,
+                     **kwargs):
         """Solve for the current period.
 
         Parameters
         ==========
-        period : Series index
-            The identifier of the period to solve
+        period : integer
+            The position of the period to solve in `self.full_span` (see
+            `get_position()`)
+        max_iter : integer
+            The maximum number of iterations to solve over
+        min_iter : integer
+            The minimum number of iterations to solve over
+        tol : float
+            Tolerance to check convergence, based on the sum of squared
+            differences between the endogenous variables between iterations
+        method : string
+            Solution method, one of:
+                'gauss-seidel' : repeatedly solve the model equations in
+                                 sequence until convergence (the default; see
+                                 `iterate()`, to which any additional keyword
+                                 arguments are passed e.g. to relax the
+                                 iterations)
+                'newton' : Newton-Raphson iteration, using a finite-difference
+                           estimate of the Jacobian (see `newton()`, to which
+                           any additional keyword arguments are passed)
+                'anderson' : Anderson-accelerated iteration of the model
+                             equations (see `anderson()`, to which any
+                             additional keyword arguments are passed)
+                'broyden' : Broyden's (quasi-Newton) method, updating an
+                            approximation to the inverse of the Jacobian
+                            carried over from period to period (see
+                            `broyden()`, to which any additional keyword
+                            arguments are passed)
+                'worklist' : Gauss-Seidel iteration that only re-solves the
+                             equations with inputs that changed (see
+                             `worklist()`, to which any additional keyword
+                             arguments are passed)
+        on_failure : `None` or string
+            Failure policy: `None`, 'raise', 'skip' or 'mark' (see `solve()`)
+        patience : integer
+            Number of consecutive increases in the convergence norm (the
+            residuals, for Newton's and Broyden's methods) after which the
+            solution is considered to be diverging (see `iterate()`)
+
+        Notes
+        =====
+        If the model has been partitioned into blocks (`BLOCKS` is not empty),
+        the Gauss-Seidel method solves the blocks in sequence: non-simultaneous
+        blocks just once and simultaneous blocks iteratively, each with its own
+        convergence check. The number of iterations stored in `self.iter` is
+        then the largest number of iterations of any one block. Simultaneous
+        blocks that are linear (those in `LINEAR`) are solved directly, in one
+        step (see `solve_linear()`).
+
+        If `self.diagnostics` is not `None`, the solution of the period is
+        recorded there.
+
+        If the model was built with lifted subexpressions (`PRECOMPUTED` is
+        not empty) and this method is called outside of `solve()`, the
+        subexpressions are evaluated for `period` alone, from the current
+        values of the exogenous variables, and discarded afterwards.
+
+        With a failure policy, the solution stops as soon as the endogenous
+        variables (or, for Newton's and Broyden's methods, the residuals) take
+        non-finite values or the iterations diverge, and any linear-algebra
+        error in the solution is reported as a `SolutionError`. Relaxed
+        Gauss-Seidel iteration is only checked for non-finite values once it
+        returns.
+
+        """
+        if len(self.PRECOMPUTED) and self.precomputed is None:
+            self.precompute(period, period)
+            try:
+                return self.solve_period(
+                    period, max_iter, min_iter, tol, method, on_failure,
+                    patience, **kwargs)
+            finally:
+                self.precomputed = None
+        record = self.diagnostics
+        if record is not None:
+            record.start_period(self.full_span[period])
+        if on_failure is None:
+            num_iter = self.solve_methods(
+                period, max_iter, min_iter, tol, method, **kwargs)
+        else:
+            if on_failure == 'skip':
+                start = np.empty_like(self.get_buffers(period)[0])
+                self.store_endogenous_variable_values(period, start)
+            try:
+                try:
+                    num_iter = self.solve_methods(
+                        period, max_iter, min_iter, tol, method,
+                        patience=patience, **kwargs)
+                except np.linalg.LinAlgError:
+                    values = self.get_buffers(period)[0]
+                    self.store_endogenous_variable_values(period, values)
+                    raise self.get_solution_error(period, values)
+                values = self.get_buffers(period)[0]
+                self.store_endogenous_variable_values(period, values)
+                finite = np.isfinite(values)
+                if not finite.all():
+                    scenarios = None
+                    if values.ndim > 1:
+                        scenarios = ~finite.all(axis=0)
+                        num_iter = np.where(scenarios, np.nan, num_iter)
+                    raise self.get_solution_error(
+                        period, values, scenarios=scenarios, num_iter=num_iter)
+            except SolutionError as e:
+                if on_failure == 'raise':
+                    raise
+                self.failures.append(e)
+                if on_failure == 'skip':
+                    if e.scenarios is None:
+                        self.load_endogenous_variable_values(period, start)
+                    else:
+                        values = self.get_buffers(period)[0]
+                        self.store_endogenous_variable_values(period, values)
+                        values[:, e.scenarios] = start[:, e.scenarios]
+                        self.load_endogenous_variable_values(period, values)
+                num_iter = e.num_iter
+        if np.ndim(num_iter) or self.iter.ndim > 1:
+            self.iter.iloc[period] = num_iter
+        elif num_iter is None:
+            self.iter.iat[period] = np.nan
+        else:
+            self.iter.iat[period] = num_iter
+        if record is not None:
+            record.end_period(num_iter)
+
+    def solve_methods(self, period, max_iter=100, min_iter=0, tol=1.0e-8,
+                      method='gauss-seidel', patience=None, **kwargs):
+        """Solve for the current period by `method`, returning the iterations.
+
+        Parameters
+        ==========
+        As for `solve_period()`.
+
+        Returns
+        =======
+        num_iter : integer or `None`, or NumPy array
+            The number of iterations to convergence, as returned by the method
+
+        """
+        if method == 'newton':
+            num_iter = self.newton(
+                period, max_iter, min_iter, tol, patience=patience, **kwargs)
+        elif method == 'anderson':
+            num_iter = self.anderson(
+                period, max_iter, min_iter, tol, patience=patience, **kwargs)
+        elif method == 'broyden':
+            num_iter = self.broyden(
+                period, max_iter, min_iter, tol, patience=patience, **kwargs)
+        elif method == 'worklist':
+            num_iter = self.worklist(
+                period, max_iter, min_iter, tol, patience=patience, **kwargs)
+        elif method == 'stacked':
+            raise ValueError(
+                'The \'stacked\' method solves all periods at once: call '
+                '`solve()` instead')
+        elif method != 'gauss-seidel':
+            raise ValueError(
+                'Unrecognised solution method \'%s\'' % (method))
+        elif len(self.BLOCKS):
+            num_iter = 1
+            for name, simultaneous, indices in self.BLOCKS:
+                solve_block = getattr(self, name)
+                if simultaneous:
+                    block_iter = None
+                    if name in self.LINEAR:
+                        try:
+                            block_iter = self.solve_linear(
+                                period, name, indices)
+                        except np.linalg.LinAlgError:
+                            pass
+                    if block_iter is None:
+                        block_iter = self.iterate(
+                            solve_block, period, max_iter, min_iter, tol,
+                            patience=patience, **kwargs)
+                    if np.ndim(block_iter):
+                        num_iter = np.maximum(num_iter, block_iter)
+                    elif block_iter is None or num_iter is None:
+                        num_iter = None
+                    else:
+                        num_iter = max(num_iter, block_iter)
+                else:
+                    solve_block(period)
+        else:
+            num_iter = self.iterate(
+                self.solve_equations, period, max_iter, min_iter, tol,
+                patience=patience, **kwargs)
+        return num_iter
+
+    def solve_linear(self, period, name, indices):
+        """Solve the linear block `name` for `period` directly.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to solve in `self.full_span`
+        name : string
+            Name of the block method, a key in `LINEAR`
+        indices : list of integers
+            Positions of the block's endogenous variables in the arrays of
+            `store_endogenous_variable_values()`
+
+        Returns
+        =======
+        num_iter : integer
+            Always 1
+
+        Notes
+        =====
+        The (model-specific) method `LINEAR[name]` sets up the non-zero
+        elements of the coefficient matrix, `A`, and the constants, `b`, of the
+        block for `period`, such that its endogenous variables solve:
+            A x + b = 0
+
+        The inverse of `A` is calculated once and then reused, across periods,
+        for as long as the coefficients stay the same (typically, for all
+        periods, unless a parameter changes). The work arrays and inverse are
+        kept in `self.factorisations`, by block, until the next call to
+        `solve()`.
+
+        For models with multiple scenarios ('batch' storage), the system is
+        solved separately by scenario.
+
+        Raises `numpy.linalg.LinAlgError` if `A` is singular.
+
+        """
+        values = self.get_buffers(period)[0]
+        self.store_endogenous_variable_values(period, values)
+        if self.factorisations is None:
+            self.factorisations = {}
+        if name not in self.factorisations:
+            size = len(indices)
+            shape = values.shape[1:]
+            self.factorisations[name] = {
+                'coefficients': np.empty((size, size) + shape, dtype=dtype),
+                'constants': np.empty((size, ) + shape, dtype=dtype),
+                'factorised': None,
+                'inverse': None, }
+        cache = self.factorisations[name]
+        coefficients = cache['coefficients']
+        constants = cache['constants']
+        coefficients.fill(0)
+        constants.fill(0)
+        getattr(self, self.LINEAR[name])(period, coefficients, constants)
+        # Invert the coefficient matrix only if it has changed
+        if (cache['factorised'] is None or
+                not np.array_equal(coefficients, cache['factorised'])):
+            if values.ndim == 1:
+                cache['inverse'] = np.linalg.inv(coefficients)
+            else:
+                cache['inverse'] = np.linalg.inv(
+                    np.moveaxis(coefficients, -1, 0))
+            cache['factorised'] = coefficients.copy()
+        if values.ndim == 1:
+            solution = -np.dot(cache['inverse'], constants)
+        else:
+            solution = -np.einsum('sij,js->is', cache['inverse'], constants)
+        values[indices] = solution
+        self.load_endogenous_variable_values(period, values)
+        return 1
+
+    def iterate(self, solve, period, max_iter=100, min_iter=0, tol=1.0e-8,
+                relax=1.0, adaptive=False, aitken=False, patience=None):
+        """Call `solve(period)` repeatedly until the model converges.
+
+        Parameters
+        ==========
+        solve : function
+            Function to solve (some or all of) the model equations for a single
+            period, taking the position of the period as its only argument
+        period : integer
+            The position of the period to solve in `self.full_span`
+        max_iter : integer
+            The maximum number of iterations to solve over
+        min_iter : integer
+            The minimum number of iterations to solve over
+        tol : float
+            Tolerance to check convergence, based on the sum of squared
+            differences between the endogenous variables between iterations
+        relax : float
+            Relaxation factor, to weight the update from each iteration: values
+            greater than one over-relax (extrapolate) the update; values
+            between zero and one under-relax (damp) it
+        adaptive : boolean
+            If `True`, halve the relaxation factor whenever the norm of the
+            update increases from one iteration to the next (restarting from
+            `relax` in each call)
+        aitken : boolean
+            If `True`, update the relaxation factor at each iteration by
+            Aitken's delta-squared method, starting from `relax`
+        patience : `None` or integer
+            If not `None`, raise a `SolutionError` as soon as the endogenous
+            variables take non-finite values, or after this many consecutive
+            increases in the convergence norm (only checked without
+            relaxation)
+
+        Returns
+        =======
+        num_iter : integer or `None`, or NumPy array
+            The number of iterations to convergence (`None` if the model failed
+            to converge within `max_iter` iterations)
+            For models with multiple scenarios ('batch' storage), an array of
+            iteration counts, one per scenario (NaN where the scenario failed
+            to converge)
+
+        Notes
+        =====
+        With multiple scenarios, iteration continues until all scenarios have
+        converged, with each scenario's count being the iteration at which it
+        first met the convergence criterion.
+
+        With multiple scenarios and `patience` set, scenarios that fail are
+        dropped from the convergence check, such that iteration stops once the
+        others have converged. The error is then raised for the failed
+        scenarios.
+
+        With the default arguments, each iteration takes the update from
+        `solve()` as is (plain Gauss-Seidel). Otherwise, see
+        `iterate_relaxed()`.
+
+        """
+        if relax != 1.0 or adaptive or aitken:
+            return self.iterate_relaxed(
+                solve, period, max_iter, min_iter, tol,
+                relax=relax, adaptive=adaptive, aitken=aitken)
+        record = self.diagnostics
+        before, after, diff = self.get_buffers(period)
+        self.store_endogenous_variable_values(period, before)
+        # Single scenario
+        if diff.ndim == 1:
+            num_iter = None
+            norm = None
+            increases = 0
+            for i in range(max_iter):
+                # Solve model equations
+                solve(period)
+                self.store_endogenous_variable_values(period, after)
+                # Test for convergence
+                np.subtract(after, before, out=diff)
+                previous_norm = norm
+                norm = np.dot(diff, diff)
+                if record is not None:
+                    record.record_iteration(norm)
+                if norm < tol and (i + 1) >= min_iter:
+                    num_iter = i + 1
+                    break
+                # Test for failure
+                if patience is not None:
+                    if previous_norm is not None and norm > previous_norm:
+                        increases += 1
+                    else:
+                        increases = 0
+                    if not np.isfinite(norm) or increases >= patience:
+                        raise self.get_solution_error(period, after, diff)
+                # Values after this iteration are the starting point for the
+                # next
+                before, after = after, before
+            if record is not None:
+                record.record_changes(diff)
+            return num_iter
+        # Multiple scenarios: track convergence by scenario
+        num_iter = np.empty(diff.shape[1:], dtype=dtype)
+        num_iter.fill(np.nan)
+        failed = np.zeros(diff.shape[1:], dtype=bool)
+        increases = np.zeros(diff.shape[1:], dtype=int)
+        norm = None
+        for i in range(max_iter):
+            solve(period)
+            self.store_endogenous_variable_values(period, after)
+            np.subtract(after, before, out=diff)
+            previous_norm = norm
+            norm = np.einsum('i...,i...->...', diff, diff)
+            if record is not None:
+                record.record_iteration(norm)
+            if (i + 1) >= min_iter:
+                num_iter[(norm < tol) & np.isnan(num_iter)] = i + 1
+            if patience is not None:
+                if previous_norm is not None:
+                    increases = np.where(
+                        norm > previous_norm, increases + 1, 0)
+                failed |= np.isnan(num_iter) & (
+                    ~np.isfinite(norm) | (increases >= patience))
+            unfinished = np.isnan(num_iter) & ~failed
+            if (i + 1) >= min_iter and not unfinished.any():
+                break
+            before, after = after, before
+        if record is not None:
+            record.record_changes(diff)
+        if failed.any():
+            raise self.get_solution_error(
+                period, after, diff, scenarios=failed, num_iter=num_iter)
+        return num_iter
+
+    def worklist(self, period, max_iter=100, min_iter=0, tol=1.0e-8,
+                 threshold=None, patience=None):
+        """Solve for `period` by dependency-driven Gauss-Seidel iteration.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to solve in `self.full_span`
+        max_iter : integer
+            The maximum number of iterations (sweeps) to solve over
+        min_iter : integer
+            The minimum number of iterations to solve over
+        tol : float
+            Tolerance to check convergence, based on the sum of squared
+            differences between the endogenous variables between iterations
+        threshold : `None` or float
+            Absolute change in an equation's left hand-side variable above
+            which the equations that depend on it are queued for re-solution;
+            if `None`, `sqrt(tol / n)` for `n` equations, such that an
+            iteration with no changes above the threshold also meets the
+            Gauss-Seidel convergence check
+        patience : `None` or integer
+            If not `None`, raise a `SolutionError` as soon as the endogenous
+            variables take non-finite values, or after this many consecutive
+            increases in the convergence norm (as for `iterate()`)
+
+        Returns
+        =======
+        num_iter : integer or `None`
+            The number of iterations to convergence (`None` if the model failed
+            to converge within `max_iter` iterations)
+
+        Notes
+        =====
+        This requires a model built with one method per equation, listed in
+        `WORKLIST` with the positions of the equations that depend on each one
+        (see FSIC.tools.build.Build.build_worklist()).
+
+        The first iteration solves every equation, in order. Thereafter, each
+        iteration only solves the equations that are queued, in order: those
+        with an input (a current-period variable on the right hand-side) that
+        changed by more than `threshold` since the equation was last solved.
+        The model has converged once no equations are queued. Near
+        convergence, the work per iteration shrinks to the equations in the
+        loops that are still changing.
+
+        With multiple scenarios ('batch' storage), an equation's dependents
+        are queued if the change in any scenario exceeds `threshold`, and
+        iteration stops once no scenario has queued equations.
+
+        """
+        if not len(self.WORKLIST):
+            raise ValueError(
+                'Worklist solution requires a model built with '
+                '`worklist=True`')
+        if threshold is None:
+            threshold = np.sqrt(tol / len(self.WORKLIST))
+        record = self.diagnostics
+        solvers = [getattr(self, name) for name, dependents in self.WORKLIST]
+        dependents = [d for name, d in self.WORKLIST]
+        before, after, diff = self.get_buffers(period)
+        self.store_endogenous_variable_values(period, before)
+        batch = diff.ndim > 1
+        queued = [True] * len(solvers)
+        num_iter = None
+        norm = None
+        increases = 0
+        for i in range(max_iter):
+            # Solve the queued equations, queueing their dependents in turn
+            for k, solve in enumerate(solvers):
+                if not queued[k]:
+                    continue
+                queued[k] = False
+                change = solve(period)
+                if batch:
+                    change = np.max(change)
+                if change > threshold:
+                    for d in dependents[k]:
+                        queued[d] = True
+            self.store_endogenous_variable_values(period, after)
+            # Test for convergence
+            np.subtract(after, before, out=diff)
+            previous_norm = norm
+            norm = np.dot(diff.ravel(), diff.ravel())
+            if record is not None:
+                record.record_iteration(norm)
+            if not any(queued):
+                if (i + 1) >= min_iter:
+                    num_iter = i + 1
+                    break
+                queued = [True] * len(solvers)
+            # Test for failure
+            if patience is not None and not batch:
+                if previous_norm is not None and norm > previous_norm:
+                    increases += 1
+                else:
+                    increases = 0
+                if not np.isfinite(norm) or increases >= patience:
+                    raise self.get_solution_error(period, after, diff)
+            before, after = after, before
+        if record is not None:
+            record.record_changes(diff)
+        return num_iter
+
+    def get_solution_error(self, period, values, changes=None, scenarios=None,
+                           num_iter=None, top=5, residuals=None):
+        """Return a `SolutionError` describing the failure of `period`.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period that failed in `self.full_span`
+        values : NumPy array
+            Values of the endogenous variables (as stored by
+            `store_endogenous_variable_values()`)
+        changes : `None` or NumPy array
+            Changes in the endogenous variables over the last iteration
+        scenarios : `None` or NumPy array of booleans
+            For models with multiple scenarios, the scenarios that failed
+        num_iter : `None` or NumPy array
+            For models with multiple scenarios, the iteration counts to store
+            with the error
+        top : integer
+            Number of variables to report if all the values are finite
+        residuals : `None` or NumPy array
+            Residuals of the model equations (as calculated by
+            `get_residuals()`): if any are non-finite (with finite values),
+            report the left hand-side variables of those equations
+
+        Returns
+        =======
+        error : `SolutionError`
+
+        """
+        names = np.array(self.get_endogenous_variable_names(period))
+        if values.ndim > 1:
+            values = values[:, scenarios]
+            if changes is not None:
+                changes = changes[:, scenarios]
+        non_finite = ~np.isfinite(values)
+        if values.ndim > 1:
+            non_finite = non_finite.any(axis=1)
+        label = self.full_span[period]
+        if non_finite.any():
+            variables = list(names[non_finite])
+            message = 'Non-finite values in period %s: %s' % (
+                label, ', '.join(variables))
+        elif residuals is not None and not np.isfinite(residuals).all():
+            variables = [
+                self.EQUATIONS[i].split('=', 1)[0].split('[')[0].strip()
+                for i in np.flatnonzero(~np.isfinite(residuals))]
+            variables = [v[len('self.'):] if v.startswith('self.') else v
+                         for v in variables]
+            message = 'Non-finite residuals in period %s: %s' % (
+                label, ', '.join(variables))
+        else:
+            if changes is None:
+                variables = []
+            else:
+                size = np.abs(changes)
+                if size.ndim > 1:
+                    size = size.max(axis=1)
+                variables = list(names[np.argsort(-size, kind='stable')[:top]])
+            if len(variables):
+                message = (
+                    'Solution diverging in period %s: largest changes in %s'
+                    % (label, ', '.join(variables)))
+            else:
+                message = 'Solution failed in period %s' % (label)
+        if scenarios is not None:
+            message = message + ' (%d scenario(s))' % (scenarios.sum())
+        return SolutionError(message, period=label, variables=variables,
+                             scenarios=scenarios, num_iter=num_iter)
+
+    def get_endogenous_variable_names(self, period):
+        """Return the names of the endogenous variables, in storage order.
+
+        Parameters
+        ==========
+        period : integer
+            The position of a period in `self.full_span`, for models that do
+            not define `ENDOGENOUS`
+
+        Returns
+        =======
+        names : list of strings
+
+        """
+        names = getattr(self, 'ENDOGENOUS', None)
+        if names is None:
+            names = self.get_endogenous_variable_values(period).index
+        return [str(n) for n in names]
+
+    def iterate_relaxed(self, solve, period, max_iter=100, min_iter=0,
+                        tol=1.0e-8, relax=1.0, adaptive=False, aitken=False):
+        """Call `solve(period)` repeatedly, relaxing each update.
+
+        Parameters
+        ==========
+        As for `iterate()`.
+
+        Returns
+        =======
+        As for `iterate()`.
+
+        Notes
+        =====
+        At each iteration, with endogenous variable values `x` before and
+        `g(x)` after the call to `solve()`, the relaxed update is:
+            x + w * (g(x) - x)
+        for relaxation factor `w`. Convergence is tested on the unrelaxed
+        difference `g(x) - x`, such that a small `w` cannot give false
+        convergence.
+
+        With Aitken acceleration, `w` is updated after each iteration `k` as
+        follows (Irons and Tuck, 1969):
+            w_{k+1} = -w_k * (d_k . (d_{k+1} - d_k)) / |d_{k+1} - d_k|^2
+        where `d_k` is the unrelaxed difference at iteration `k`. For linear
+        models, this extrapolates to the fixed point along the direction of the
+        iterations.
+
+        For models with multiple scenarios, the relaxation factor is set by
+        scenario.
+
+        This method requires the model to implement
+        `load_endogenous_variable_values()`, as generated models do.
+
+        """
+        record = self.diagnostics
+        before, after, diff, previous = self.get_buffers(period, 4)
+        self.store_endogenous_variable_values(period, before)
+        factor = np.empty(diff.shape[1:], dtype=dtype)
+        factor.fill(relax)
+        num_iter = np.empty(diff.shape[1:], dtype=dtype)
+        num_iter.fill(np.nan)
+        norm = None
+        for i in range(max_iter):
+            solve(period)
+            self.store_endogenous_variable_values(period, after)
+            np.subtract(after, before, out=diff)
+            previous_norm = norm
+            norm = np.einsum('i...,i...->...', diff, diff)
+            if record is not None:
+                record.record_iteration(norm)
+            if (i + 1) >= min_iter:
+                num_iter[(norm < tol) & np.isnan(num_iter)] = i + 1
+                if not np.isnan(num_iter).any():
+                    break
+            # Update the relaxation factor
+            if i > 0:
+                if aitken:
+                    cross = np.einsum('i...,i...->...', previous, diff)
+                    squares = np.einsum('i...,i...->...', previous, previous)
+                    denominator = norm - 2 * cross + squares
+                    update = denominator > 0
+                    factor[update] = (-factor * (cross - squares) /
+                                      np.where(update, denominator, 1))[update]
+                if adaptive:
+                    factor[norm > previous_norm] *= 0.5
+            # Relax the update and store as the starting point for the next
+            # iteration
+            np.multiply(diff, factor, out=after)
+            after += before
+            self.load_endogenous_variable_values(period, after)
+            previous[...] = diff
+            before, after = after, before
+        if record is not None:
+            record.record_changes(diff)
+        if diff.ndim == 1:
+            if np.isnan(num_iter):
+                return None
+            return int(num_iter)
+        return num_iter
+
+    def newton(self, period, max_iter=100, min_iter=0, tol=1.0e-8,
+               reuse_jacobian=False, rate=0.5, step=1.0e-8, patience=None):
+        """Solve for `period` by Newton-Raphson iteration.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to solve in `self.full_span`
         max_iter : integer
             The maximum number of iterations to solve over
         min_iter : integer
@@ -131,19 +1354,500 @@ class Model:
         tol : float
             Tolerance to check convergence, based on the sum of squared
             differences between the endogenous variables between iterations
+        reuse_jacobian : boolean
+            If `True`, keep using the last Jacobian (across iterations and
+            periods) until convergence slows, rather than re-estimating it at
+            every iteration
+        rate : float
+            If `reuse_jacobian` is `True`, re-estimate the Jacobian if an
+            iteration fails to reduce the sum of squared residuals to less than
+            `rate` times its previous value
+        step : float
+            Relative step size for the finite-difference estimate of the
+            Jacobian (see `estimate_jacobian()`)
+        patience : `None` or integer
+            If not `None`, raise a `SolutionError` as soon as the endogenous
+            variables or the residuals take non-finite values, or after this
+            many consecutive increases in the sum of squared residuals
+
+        Returns
+        =======
+        num_iter : integer or `None`
+            The number of iterations to convergence (`None` if the model failed
+            to converge within `max_iter` iterations)
+
+        Notes
+        =====
+        The residuals are the differences between the right and left
+        hand-sides of the model equations, as calculated by the
+        (model-specific) `get_residuals()` method. Each iteration updates the
+        endogenous variables by the solution, `x`, to:
+            J x = -r
+        where `J` is the Jacobian of the residuals, `r`, with respect to the
+        endogenous variables.
 
         """
+        values = self.get_buffers(period)[0]
+        if values.ndim > 1:
+            raise ValueError(
+                'Newton-Raphson method not available for models with '
+                'multiple scenarios')
+        record = self.diagnostics
+        self.store_endogenous_variable_values(period, values)
+        residuals = np.empty(len(self.EQUATIONS), dtype=dtype)
+        self.get_residuals(period, residuals)
+        norm = np.dot(residuals, residuals)
+        num_iter = None
+        increases = 0
+        for i in range(max_iter):
+            if patience is not None and not np.isfinite(norm):
+                raise self.get_solution_error(
+                    period, values, residuals=residuals)
+            if self.jacobian is None or not reuse_jacobian:
+                self.jacobian = self.estimate_jacobian(
+                    period, values, residuals, step=step)
+            # Solve for the change in the endogenous variables: by sparse LU
+            # decomposition if the Jacobian is a SciPy sparse matrix (which
+            # raises a `RuntimeError` if singular)
+            jacobian = self.jacobian
+            try:
+                if jacobian.shape[0] != jacobian.shape[1]:
+                    raise np.linalg.LinAlgError
+                if isinstance(jacobian, np.ndarray):
+                    change = np.linalg.solve(jacobian, -residuals)
+                else:
+                    from scipy.sparse.linalg import splu
+                    change = splu(jacobian.tocsc()).solve(-residuals)
+            except (np.linalg.LinAlgError, RuntimeError):
+                if not isinstance(jacobian, np.ndarray):
+                    jacobian = jacobian.toarray()
+                change = np.linalg.lstsq(jacobian, -residuals)[0]
+            values += change
+            self.load_endogenous_variable_values(period, values)
+            self.get_residuals(period, residuals)
+            # Test for convergence
+            step_norm = np.dot(change, change)
+            if record is not None:
+                record.record_iteration(step_norm)
+            if step_norm < tol and (i + 1) >= min_iter:
+                num_iter = i + 1
+                break
+            previous_norm = norm
+            norm = np.dot(residuals, residuals)
+            # Test for failure
+            if patience is not None:
+                if norm > previous_norm:
+                    increases += 1
+                else:
+                    increases = 0
+                if (not np.isfinite(step_norm) or not np.isfinite(norm) or
+                        increases >= patience):
+                    raise self.get_solution_error(
+                        period, values, change, residuals=residuals)
+            # Flag the Jacobian for re-estimation if convergence has slowed
+            if norm > rate * previous_norm:
+                self.jacobian = None
+        if record is not None and max_iter > 0:
+            record.record_changes(change)
+        return num_iter
+
+    def broyden(self, period, max_iter=100, min_iter=0, tol=1.0e-8, rate=0.9,
+                step=1.0e-8, patience=None):
+        """Solve for `period` by Broyden's method.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to solve in `self.full_span`
+        max_iter : integer
+            The maximum number of iterations to solve over
+        min_iter : integer
+            The minimum number of iterations to solve over
+        tol : float
+            Tolerance to check convergence, based on the sum of squared
+            differences between the endogenous variables between iterations
+        rate : float
+            Re-estimate the Jacobian if an iteration fails to reduce the sum of
+            squared residuals to less than `rate` times its previous value
+        step : float
+            Relative step size for the finite-difference estimate of the
+            Jacobian (see `estimate_jacobian()`)
+        patience : `None` or integer
+            If not `None`, raise a `SolutionError` as soon as the endogenous
+            variables or the residuals take non-finite values, or after this
+            many consecutive increases in the sum of squared residuals
+
+        Returns
+        =======
+        num_iter : integer or `None`
+            The number of iterations to convergence (`None` if the model failed
+            to converge within `max_iter` iterations)
+
+        Notes
+        =====
+        As for `newton()`, each iteration updates the endogenous variables by
+        `x = -H r`, where `r` are the residuals and `H` approximates the
+        inverse of the Jacobian. Rather than re-estimate the Jacobian, `H` is
+        updated after each iteration by the (rank-one) Sherman-Morrison form
+        of Broyden's 'good' update:
+            H += (x - H dr) (x' H) / (x' H dr)
+        where `dr` is the change in the residuals over the iteration.
+
+        `H` is kept in `self.inverse_jacobian` from one period to the next, as
+        the starting approximation. It is only estimated by finite differences
+        (see `estimate_jacobian()`) on the first period of a solution and
+        whenever progress stalls, as set by `rate`.
+
+        """
+        values, change = self.get_buffers(period, 2)
+        if values.ndim > 1:
+            raise ValueError(
+                "Broyden's method not available for models with multiple "
+                'scenarios')
+        record = self.diagnostics
+        self.store_endogenous_variable_values(period, values)
+        residuals = np.empty(len(self.EQUATIONS), dtype=dtype)
+        self.get_residuals(period, residuals)
+        previous_residuals = np.empty_like(residuals)
+        norm = np.dot(residuals, residuals)
+        num_iter = None
+        increases = 0
+        for i in range(max_iter):
+            if patience is not None and not np.isfinite(norm):
+                raise self.get_solution_error(
+                    period, values, residuals=residuals)
+            if self.inverse_jacobian is None:
+                self.inverse_jacobian = np.linalg.pinv(self.estimate_jacobian(
+                    period, values, residuals, step=step, sparse=False))
+            # Solve for the change in the endogenous variables
+            np.dot(self.inverse_jacobian, -residuals, out=change)
+            values += change
+            self.load_endogenous_variable_values(period, values)
+            previous_residuals[:] = residuals
+            self.get_residuals(period, residuals)
+            # Test for convergence
+            step_norm = np.dot(change, change)
+            if record is not None:
+                record.record_iteration(step_norm)
+            if step_norm < tol and (i + 1) >= min_iter:
+                num_iter = i + 1
+                break
+            previous_norm = norm
+            norm = np.dot(residuals, residuals)
+            # Test for failure
+            if patience is not None:
+                if norm > previous_norm:
+                    increases += 1
+                else:
+                    increases = 0
+                if (not np.isfinite(step_norm) or not np.isfinite(norm) or
+                        increases >= patience):
+                    raise self.get_solution_error(
+                        period, values, change, residuals=residuals)
+            # Update the approximation to the inverse of the Jacobian or, if
+            # convergence has slowed, flag it for re-estimation
+            if norm > rate * previous_norm:
+                self.inverse_jacobian = None
+                continue
+            np.subtract(residuals, previous_residuals, out=previous_residuals)
+            projected = np.dot(self.inverse_jacobian, previous_residuals)
+            denominator = np.dot(change, projected)
+            if denominator == 0 or not np.isfinite(denominator):
+                self.inverse_jacobian = None
+                continue
+            self.inverse_jacobian += np.outer(
+                (change - projected) / denominator,
+                np.dot(change, self.inverse_jacobian))
+        if record is not None and max_iter > 0:
+            record.record_changes(change)
+        return num_iter
+
+    def anderson(self, period, max_iter=100, min_iter=0, tol=1.0e-8, depth=5,
+                 patience=None):
+        """Solve for `period` by Anderson-accelerated iteration.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to solve in `self.full_span`
+        max_iter : integer
+            The maximum number of iterations to solve over
+        min_iter : integer
+            The minimum number of iterations to solve over
+        tol : float
+            Tolerance to check convergence, based on the sum of squared
+            differences between the endogenous variables between iterations
+        depth : integer
+            The number of previous iterations to mix into each update
+        patience : `None` or integer
+            If not `None`, raise a `SolutionError` as soon as the endogenous
+            variables take non-finite values, or after this many consecutive
+            increases in the convergence norm (as for `iterate()`)
+
+        Returns
+        =======
+        num_iter : integer or `None`
+            The number of iterations to convergence (`None` if the model failed
+            to converge within `max_iter` iterations)
+
+        Notes
+        =====
+        Each iteration solves the model equations once, as for Gauss-Seidel,
+        mapping the endogenous variable values `x` to `g(x)`, with update
+        `f = g(x) - x`. Rather than continue from `g(x)`, the next iteration
+        starts from:
+            g(x) - dG y
+        where the columns of `dG` and `dF` are the changes in `g(x)` and `f`
+        over (up to) the last `depth` iterations, and `y` is the least-squares
+        solution to:
+            dF y = f
+        (Walker and Ni, 2011). No Jacobian is required. With `depth` set to
+        zero, this reduces to Gauss-Seidel.
+
+        The history arrays are allocated on the first call after `solve()` and
+        then reused. The history itself starts afresh in each period.
+
+        """
+        values, updated, update, previous_updated, previous_update = (
+            self.get_buffers(period, 5))
+        if values.ndim > 1:
+            raise ValueError(
+                'Anderson acceleration not available for models with '
+                'multiple scenarios')
+        if self.history is None or self.history[0].shape[1] != depth:
+            self.history = tuple(np.empty((len(values), depth), dtype=dtype)
+                                 for i in range(2))
+        delta_updated, delta_update = self.history
+        record = self.diagnostics
+        self.store_endogenous_variable_values(period, values)
+        num_iter = None
+        columns = 0
+        norm = None
+        increases = 0
         for i in range(max_iter):
             # Solve model equations
-            before = self.get_endogenous_variable_values(period)
             self.solve_equations(period)
-            after = self.get_endogenous_variable_values(period)
+            self.store_endogenous_variable_values(period, updated)
             # Test for convergence
-            diff = (after - before).apply(lambda x: x * x)
-            diff = diff.sum()
-            if diff < tol and (i + 1) >= min_iter:
+            np.subtract(updated, values, out=update)
+            previous_norm = norm
+            norm = np.dot(update, update)
+            if record is not None:
+                record.record_iteration(norm)
+            if norm < tol and (i + 1) >= min_iter:
                 num_iter = i + 1
                 break
+            # Test for failure
+            if patience is not None:
+                if previous_norm is not None and norm > previous_norm:
+                    increases += 1
+                else:
+                    increases = 0
+                if not np.isfinite(norm) or increases >= patience:
+                    raise self.get_solution_error(period, updated, update)
+            # Add the changes from the last iteration to the history,
+            # overwriting the oldest
+            if i > 0 and depth > 0:
+                column = (i - 1) % depth
+                np.subtract(update, previous_update,
+                            out=delta_update[:, column])
+                np.subtract(updated, previous_updated,
+                            out=delta_updated[:, column])
+                columns = min(columns + 1, depth)
+            previous_update[:] = update
+            previous_updated[:] = updated
+            # Mix the history into the starting point for the next iteration
+            values[:] = updated
+            if columns:
+                weights = np.linalg.lstsq(
+                    delta_update[:, :columns], update, rcond=None)[0]
+                values -= np.dot(delta_updated[:, :columns], weights)
+                self.load_endogenous_variable_values(period, values)
+        if record is not None and max_iter > 0:
+            record.record_changes(update)
+        return num_iter
+
+    def estimate_jacobian(self, period, values, residuals, step=1.0e-8,
+                          sparse=True):
+        """Return the Jacobian for `period`, analytic or estimated.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to evaluate in `self.full_span`
+        values : NumPy array
+            Current values of the endogenous variables (as stored by
+            `store_endogenous_variable_values()`)
+        residuals : NumPy array
+            Residuals of the model equations at `values` (as calculated by
+            `get_residuals()`)
+        step : float
+            Relative step size: each endogenous variable is perturbed by `step`
+            times the larger of one and its absolute value (not used with an
+            analytic Jacobian)
+        sparse : boolean
+            If `True` and SciPy is available, return a `scipy.sparse` matrix;
+            otherwise, a NumPy array
+
+        Returns
+        =======
+        jacobian : SciPy sparse matrix (CSR format) or 2D NumPy array
+            Partial derivatives of the residuals (rows) with respect to the
+            endogenous variables (columns)
+
+        Notes
+        =====
+        If the model was built with an analytic Jacobian (`JACOBIAN`, filled
+        by the generated `get_jacobian()` method), this evaluates it directly,
+        with no further evaluations of the model equations.
+
+        Otherwise, endogenous variables that appear in no equation together are
+        perturbed at the same time, such that this requires one evaluation of
+        the model equations per colour of the Jacobian's columns, rather than
+        one per endogenous variable (see FSIC.model.jacobian). The sparsity
+        pattern and colouring are found on first use and stored in
+        `self.sparsity`. Without NetworkX (to find the sparsity pattern), each
+        endogenous variable is perturbed in turn.
+
+        The elements of the Jacobian are filled into work arrays (the non-zero
+        elements and, if returning a NumPy array, the full matrix) that are
+        allocated on the first call after `solve()` and then reused, as for
+        `get_buffers()`. A returned NumPy array is therefore overwritten by
+        the next call.
+
+        The endogenous variables are reset to `values` on exit.
+
+        """
+        from FSIC.model.jacobian import colour, estimate_elements, sparsity
+        if self.sparsity is None:
+            if len(self.JACOBIAN):
+                rows, columns = np.array(self.JACOBIAN, dtype=np.int64).T
+                self.sparsity = (rows, columns, None)
+            else:
+                try:
+                    rows, columns = sparsity(self, period)
+                except ImportError:
+                    rows, columns = np.indices(
+                        (len(residuals), len(values))).reshape(2, -1)
+                self.sparsity = (rows, columns,
+                                 colour(rows, columns, len(values)))
+        rows, columns, colours = self.sparsity
+        shape = (len(residuals), len(values))
+        if self.jacobian_buffers is None:
+            self.jacobian_buffers = (np.empty(len(rows), dtype=dtype),
+                                     np.empty(shape, dtype=dtype))
+        data, jacobian = self.jacobian_buffers
+        if len(self.JACOBIAN):
+            self.get_jacobian(period, data)
         else:
-            num_iter = None
-        self.iter[period] = num_iter
+            estimate_elements(self, period, values, residuals, rows,
+                              columns, colours, step=step, out=data)
+        if sparse:
+            try:
+                from scipy.sparse import csr_matrix
+            except ImportError:
+                pass
+            else:
+                return csr_matrix((data, (rows, columns)), shape=shape)
+        jacobian.fill(0)
+        jacobian[rows, columns] = data
+        return jacobian
+
+    def get_profile(self, by_chunk=False):
+        """Return the profiling counters from the last solution.
+
+        Parameters
+        ==========
+        by_chunk : boolean
+            If `True`, sum the counters by source chunk
+
+        Returns
+        =======
+        profile : pandas DataFrame
+            One row per equation (in solution order) or, if `by_chunk` is
+            `True`, per source chunk identifier, with columns:
+                'chunk' : Source chunk identifier (by equation only)
+                'equation' : The equation (by equation only)
+                'evaluations' : Number of times the equation was evaluated
+                'time' : Total time spent evaluating the equation, in seconds
+                'change' : Sum of the absolute changes in the left hand-side
+                           variable from evaluating the equation
+
+        Notes
+        =====
+        The counters are only available for models built with profiling
+        (see FSIC.tools.build.Build.build()), and are reset at the start of
+        each call to `solve()`.
+
+        The counters cover the period-by-period solution, including the
+        per-equation methods of the 'worklist' method. Epilogue equations
+        (those in `EPILOGUE`), which are solved over the whole span at once,
+        are not instrumented and always show zero evaluations.
+
+        """
+        if self.profile is None:
+            raise ValueError(
+                'Model not built with profiling counters: '
+                'rebuild with `profile=True`')
+        from pandas import DataFrame
+        profile = DataFrame({
+            'chunk': self.PROFILE,
+            'equation': self.EQUATIONS,
+            'evaluations': self.profile[:, 0].astype(int),
+            'time': self.profile[:, 1],
+            'change': self.profile[:, 2], },
+            columns=['chunk', 'equation', 'evaluations', 'time', 'change'])
+        if by_chunk:
+            profile = profile.groupby('chunk', sort=False)[
+                ['evaluations', 'time', 'change']].sum()
+        return profile
+
+    def get_buffers(self, period, number=3):
+        """Return work arrays to store endogenous variable values.
+
+        Parameters
+        ==========
+        period : integer
+            The position of a period in `self.full_span`
+        number : integer
+            Number of arrays to return
+
+        Returns
+        =======
+        buffers : tuple of NumPy arrays
+            Arrays of length equal to the number of endogenous variables: by
+            default, three, to store the values before and after an iteration,
+            and the difference between the two
+
+        Notes
+        =====
+        The arrays are allocated on the first call after `solve()` (or the
+        first call to request more arrays than already allocated) and then
+        reused, to avoid allocating new objects on every iteration.
+
+        """
+        if self.buffers is None or len(self.buffers) < number:
+            shape = np.shape(self.get_endogenous_variable_values(period))
+            self.buffers = tuple(np.empty(shape, dtype=dtype)
+                                 for i in range(max(number, 3)))
+        return self.buffers[:number]
+
+    def store_endogenous_variable_values(self, period, out):
+        """Copy the current values of the endogenous variables into `out`.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to copy values from
+        out : NumPy array
+            Array to store the values in, with one element per endogenous
+            variable
+
+        Notes
+        =====
+        This default implementation calls `get_endogenous_variable_values()`.
+        Generated models override this method to copy the values directly,
+        without forming an intermediate Series.
+
+        """
+        out[:] = self.get_endogenous_variable_values(period).values
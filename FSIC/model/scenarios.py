@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+scenarios
+=========
+FSIC module to solve multiple scenarios of a model in parallel, distributing
+the scenarios across a pool of worker processes.
+
+"""
+
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# Model instance of each worker process, reused from one scenario to the next
+worker_cache = {}
+
+
+def run(model, scenarios, span, past=None, default=0.0,
+        max_workers=None, **kwargs):
+    """Solve each of `scenarios` with `model`, yielding results as they finish.
+
+    Parameters
+    ==========
+    model : Model class
+        Generated model class to solve (must be importable from a module, for
+        the worker processes to use it)
+    scenarios : Dictionary or iterable of (label, definition) pairs
+        Scenario definitions, keyed by scenario label (see `configure()` for
+        the form of each definition)
+    span : pandas PeriodIndex object
+        Principal span of the model (see the model's `initialise()` method)
+    past : pandas PeriodIndex object or `None`
+        Preceding span of the model (see the model's `initialise()` method)
+    default : float
+        Value to initialise the model variables with before applying each
+        scenario definition
+    max_workers : integer or `None`
+        Maximum number of worker processes (if `None`, the number of
+        processors on the machine)
+
+    Additional keyword arguments are passed to the model's `solve()` method.
+
+    Returns
+    =======
+    results : generator
+        Yields, in order of completion, one tuple per scenario:
+            (label, results, error)
+        where `results` is the DataFrame returned by the model's
+        `get_results()` method (`None` if the scenario failed) and `error` is
+        the exception raised by the scenario (`None` if the scenario was
+        solved successfully)
+
+    Notes
+    =====
+    Each worker process creates and initialises its own instance of `model`
+    once, on its first scenario (see `initialise_worker()`), and then resets
+    and reuses that instance for each of its later scenarios (see `solve()`).
+    The set-up is not run as the worker starts, such that an error in it
+    fails only the scenario that triggered it, rather than the whole pool.
+
+    Example
+    =======
+    >>> from FSIC.model.scenarios import run
+    >>> from sim import SIM
+    >>> scenarios = {
+    ...     'base': {'define': {'G_d': 20, 'W': 1}},
+    ...     'high': {'define': {'G_d': 25, 'W': 1}},
+    ...     }
+    >>> for label, results, error in run(SIM, scenarios, span):
+    ...     ...
+
+    """
+    if isinstance(scenarios, dict):
+        scenarios = scenarios.items()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for label, definition in scenarios:
+            f = executor.submit(
+                solve, model, definition, span, past, default, kwargs)
+            futures[f] = label
+        for f in as_completed(futures):
+            error = f.exception()
+            if error is None:
+                yield futures[f], f.result(), None
+            else:
+                yield futures[f], None, error
+
+
+def initialise_worker(model, span, past=None, default=0.0):
+    """Create and initialise the model instance of a worker process.
+
+    Parameters
+    ==========
+    model : Model class
+        Generated model class to solve
+    span : pandas PeriodIndex object
+        Principal span of the model
+    past : pandas PeriodIndex object or `None`
+        Preceding span of the model
+    default : float
+        Value to initialise the model variables with
+
+    Returns
+    =======
+    N/A
+
+    Notes
+    =====
+    This is the function called by `solve()` on the first scenario of each
+    worker process in `run()`. The model instance is stored in
+    `worker_cache`, for `solve()` to reuse.
+
+    """
+    instance = model()
+    instance.initialise(span=span, past=past, default=default)
+    worker_cache[get_key(model, span, past)] = instance
+
+
+def get_key(model, span, past=None):
+    """Return the key to `worker_cache` for `model`, `span` and `past`."""
+    return (model.__module__, model.__name__, tuple(span),
+            None if past is None else tuple(past))
+
+
+def solve(model, definition, span, past=None, default=0.0, kwargs=None):
+    """Solve a single scenario and return the results.
+
+    Parameters
+    ==========
+    model : Model class
+        Generated model class to solve
+    definition : Dictionary
+        Scenario definition (see `configure()`)
+    span : pandas PeriodIndex object
+        Principal span of the model
+    past : pandas PeriodIndex object or `None`
+        Preceding span of the model
+    default : float
+        Value to initialise the model variables with
+    kwargs : Dictionary or `None`
+        Keyword arguments for the model's `solve()` method
+
+    Returns
+    =======
+    results : pandas DataFrame
+        Model results, from the model's `get_results()` method
+
+    Notes
+    =====
+    This is the function called by the worker processes in `run()`. The model
+    instance is cached in `worker_cache`, by model class, span and past (see
+    `initialise_worker()`): if there is a cached instance, it is reset (see
+    FSIC.model.model.Model.reset()) rather than re-created and
+    re-initialised. Otherwise, the instance is created here and cached for
+    the next call.
+
+    """
+    key = get_key(model, span, past)
+    if key in worker_cache:
+        instance = worker_cache[key]
+        instance.reset(default=default)
+    else:
+        initialise_worker(model, span, past, default)
+        instance = worker_cache[key]
+    configure(instance, definition)
+    if kwargs is None:
+        kwargs = {}
+    instance.solve(**kwargs)
+    return instance.get_results()
+
+
+def configure(model, definition):
+    """Apply the scenario `definition` to `model`.
+
+    Parameters
+    ==========
+    model : Model object
+        Initialised model instance
+    definition : Dictionary
+        Scenario definition, containing any of:
+            'data' : pandas DataFrame or list of DataFrames
+                Data to store (see FSIC.model.model.Model.update_data())
+            'define' : Dictionary or list of strings
+                Time-invariant parameters to set, either as a Dictionary of
+                values keyed by parameter name or as a list of strings of the
+                form 'W=1' (as for the `--define` command-line argument)
+            'set' : list of strings
+                Expressions to set time-varying model variables, of the form
+                'G_d[1960] = 25' (as for the `--set` command-line argument)
+        These are applied in the order above.
+
+    Returns
+    =======
+    N/A
+
+    """
+    # Data
+    data = definition.get('data', [])
+    if not isinstance(data, list):
+        data = [data]
+    for frame in data:
+        model.update_data(frame)
+    # Parameters
+    parameters = definition.get('define', {})
+    if not isinstance(parameters, dict):
+        parameters = dict(parse_definition(d) for d in parameters)
+    for p, v in parameters.items():
+        getattr(model, p).ix[:] = float(v)
+    # Expressions
+    expressions = []
+    for x in definition.get('set', []):
+        expressions.append('model.' + x.replace('[', '.ix['))
+    exec('\n'.join(expressions))
+
+
+def parse_definition(definition):
+    """Split `definition` into a parameter name and value.
+
+    Parameters
+    ==========
+    definition : string
+        Parameter definition of the form 'W=1'
+
+    Returns
+    =======
+    parameter : string
+        Parameter name
+    value : float
+        Parameter value
+
+    """
+    d = definition.split('=')
+    if len(d) != 2:
+        raise ValueError(
+            'Error in parameter definition: \'%s\'; '
+            'must be a parameter name and value '
+            'separated by an equals sign e.g. W=1' % (definition))
+    p, v = d
+    return p.strip(), float(v)
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+stacked
+=======
+Functions to solve a model over a span of periods at once, as a single
+('stacked-time') system of equations. Unlike the period-by-period solution of
+`FSIC.model.model.Model.solve()`, this solves models with leads (e.g.
+forward-looking expectations) consistently, with each period's solution
+taking account of the solutions for later periods.
+
+The stacked system has one unknown per endogenous variable per period and one
+residual per equation per period. It is solved by Newton's method, with a
+sparse Jacobian: the sparsity pattern follows from the variables referred to
+by each equation, and at which lags and leads (see `pattern()`).
+
+These functions require SciPy.
+
+"""
+
+
+import re
+
+import numpy as np
+
+from FSIC.model.jacobian import colour
+from FSIC.settings import dtype
+
+
+TERMINAL = ['fixed', 'constant']
+
+
+def references(model, period=0):
+    """Return the endogenous variable references of each model equation.
+
+    Parameters
+    ==========
+    model : FSIC.model.model.Model object
+        Model with `EQUATIONS` in translated form e.g.
+            'self.H_h[period] = self.H_h[period-1] + self.YD[period]'
+    period : integer
+        Position of a period in `model.full_span`, for models that do not
+        define `ENDOGENOUS` (see
+        FSIC.model.model.Model.get_endogenous_variable_names())
+
+    Returns
+    =======
+    references : list of lists of (integer, integer) tuples
+        One list per equation, of the distinct endogenous variables the
+        equation refers to, each as a tuple:
+            (position of the variable in `ENDOGENOUS`, offset)
+        where the offset is negative for a lag, positive for a lead and zero
+        for the current period
+
+    """
+    names = model.get_endogenous_variable_names(period)
+    positions = {n: i for i, n in enumerate(names)}
+    pattern = re.compile(
+        r'\bself\.([A-Za-z_]\w*)\[\s*period\s*(?:([+-])\s*(\d+))?\s*\]')
+    references = []
+    for e in model.EQUATIONS:
+        found = set()
+        for name, sign, offset in pattern.findall(e):
+            if name not in positions:
+                continue
+            offset = int(offset) if len(offset) else 0
+            if sign == '-':
+                offset = -offset
+            found.add((positions[name], offset))
+        references.append(sorted(found))
+    return references
+
+
+def pattern(model, start, end, terminal='fixed'):
+    """Return the sparsity pattern of the stacked Jacobian.
+
+    Parameters
+    ==========
+    model : FSIC.model.model.Model object
+        Model to solve
+    start, end : integers
+        Positions in `model.full_span` of the first and last periods to solve
+    terminal : string
+        Terminal condition (see `solve()`)
+
+    Returns
+    =======
+    rows, columns : NumPy arrays of integers
+        Positions of the (possibly) non-zero elements of the Jacobian. Residual
+        `e` in period `t` is row `(t - start) * number of equations + e`;
+        endogenous variable `i` in period `t` is column
+        `(t - start) * number of endogenous variables + i`.
+
+    Notes
+    =====
+    Lags of the endogenous variables from before `start` are data, with no
+    column in the Jacobian. Leads from after `end` are also data with a
+    'fixed' terminal condition but, with a 'constant' terminal condition, they
+    are set to (and so depend on) the values in `end`.
+
+    """
+    n = len(model.get_endogenous_variable_names(start))
+    m = len(model.EQUATIONS)
+    rows = []
+    columns = []
+    for e, refs in enumerate(references(model, start)):
+        for i, offset in refs:
+            for t in range(start, end + 1):
+                s = t + offset
+                if s > end and terminal == 'constant':
+                    s = end
+                if s < start or s > end:
+                    continue
+                rows.append((t - start) * m + e)
+                columns.append((s - start) * n + i)
+    # Remove duplicates
+    size = (end - start + 1) * n
+    unique = np.unique(np.array(rows, dtype=np.int64) * size +
+                       np.array(columns, dtype=np.int64))
+    return unique // size, unique % size
+
+
+class Stacked:
+    """Stacked-time system of a model's equations over a span of periods.
+
+    Parameters
+    ==========
+    model : FSIC.model.model.Model object
+        Model to solve
+    start, end : integers
+        Positions in `model.full_span` of the first and last periods to solve
+    terminal : string
+        Terminal condition (see `solve()`)
+
+    """
+
+    def __init__(self, model, start, end, terminal='fixed'):
+        if terminal not in TERMINAL:
+            raise ValueError(
+                'Unrecognised terminal condition \'%s\'' % (terminal))
+        self.model = model
+        self.start = start
+        self.end = end
+        self.terminal = terminal
+        self.periods = range(start, end + 1)
+        self.n = len(model.get_endogenous_variable_names(start))
+        self.m = len(model.EQUATIONS)
+        self.rows, self.columns = pattern(model, start, end, terminal)
+        # Group the columns such that no two columns in the same group affect
+        # the same row (see FSIC.model.jacobian.colour())
+        self.groups = colour(self.rows, self.columns,
+                             len(self.periods) * self.n)
+
+    def get_values(self, out):
+        """Copy the endogenous variable values over the span into `out`."""
+        n = self.n
+        for k, t in enumerate(self.periods):
+            self.model.store_endogenous_variable_values(
+                t, out[k * n:(k + 1) * n])
+
+    def load_values(self, values):
+        """Set the endogenous variables over the span from `values`."""
+        n = self.n
+        for k, t in enumerate(self.periods):
+            self.model.load_endogenous_variable_values(
+                t, values[k * n:(k + 1) * n])
+        if self.terminal == 'constant':
+            last = values[-n:]
+            for t in range(self.end + 1,
+                           min(self.end + 1 + self.model.MAX_LEAD,
+                               len(self.model.full_span))):
+                self.model.load_endogenous_variable_values(t, last)
+
+    def get_residuals(self, values, out):
+        """Evaluate the stacked residuals at `values` into `out`."""
+        m = self.m
+        self.load_values(values)
+        for k, t in enumerate(self.periods):
+            self.model.get_residuals(t, out[k * m:(k + 1) * m])
+
+    def estimate_jacobian(self, values, residuals, step=1.0e-8):
+        """Return a sparse finite-difference estimate of the Jacobian.
+
+        Parameters
+        ==========
+        values : NumPy array
+            Current values of the stacked endogenous variables
+        residuals : NumPy array
+            Stacked residuals at `values`
+        step : float
+            Relative step size: each endogenous variable is perturbed by
+            `step` times the larger of one and its absolute value
+
+        Returns
+        =======
+        jacobian : SciPy sparse matrix (CSC format)
+
+        Notes
+        =====
+        All the columns in a group are perturbed at once, needing one
+        evaluation of the stacked residuals per group: roughly the largest
+        number of endogenous variables (over all lags and leads) in any one
+        equation, however many periods are stacked. The endogenous variables
+        are reset to `values` on exit.
+
+        """
+        from scipy.sparse import csc_matrix
+        perturbed = np.empty_like(residuals)
+        shifted = values.copy()
+        sizes = step * np.maximum(np.abs(values), 1.0)
+        data = np.empty(len(self.rows), dtype=dtype)
+        entries = self.groups[self.columns]
+        for g in np.unique(self.groups):
+            columns = self.groups == g
+            shifted[columns] += sizes[columns]
+            self.get_residuals(shifted, perturbed)
+            shifted[columns] = values[columns]
+            selected = entries == g
+            rows = self.rows[selected]
+            data[selected] = ((perturbed[rows] - residuals[rows]) /
+                              sizes[self.columns[selected]])
+        self.load_values(values)
+        return csc_matrix(
+            (data, (self.rows, self.columns)),
+            shape=(len(residuals), len(values)))
+
+
+def solve(model, start, end, max_iter=100, min_iter=0, tol=1.0e-8,
+          terminal='fixed', step=1.0e-8):
+    """Solve `model` from `start` to `end` as a single stacked system.
+
+    Parameters
+    ==========
+    model : FSIC.model.model.Model object
+        Model to solve, which must implement `get_residuals()`,
+        `store_endogenous_variable_values()` and
+        `load_endogenous_variable_values()` (as generated models do)
+    start, end : integers
+        Positions in `model.full_span` of the first and last periods to solve
+    max_iter : integer
+        The maximum number of (Newton) iterations
+    min_iter : integer
+        The minimum number of iterations
+    tol : float
+        Tolerance to check convergence, based on the sum of squared changes
+        in the endogenous variables, over all periods, between iterations
+    terminal : string
+        Terminal condition, for the leads of the endogenous variables beyond
+        `end`, one of:
+            'fixed' : use the values already in the model (the default)
+            'constant' : set equal to the solution for `end`
+    step : float
+        Relative step size for the finite-difference estimate of the Jacobian
+        (see `Stacked.estimate_jacobian()`)
+
+    Returns
+    =======
+    num_iter : integer or `None`
+        The number of iterations to convergence (`None` if the model failed to
+        converge within `max_iter` iterations)
+
+    Notes
+    =====
+    Each iteration re-estimates the (sparse) Jacobian and solves for the
+    change in the endogenous variables with a sparse LU decomposition
+    (`scipy.sparse.linalg.spsolve()`). No dense matrices are formed. If the
+    model has more equations than endogenous variables, the change is the
+    least-squares solution.
+
+    As for any Newton method, convergence is fastest from a good starting
+    point: for example, the period-by-period solution, which treats the leads
+    as fixed.
+
+    """
+    from scipy.sparse.linalg import spsolve
+    system = Stacked(model, start, end, terminal=terminal)
+    if model.get_buffers(start)[0].ndim > 1:
+        raise ValueError(
+            'Stacked-time solution not available for models with multiple '
+            'scenarios')
+    values = np.empty(len(system.periods) * system.n, dtype=dtype)
+    residuals = np.empty(len(system.periods) * system.m, dtype=dtype)
+    system.get_values(values)
+    system.get_residuals(values, residuals)
+    num_iter = None
+    for i in range(max_iter):
+        jacobian = system.estimate_jacobian(values, residuals, step=step)
+        if system.m == system.n:
+            change = spsolve(jacobian, -residuals)
+        else:
+            # More equations than unknowns: least-squares solution, from the
+            # normal equations
+            change = spsolve((jacobian.T * jacobian).tocsc(),
+                             -(jacobian.T * residuals))
+        values += change
+        system.get_residuals(values, residuals)
+        if np.dot(change, change) < tol and (i + 1) >= min_iter:
+            num_iter = i + 1
+            break
+    return num_iter
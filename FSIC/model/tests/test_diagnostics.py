@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from pandas import PeriodIndex
+import pandas as pd
+
+from FSIC.model.diagnostics import Diagnostics
+from FSIC.model.tests.test_model import DerivedSimultaneous
+
+
+def test_record():
+    diagnostics = Diagnostics(['A', 'B', 'C'], top=2)
+    diagnostics.start_period('2000')
+    diagnostics.record_iteration(4.0)
+    diagnostics.record_iteration(1.0)
+    diagnostics.record_changes(np.array([0.1, -2.0, 0.5]))
+    diagnostics.end_period(2)
+    assert len(diagnostics.records) == 1
+    record = diagnostics.records[0]
+    assert record['period'] == '2000'
+    assert record['iterations'] == 2
+    assert record['norms'] == [4.0, 1.0]
+    assert record['largest_changes'] == [('B', 2.0), ('C', 0.5)]
+    assert record['time'] >= 0
+
+
+def test_record_scenarios():
+    diagnostics = Diagnostics(['A', 'B'])
+    diagnostics.start_period('2000')
+    diagnostics.record_iteration(np.array([1.0, 3.0]))
+    diagnostics.record_changes(np.array([[0.1, 2.0], [0.5, 0.5]]))
+    diagnostics.end_period(np.array([1.0, np.nan]))
+    record = diagnostics.records[0]
+    assert record['iterations'] == [1, None]
+    assert record['norms'] == [3.0]
+    assert record['largest_changes'] == [('A', 2.0), ('B', 0.5)]
+
+
+def test_solve():
+    model = DerivedSimultaneous()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve()
+    assert model.diagnostics is None
+    model.solve(diagnostics=True)
+    assert len(model.diagnostics.records) == len(model.full_span)
+    summary = model.diagnostics.to_frame()
+    assert list(summary.index) == list(model.full_span)
+    assert (summary['iterations'] == model.iter.values).all()
+    assert (summary['final_norm'] < 1e-8).all()
+
+
+def test_solve_newton():
+    model = DerivedSimultaneous()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(method='newton', diagnostics=True)
+    record = model.diagnostics.records[0]
+    assert record['iterations'] == 2
+    assert len(record['norms']) == 2
+    assert record['largest_changes'][0][0] in ('C', 'Y')
+
+
+def test_export():
+    model = DerivedSimultaneous()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(diagnostics=True)
+    directory = tempfile.mkdtemp()
+    try:
+        # JSON
+        path = os.path.join(directory, 'diagnostics.json')
+        records = model.diagnostics.to_json(path)
+        with open(path, 'rt') as f:
+            assert f.read() == records
+        records = json.loads(records)
+        assert records[0]['period'] == '1954'
+        assert records[0]['iterations'] == model.iter.iat[0]
+        # CSV
+        path = os.path.join(directory, 'diagnostics.csv')
+        model.diagnostics.to_csv(path)
+        summary = pd.read_csv(path)
+        assert list(summary.columns) == [
+            'period', 'iterations', 'time', 'final_norm', 'largest_changes']
+        assert len(summary) == len(model.full_span)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+
+import math
+
+import numpy as np
+
+from FSIC.model import functions
+
+
+def check_scalars(function, *args):
+    # Each element of the array result matches the scalar result
+    arrays = [np.array(a, dtype=float) for a in args]
+    expected = function(*arrays)
+    for i in range(len(expected)):
+        actual = function(*[float(a[i]) for a in arrays])
+        assert isinstance(actual, float)
+        assert np.isclose(actual, expected[i], equal_nan=True) or (
+            actual == expected[i])
+
+
+def test_max_min():
+    a = [1.0, -2.0, np.nan, 4.0]
+    b = [0.5, 3.0, 1.0, np.nan]
+    c = [2.0, 0.0, 0.0, 0.0]
+    for function in [functions.max, functions.min]:
+        check_scalars(function, a, b)
+        check_scalars(function, a, b, c)
+    assert functions.max(1, 2, 3) == 3
+    assert functions.min(1, 2, 3) == 1
+    assert np.allclose(functions.max(np.array([1.0, 5.0]), 2.0), [2, 5])
+
+
+def test_abs():
+    check_scalars(functions.abs, [-1.5, 0.0, 2.0])
+
+
+def test_exp():
+    with np.errstate(over='ignore'):
+        check_scalars(functions.exp, [-1.0, 0.0, 2.0, 1000.0])
+    assert functions.exp(1000.0) == float('inf')
+
+
+def test_log():
+    with np.errstate(divide='ignore', invalid='ignore'):
+        check_scalars(functions.log, [0.5, 1.0, 0.0, -1.0, np.nan])
+    assert functions.log(0.0) == -float('inf')
+    assert math.isnan(functions.log(-1.0))
+
+
+def test_where():
+    x = np.array([1.0, -2.0, 3.0])
+    assert np.allclose(functions.where(x > 0, x, 0.0), [1, 0, 3])
+    assert functions.where(True, 1.0, 2.0) == 1.0
+    assert functions.where(-2.0 > 0, -2.0, 0.0) == 0.0
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+
+import numpy as np
+from pandas import PeriodIndex
+from pandas import Series
+from scipy.sparse import issparse
+
+from FSIC.model.jacobian import colour, estimate, sparsity
+from FSIC.model.tests.test_model import Derived, DerivedSimultaneous
+
+
+class DerivedSeparate(Derived):
+
+    ENDOGENOUS = ['C', 'Y']
+    MAX_LAG = 1
+    EQUATIONS = [
+        'self.C[period] = 0.5 * self.G[period] + 0.25 * self.Y[period-1]',
+        'self.Y[period] = 2.0 * self.G[period]', ]
+
+    def get_endogenous_variable_values(self, period):
+        return Series({'C': self.C.iat[period], 'Y': self.Y.iat[period]})
+
+    def store_endogenous_variable_values(self, period, out):
+        out[0] = self.C.iat[period]
+        out[1] = self.Y.iat[period]
+
+    def load_endogenous_variable_values(self, period, values):
+        self.C.iat[period] = values[0]
+        self.Y.iat[period] = values[1]
+
+    def get_residuals(self, period, out):
+        out[0] = ((0.5 * self.G.iat[period] + 0.25 * self.Y.iat[period - 1]) -
+                  self.C.iat[period])
+        out[1] = 2.0 * self.G.iat[period] - self.Y.iat[period]
+
+
+def check_colouring(rows, columns, colours):
+    # No two columns of the same colour share a row
+    for r in np.unique(rows):
+        shared = colours[columns[rows == r]]
+        assert len(shared) == len(np.unique(shared))
+
+
+def test_sparsity():
+    model = DerivedSimultaneous()
+    model.initialise(span=PeriodIndex(start='2000', end='2005'))
+    rows, columns = sparsity(model)
+    assert list(rows) == [0, 0, 1, 1]
+    assert list(columns) == [0, 1, 0, 1]
+    # Lags are not current-period dependencies
+    model = DerivedSeparate()
+    rows, columns = sparsity(model)
+    assert list(rows) == [0, 1]
+    assert list(columns) == [0, 1]
+
+
+def test_colour():
+    # Diagonal: one colour
+    rows = columns = np.arange(5)
+    colours = colour(rows, columns)
+    assert (colours == 0).all()
+    # Tridiagonal: three colours
+    rows = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4])
+    columns = np.array([0, 1, 0, 1, 2, 1, 2, 3, 2, 3, 4, 3, 4])
+    colours = colour(rows, columns)
+    check_colouring(rows, columns, colours)
+    assert colours.max() == 2
+    # Full: one colour per column
+    rows, columns = np.indices((4, 4)).reshape(2, -1)
+    colours = colour(rows, columns)
+    check_colouring(rows, columns, colours)
+    assert sorted(colours) == [0, 1, 2, 3]
+
+
+def test_colour_empty_column():
+    colours = colour(np.array([0]), np.array([0]), 3)
+    assert list(colours) == [0, 0, 0]
+
+
+def setup_model(model):
+    model.initialise(span=PeriodIndex(start='2000', end='2005'))
+    model.G.ix[:] = 20
+    model.C.ix[:] = 10
+    model.Y.ix[:] = 30
+    period = model.get_position(model.full_span[2])
+    values = np.empty(2)
+    residuals = np.empty(2)
+    model.store_endogenous_variable_values(period, values)
+    model.get_residuals(period, residuals)
+    return period, values, residuals
+
+
+def test_estimate():
+    model = DerivedSimultaneous()
+    period, values, residuals = setup_model(model)
+    rows, columns = sparsity(model)
+    colours = colour(rows, columns)
+    jacobian = estimate(model, period, values, residuals, rows, columns,
+                        colours)
+    assert issparse(jacobian)
+    assert np.allclose(jacobian.toarray(), [[-1.0, 0.5], [1.0, -1.0]])
+    # Dense
+    jacobian = estimate(model, period, values, residuals, rows, columns,
+                        colours, sparse=False)
+    assert isinstance(jacobian, np.ndarray)
+    assert np.allclose(jacobian, [[-1.0, 0.5], [1.0, -1.0]])
+    # Values restored
+    assert model.C.iat[period] == 10
+    assert model.Y.iat[period] == 30
+
+
+def test_estimate_separate():
+    model = DerivedSeparate()
+    period, values, residuals = setup_model(model)
+    rows, columns = sparsity(model)
+    colours = colour(rows, columns)
+    # One perturbation for both variables
+    assert colours.max() == 0
+    jacobian = estimate(model, period, values, residuals, rows, columns,
+                        colours)
+    assert np.allclose(jacobian.toarray(), [[-1.0, 0.0], [0.0, -1.0]])
+    # Through the model
+    assert np.allclose(
+        model.estimate_jacobian(period, values, residuals).toarray(),
+        -np.eye(2))
+    assert model.sparsity[2].max() == 0
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -12,7 +12,7 @@ from pandas import Series, DataFrame
 import pandas as pd
 from pandas.util.testing import assert_frame_equal
 
-from FSIC.model.model import Model
+from FSIC.model.model import Model, SolutionError
 from FSIC.settings import dtype
 
 
@@ -48,9 +48,12 @@ class Derived(Model):
             start = min(self.span)
         else:
             start = min(self.past)
-        self.full_span = PeriodIndex(
-            start=start,
-            end=max(self.span))
+        if isinstance(start, int):
+            self.full_span = pd.Index(range(start, max(self.span) + 1))
+        else:
+            self.full_span = PeriodIndex(
+                start=start,
+                end=max(self.span))
         # Initialise `iter`
         self.iter = Series(default, index=self.full_span, dtype=dtype)
         # Initialise model variables
@@ -66,16 +69,16 @@ class Derived(Model):
 
     def get_endogenous_variable_values(self, period):
         values = {}
-        values['Y'] = self.Y[period]
+        values['Y'] = self.Y.iat[period]
         return Series(values)
 
     def solve_equations(self, period):
-        self.Y[period] = (
-            self.C[period] +
-            self.I[period] +
-            self.G[period] +
-            self.X[period] -
-            self.M[period])
+        self.Y.iat[period] = (
+            self.C.iat[period] +
+            self.I.iat[period] +
+            self.G.iat[period] +
+            self.X.iat[period] -
+            self.M.iat[period])
 
 def setup_derived():
     global model
@@ -85,19 +88,196 @@ def setup_derived():
 class DerivedNonConvergence(Derived):
 
     def solve_equations(self, period):
-        self.X[period] = uniform(0, 100)
-        self.Y[period] = (
-            self.C[period] +
-            self.I[period] +
-            self.G[period] +
-            self.X[period] -
-            self.M[period])
+        self.X.iat[period] = uniform(0, 100)
+        self.Y.iat[period] = (
+            self.C.iat[period] +
+            self.I.iat[period] +
+            self.G.iat[period] +
+            self.X.iat[period] -
+            self.M.iat[period])
 
 def setup_derived_non_convergence():
     global model
     model = DerivedNonConvergence()
 
 
+class DerivedBlocks(Derived):
+
+    BLOCKS = [('solve_block_0', False, [0]),
+              ('solve_block_1', True, [1, 2])]
+
+    def initialise(self, span, past=None, default=0.0):
+        Derived.initialise(self, span, past=past, default=default)
+        self.Z = Series(default, index=self.full_span, dtype=dtype)
+
+    def get_endogenous_variable_values(self, period):
+        values = {}
+        values['M'] = self.M.iat[period]
+        values['Y'] = self.Y.iat[period]
+        values['Z'] = self.Z.iat[period]
+        return Series(values)
+
+    def solve_equations(self, period):
+        self.solve_block_0(period)
+        self.solve_block_1(period)
+
+    def solve_block_0(self, period):
+        self.M.iat[period] = 0.1 * self.G.iat[period]
+
+    def solve_block_1(self, period):
+        self.Y.iat[period] = (
+            self.G.iat[period] - self.M.iat[period] + self.Z.iat[period])
+        self.Z.iat[period] = 0.5 * self.Y.iat[period]
+
+def setup_derived_blocks():
+    global model
+    model = DerivedBlocks()
+
+
+class DerivedSimultaneous(Derived):
+
+    EQUATIONS = [
+        'self.C[period] = 0.5 * self.Y[period]',
+        'self.Y[period] = self.C[period] + self.G[period]', ]
+
+    def get_endogenous_variable_values(self, period):
+        values = {}
+        values['C'] = self.C.iat[period]
+        values['Y'] = self.Y.iat[period]
+        return Series(values)
+
+    def load_endogenous_variable_values(self, period, values):
+        self.C.iat[period] = values[0]
+        self.Y.iat[period] = values[1]
+
+    def solve_equations(self, period):
+        self.C.iat[period] = 0.5 * self.Y.iat[period]
+        self.Y.iat[period] = self.C.iat[period] + self.G.iat[period]
+
+    def get_residuals(self, period, out):
+        out[0] = (0.5 * self.Y.iat[period]) - self.C.iat[period]
+        out[1] = (
+            (self.C.iat[period] + self.G.iat[period]) - self.Y.iat[period])
+
+def setup_derived_simultaneous():
+    global model
+    model = DerivedSimultaneous()
+
+
+class DerivedOscillating(DerivedSimultaneous):
+
+    def solve_equations(self, period):
+        self.C.iat[period] = -1.5 * self.Y.iat[period]
+        self.Y.iat[period] = self.C.iat[period] + self.G.iat[period]
+
+def setup_derived_oscillating():
+    global model
+    model = DerivedOscillating()
+
+
+class DerivedWorklist(DerivedSimultaneous):
+
+    WORKLIST = [
+        ('solve_equation_0', [1]),
+        ('solve_equation_1', [0]),
+        ('solve_equation_2', []), ]
+
+    def __init__(self):
+        super().__init__()
+        self.evaluations = [0, 0, 0]
+
+    def solve_equation_0(self, period):
+        self.evaluations[0] += 1
+        previous = self.C.iat[period]
+        self.C.iat[period] = 0.5 * self.Y.iat[period]
+        return abs(self.C.iat[period] - previous)
+
+    def solve_equation_1(self, period):
+        self.evaluations[1] += 1
+        previous = self.Y.iat[period]
+        self.Y.iat[period] = self.C.iat[period] + self.G.iat[period]
+        return abs(self.Y.iat[period] - previous)
+
+    def solve_equation_2(self, period):
+        self.evaluations[2] += 1
+        previous = self.X.iat[period]
+        self.X.iat[period] = 2.0 * self.G.iat[period]
+        return abs(self.X.iat[period] - previous)
+
+def setup_derived_worklist():
+    global model
+    model = DerivedWorklist()
+
+
+class DerivedLagged(Derived):
+
+    MAX_LAG = 1
+
+    def load_endogenous_variable_values(self, period, values):
+        self.Y.iat[period] = values[0]
+
+    def solve_equations(self, period):
+        self.Y.iat[period] = self.C.iat[period] + 0.5 * self.Y.iat[period - 1]
+
+def setup_derived_lagged():
+    global model
+    model = DerivedLagged()
+
+
+class DerivedLead(Derived):
+
+    MAX_LEAD = 1
+
+    def load_endogenous_variable_values(self, period, values):
+        self.Y.iat[period] = values[0]
+
+    def solve_equations(self, period):
+        self.Y.iat[period] = self.C.iat[period] + 0.5 * self.C.iat[period + 1]
+
+def setup_derived_lead():
+    global model
+    model = DerivedLead()
+
+
+class DerivedBatch(Model):
+
+    STORAGE = 'batch'
+    ENDOGENOUS = ['Y']
+    EXOGENOUS = ['G']
+
+    def initialise(self, span, past=None, default=0.0, scenarios=None):
+        self.span = span
+        self.past = past
+        self.full_span = span
+        self.scenarios = pd.Index(scenarios)
+        self.iter = DataFrame(default, index=self.full_span,
+                              columns=self.scenarios, dtype=dtype)
+        self.values = np.full(
+            (2, len(self.full_span), len(self.scenarios)), default,
+            dtype=dtype)
+        self.Y = DataFrame(self.values[0], index=self.full_span,
+                           columns=self.scenarios, copy=False)
+        self.G = DataFrame(self.values[1], index=self.full_span,
+                           columns=self.scenarios, copy=False)
+        self.initialised = True
+        self.solved = False
+
+    def get_endogenous_variable_values(self, period):
+        return DataFrame(self.values[:1, period], index=self.ENDOGENOUS,
+                         columns=self.scenarios)
+
+    def store_endogenous_variable_values(self, period, out):
+        out[:] = self.values[:1, period]
+
+    def solve_equations(self, period):
+        values = self.values
+        values[0, period] = 0.5 * values[0, period] + values[1, period]
+
+def setup_derived_batch():
+    global model
+    model = DerivedBatch()
+
+
 @with_setup(setup_base)
 def test_not_initialised_or_solved_base():
     assert model.initialised is False
@@ -165,6 +345,450 @@ def test_initialise_and_solve():
         assert not np.isnan(i)
 
 
+@with_setup(setup_derived)
+def test_store_endogenous_variable_values():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.Y.ix[5] = 10
+    period = 5
+    before, after, diff = model.get_buffers(period)
+    assert before.shape == (1, )
+    model.store_endogenous_variable_values(period, before)
+    assert before[0] == 10
+    # Buffers are reused until the next call to `solve()`
+    assert model.get_buffers(period)[0] is before
+
+
+@with_setup(setup_derived_blocks)
+def test_solve_blocks():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve()
+    assert np.allclose(model.M, 1)
+    assert np.allclose(model.Y, 18)
+    assert np.allclose(model.Z, 9)
+    for i in model.iter:
+        assert i > 1
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_relax():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    for relax in [0.8, 1.2]:
+        model.solve(relax=relax)
+        assert np.allclose(model.C, 10)
+        assert np.allclose(model.Y, 20)
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_aitken():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve()
+    iterations = model.iter.sum()
+    model.C.ix[:] = 0
+    model.Y.ix[:] = 0
+    model.solve(aitken=True)
+    assert np.allclose(model.Y, 20)
+    assert model.iter.sum() < iterations
+
+
+@with_setup(setup_derived_oscillating)
+def test_solve_adaptive():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(max_iter=50)
+    assert model.iter.isnull().all()
+    model.C.ix[:] = 0
+    model.Y.ix[:] = 0
+    model.solve(max_iter=50, adaptive=True)
+    assert not model.iter.isnull().any()
+    assert np.allclose(model.Y, 4)
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_anderson():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve()
+    iterations = model.iter.sum()
+    model.C.ix[:] = 0
+    model.Y.ix[:] = 0
+    model.solve(method='anderson')
+    assert np.allclose(model.C, 10)
+    assert np.allclose(model.Y, 20)
+    assert model.iter.sum() < iterations
+
+
+@with_setup(setup_derived_oscillating)
+def test_solve_anderson_divergent():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(method='anderson', max_iter=50, depth=2)
+    assert not model.iter.isnull().any()
+    assert np.allclose(model.Y, 4)
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_broyden():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.G.ix['2000':] = 20
+    model.solve(method='broyden')
+    assert np.allclose(model.C.ix[:'1999'], 10)
+    assert np.allclose(model.Y.ix[:'1999'], 20)
+    assert np.allclose(model.C.ix['2000':], 20)
+    assert np.allclose(model.Y.ix['2000':], 40)
+    assert not model.iter.isnull().any()
+    # Jacobian carried over from the previous period
+    assert model.inverse_jacobian is not None
+    assert np.allclose(model.inverse_jacobian,
+                       np.linalg.inv([[-1.0, 0.5], [1.0, -1.0]]))
+
+
+@with_setup(setup_derived_worklist)
+def test_solve_worklist():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(method='worklist')
+    assert np.allclose(model.C, 10)
+    assert np.allclose(model.Y, 20)
+    assert np.allclose(model.X, 20)
+    assert not model.iter.isnull().any()
+    # The independent equation is only solved once per period
+    assert model.evaluations[2] == len(model.full_span)
+    assert model.evaluations[0] > model.evaluations[2]
+
+
+@raises(ValueError)
+@with_setup(setup_derived_simultaneous)
+def test_solve_worklist_error():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.solve(method='worklist')
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_warm_start():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = np.arange(len(model.G)) + 10.0
+    model.solve()
+    iterations = model.iter.sum()
+    expected = model.Y.copy()
+    for policy in ['previous', 'extrapolate']:
+        model.C.ix[:] = 0
+        model.Y.ix[:] = 0
+        model.solve(warm_start=policy)
+        assert np.allclose(model.Y, expected)
+        assert model.iter.sum() < iterations
+        iterations = model.iter.sum()
+
+
+@raises(ValueError)
+@with_setup(setup_derived_simultaneous)
+def test_solve_warm_start_error():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.solve(warm_start='next')
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_newton():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(method='newton')
+    assert np.allclose(model.C, 10)
+    assert np.allclose(model.Y, 20)
+    # Linear model: converges in one step, confirmed by a second
+    for i in model.iter:
+        assert i == 2
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_newton_reuse_jacobian():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(method='newton', reuse_jacobian=True)
+    assert np.allclose(model.Y, 20)
+    assert np.allclose(model.jacobian.toarray(), [[-1.0, 0.5], [1.0, -1.0]])
+
+
+@with_setup(setup_derived_simultaneous)
+def test_estimate_jacobian():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    period = 0
+    values = np.array([1.0, 2.0])
+    model.load_endogenous_variable_values(period, values)
+    residuals = np.empty(2)
+    model.get_residuals(period, residuals)
+    jacobian = model.estimate_jacobian(period, values, residuals)
+    assert jacobian.format == 'csr'
+    assert np.allclose(jacobian.toarray(), [[-1.0, 0.5], [1.0, -1.0]])
+    # Variables reset on exit
+    assert model.C.iat[period] == 1.0
+    assert model.Y.iat[period] == 2.0
+    # Dense: filled into the same array on each call, until the next solution
+    jacobian = model.estimate_jacobian(period, values, residuals,
+                                       sparse=False)
+    assert isinstance(jacobian, np.ndarray)
+    assert np.allclose(jacobian, [[-1.0, 0.5], [1.0, -1.0]])
+    assert model.estimate_jacobian(period, values, residuals,
+                                   sparse=False) is jacobian
+    model.solve()
+    assert model.jacobian_buffers is None
+
+
+@with_setup(setup_derived)
+@raises(ValueError)
+def test_solve_unrecognised_method_error():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.solve(method='jacobi')
+
+
+@with_setup(setup_derived_batch)
+def test_solve_batch():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'),
+                     scenarios=['low', 'high'])
+    model.update_data(DataFrame({'G': 10.0}, index=model.full_span))
+    model.update_data(
+        DataFrame({'G': 20.0}, index=model.full_span[10:]), scenario='high')
+    model.solve()
+    assert np.allclose(model.Y['low'], 20)
+    assert np.allclose(model.Y['high'].ix[:10], 20)
+    assert np.allclose(model.Y['high'].ix[10:], 40)
+    # Iterations are counted separately by scenario
+    assert model.iter['low'].ix[10] < model.iter['high'].ix[10]
+    assert not model.iter.isnull().any().any()
+
+
+@raises(SolutionError)
+@with_setup(setup_derived_oscillating)
+def test_solve_failure_raise():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(on_failure='raise')
+
+
+@with_setup(setup_derived_oscillating)
+def test_solve_failure_skip():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(on_failure='skip', patience=3)
+    # Each period stops after a few iterations, with the starting values
+    # restored
+    assert len(model.failures) == len(model.full_span)
+    assert model.failures[0].period == model.full_span[0]
+    assert set(model.failures[0].variables) == set(['C', 'Y'])
+    assert model.iter.isnull().all()
+    assert np.allclose(model.Y, 0)
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_failure_non_finite():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.G.ix['2000'] = np.nan
+    model.solve(on_failure='mark')
+    assert len(model.failures) == 1
+    assert 'Non-finite' in str(model.failures[0])
+    assert model.failures[0].period == pd.Period('2000')
+    assert np.isnan(model.iter.ix['2000'])
+    assert model.iter.isnull().sum() == 1
+    assert np.allclose(model.Y.ix['2001':], 20)
+    # Methods other than Gauss-Seidel are checked on return
+    model.solve(method='newton', on_failure='mark', max_iter=5)
+    assert len(model.failures) == 1
+    assert model.iter.isnull().sum() == 1
+
+
+def check_solve_failure_method(method, message):
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.G.ix['2000'] = np.nan
+    # Stops as soon as the residuals are non-finite, and carries on with the
+    # other periods
+    model.solve(method=method, on_failure='skip')
+    assert len(model.failures) == 1
+    assert model.failures[0].period == pd.Period('2000')
+    assert str(model.failures[0]).startswith(message)
+    assert model.failures[0].variables == ['Y']
+    assert np.isnan(model.iter.ix['2000'])
+    assert model.iter.isnull().sum() == 1
+    assert np.allclose(model.Y.ix['2001':], 20)
+    try:
+        model.solve(method=method, on_failure='raise')
+    except SolutionError as e:
+        assert e.period == pd.Period('2000')
+    else:
+        raise AssertionError('SolutionError not raised')
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_failure_newton():
+    check_solve_failure_method('newton', 'Non-finite residuals')
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_failure_broyden():
+    check_solve_failure_method('broyden', 'Non-finite residuals')
+
+
+@with_setup(setup_derived_simultaneous)
+def test_solve_failure_anderson():
+    check_solve_failure_method('anderson', 'Non-finite values')
+
+
+@with_setup(setup_derived_batch)
+def test_solve_failure_batch():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'),
+                     scenarios=['low', 'high'])
+    model.update_data(DataFrame({'G': 10.0}, index=model.full_span))
+    model.G.iat[10, 1] = np.nan
+    model.solve(on_failure='mark')
+    assert len(model.failures) == 1
+    assert list(model.failures[0].scenarios) == [False, True]
+    assert model.failures[0].variables == ['Y']
+    # The failed scenario doesn't hold up the others
+    assert np.allclose(model.Y['low'], 20)
+    assert model.iter['high'].isnull().sum() == 1
+    assert not model.iter['low'].isnull().any()
+
+
+@with_setup(setup_derived)
+def test_get_position():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    assert model.get_position(model.full_span[0]) == 0
+    assert model.get_position('1964') == 10
+    assert model.get_position(model.full_span[-1]) == 60
+
+
+@with_setup(setup_derived)
+@raises(KeyError)
+def test_get_position_out_of_span_error():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.get_position('2015')
+
+
+@with_setup(setup_derived)
+def test_solve_integer_span():
+    model.initialise(span=range(1954, 2015))
+    assert model.get_position(1964) == 10
+    model.C.iat[10] = 50
+    model.solve(start=1964, end=1966)
+    assert model.Y.iat[9] == 0
+    assert model.Y.iat[10] == 50
+    assert model.Y.iat[11] == 0
+
+
+@with_setup(setup_derived)
+@raises(ValueError)
+def test_solve_insufficient_lags_error():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.MAX_LAG = 1
+    model.solve()
+
+
+@with_setup(setup_derived)
+def test_solve_incremental():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.solve()
+    assert model.dirty is None
+    # Mark the solution to check which periods are re-solved
+    model.iter.ix[:] = -1
+    model.set_values('C', 50, start='2000')
+    assert model.dirty == 46
+    model.solve(incremental=True)
+    assert model.dirty is None
+    assert (model.iter.ix[:46] == -1).all()
+    assert (model.iter.ix[46:] > 0).all()
+    assert (model.Y.ix[:46] == 0).all()
+    assert (model.Y.ix[46:] == 50).all()
+    # No changes since the last solution: nothing to solve
+    model.iter.ix[:] = -1
+    model.solve(incremental=True)
+    assert (model.iter == -1).all()
+
+
+@with_setup(setup_derived_lagged)
+def test_solve_incremental_partial():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'),
+                     past=PeriodIndex(start='1953', end='1953'))
+    model.C.ix[:] = 10
+    model.solve()
+    model.set_values('C', 20, start='1990')
+    # A solution that ends before the change leaves it to solve
+    model.solve(end='1980', incremental=True)
+    assert model.dirty == model.get_position('1990')
+    assert np.allclose(model.Y.ix['2014'], 20)
+    # A solution that ends part way through leaves the periods after it
+    model.solve(end='1995', incremental=True)
+    assert model.dirty == model.get_position('1996')
+    assert np.allclose(model.Y.ix['2014'], 20)
+    model.solve(incremental=True)
+    assert model.dirty is None
+    assert np.allclose(model.Y.ix['2014'], 40)
+
+
+@with_setup(setup_derived_lead)
+def test_solve_incremental_lead():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    # The last period can't be solved: it has no lead
+    model.solve(end='2013')
+    assert model.dirty is None
+    model.iter.ix[:] = -1
+    model.set_values('C', 50, start='2000')
+    assert model.dirty == 46
+    # Re-solve from the period before the change, whose lead has changed, to
+    # the last period that can be solved
+    model.solve(end='2013', incremental=True)
+    assert model.dirty is None
+    assert (model.iter.ix[:45] == -1).all()
+    assert (model.iter.ix[45:-1] > 0).all()
+    assert model.Y.ix['1999'] == 25
+    assert (model.Y.ix['2000':'2013'] == 75).all()
+    # No changes since the last solution: nothing to solve
+    model.iter.ix[:] = -1
+    model.solve(end='2013', incremental=True)
+    assert (model.iter == -1).all()
+
+
+@with_setup(setup_derived_lagged)
+def test_solve_static():
+    model.initialise(span=PeriodIndex(start='2000', end='2010'),
+                     past=PeriodIndex(start='1999', end='1999'))
+    model.Y.ix[:] = 10
+    # Dynamic: each period's lag is the solution for the one before
+    model.solve()
+    assert np.allclose(model.Y.ix['2000':'2002'], [5, 2.5, 1.25])
+    # Static: each period's lag is the value from before the solution
+    model.Y.ix[:] = 10
+    model.solve(mode='static')
+    assert np.allclose(model.Y.ix['2000':], 5)
+    assert model.Y.ix['1999'] == 10
+    assert (model.iter.ix['2000':] > 0).all()
+
+
+@with_setup(setup_derived)
+@raises(ValueError)
+def test_solve_static_mode_error():
+    model.initialise(span=PeriodIndex(start='2000', end='2010'))
+    model.solve(mode='forecast')
+
+
+@with_setup(setup_derived)
+@raises(ValueError)
+def test_solve_static_stacked_error():
+    model.initialise(span=PeriodIndex(start='2000', end='2010'))
+    model.solve(mode='static', method='stacked')
+
+
+@with_setup(setup_derived)
+def test_update_data_dirty():
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.update_data(DataFrame({'G': 10.0}, index=model.full_span[20:30]))
+    assert model.dirty == 20
+    model.update_data(DataFrame({'G': 10.0}, index=model.full_span[5:10]))
+    assert model.dirty == 5
+
+
 @with_setup(setup_derived_non_convergence)
 def test_no_convergence():
     model.initialise(span=PeriodIndex(start='1954', end='2014'))
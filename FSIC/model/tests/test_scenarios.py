@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+
+from nose.tools import raises
+
+from pandas import PeriodIndex
+from pandas import Series, DataFrame
+
+from FSIC.model.model import Model
+from FSIC.model import scenarios
+from FSIC.settings import dtype
+
+
+class Simple(Model):
+
+    ENDOGENOUS = ['Y']
+    EXOGENOUS = ['G', 'alpha']
+
+    def initialise(self, span, past=None, default=0.0):
+        self.span = span
+        self.past = past
+        self.full_span = span
+        self.iter = Series(default, index=self.full_span, dtype=dtype)
+        self.Y = Series(default, index=self.full_span, dtype=dtype)
+        self.G = Series(default, index=self.full_span, dtype=dtype)
+        self.alpha = Series(default, index=self.full_span, dtype=dtype)
+        self.initialised = True
+        self.solved = False
+
+    def get_endogenous_variable_values(self, period):
+        values = {}
+        values['Y'] = self.Y.iat[period]
+        return Series(values)
+
+    def solve_equations(self, period):
+        self.Y.iat[period] = (
+            self.alpha.iat[period] * self.Y.iat[period] + self.G.iat[period])
+
+    def get_results(self):
+        return DataFrame({'Y': self.Y, 'G': self.G, 'alpha': self.alpha,
+                          'iter': self.iter})
+
+
+span = PeriodIndex(start='2000', end='2005')
+
+
+def test_parse_definition():
+    assert scenarios.parse_definition('W = 1') == ('W', 1.0)
+
+
+@raises(ValueError)
+def test_parse_definition_error():
+    scenarios.parse_definition('W1')
+
+
+def test_configure():
+    model = Simple()
+    model.initialise(span=span)
+    scenarios.configure(model, {
+        'define': ['alpha=0.5'],
+        'set': ["G['2003'] = 10"]})
+    assert (model.alpha == 0.5).all()
+    assert model.G.sum() == 10
+    assert model.G[span[3]] == 10
+
+
+def test_reset():
+    model = Simple()
+    model.initialise(span=span)
+    scenarios.configure(model, {'define': {'G': 10, 'alpha': 0.5}})
+    model.solve()
+    assert model.solved is True
+    model.reset(default=1.0)
+    assert model.solved is False
+    assert (model.Y == 1.0).all()
+    assert (model.G == 1.0).all()
+    assert (model.iter == 1.0).all()
+
+
+def test_solve_cached():
+    scenarios.worker_cache.clear()
+    first = scenarios.solve(Simple, {'define': {'G': 10, 'alpha': 0.5}}, span)
+    assert len(scenarios.worker_cache) == 1
+    second = scenarios.solve(Simple, {'define': {'G': 5, 'alpha': 0.5}}, span)
+    assert len(scenarios.worker_cache) == 1
+    assert abs(first['Y'] - 20).max() < 1e-3
+    assert abs(second['Y'] - 10).max() < 1e-3
+
+
+def test_initialise_worker():
+    scenarios.worker_cache.clear()
+    scenarios.initialise_worker(Simple, span)
+    assert len(scenarios.worker_cache) == 1
+    instance = list(scenarios.worker_cache.values())[0]
+    assert instance.initialised is True
+    # Scenarios reuse the cached instance
+    results = scenarios.solve(
+        Simple, {'define': {'G': 10, 'alpha': 0.5}}, span)
+    assert list(scenarios.worker_cache.values()) == [instance]
+    assert instance.solved is True
+    assert abs(results['Y'] - 20).max() < 1e-3
+
+
+def test_run():
+    definitions = {
+        'base': {'define': {'G': 10, 'alpha': 0.5}},
+        'high': {'define': {'G': 20, 'alpha': 0.5}},
+        'error': {'define': ['G10']},
+        }
+    results = {}
+    errors = {}
+    for label, r, e in scenarios.run(Simple, definitions, span,
+                                     max_workers=1, max_iter=200):
+        results[label] = r
+        errors[label] = e
+    assert sorted(results.keys()) == ['base', 'error', 'high']
+    assert errors['base'] is None and errors['high'] is None
+    assert results['error'] is None
+    assert isinstance(errors['error'], ValueError)
+    assert abs(results['base']['Y'] - 20).max() < 1e-3
+    assert abs(results['high']['Y'] - 40).max() < 1e-3
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+
+from nose.tools import raises
+
+import numpy as np
+from pandas import PeriodIndex
+from pandas import Series
+
+from FSIC.model.stacked import pattern, references
+from FSIC.model.tests.test_model import Derived, DerivedSimultaneous
+
+
+class DerivedForward(Derived):
+
+    ENDOGENOUS = ['C', 'Y']
+    MAX_LAG = 1
+    MAX_LEAD = 1
+    EQUATIONS = [
+        'self.C[period] = 0.25 * self.C[period-1] + 0.5 * self.Y[period+1]',
+        'self.Y[period] = self.C[period] + self.G[period]', ]
+
+    def get_endogenous_variable_values(self, period):
+        return Series({'C': self.C.iat[period], 'Y': self.Y.iat[period]})
+
+    def store_endogenous_variable_values(self, period, out):
+        out[0] = self.C.iat[period]
+        out[1] = self.Y.iat[period]
+
+    def load_endogenous_variable_values(self, period, values):
+        self.C.iat[period] = values[0]
+        self.Y.iat[period] = values[1]
+
+    def get_residuals(self, period, out):
+        out[0] = ((0.25 * self.C.iat[period - 1] +
+                   0.5 * self.Y.iat[period + 1]) - self.C.iat[period])
+        out[1] = (self.C.iat[period] + self.G.iat[period]) - self.Y.iat[period]
+
+
+def get_residuals(model, start, end):
+    residuals = np.empty((end - start + 1, len(model.EQUATIONS)))
+    for k, t in enumerate(range(start, end + 1)):
+        model.get_residuals(t, residuals[k])
+    return residuals
+
+
+def test_references():
+    model = DerivedForward()
+    assert references(model) == [[(0, -1), (0, 0), (1, 1)], [(0, 0), (1, 0)]]
+
+
+def test_pattern():
+    model = DerivedForward()
+    rows, columns = pattern(model, 1, 3)
+    # Variables (C, Y) by period, for three periods
+    expected = np.zeros((6, 6), dtype=bool)
+    expected[0, [0, 3]] = True
+    expected[1, [0, 1]] = True
+    expected[2, [0, 2, 5]] = True
+    expected[3, [2, 3]] = True
+    expected[4, [2, 4]] = True
+    expected[5, [4, 5]] = True
+    actual = np.zeros((6, 6), dtype=bool)
+    actual[rows, columns] = True
+    assert (actual == expected).all()
+    # With a constant terminal condition, the lead in the last period refers
+    # back to the last period
+    rows, columns = pattern(model, 1, 3, terminal='constant')
+    actual = np.zeros((6, 6), dtype=bool)
+    actual[rows, columns] = True
+    expected[4, 5] = True
+    assert (actual == expected).all()
+
+
+def test_solve_stacked():
+    model = DerivedForward()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.G.ix['1990':] = 20
+    model.Y.ix['2014'] = 40
+    model.solve(start='1955', end='2013', method='stacked')
+    assert (model.iter.ix[1:-1] > 0).all()
+    assert np.allclose(get_residuals(model, 1, len(model.full_span) - 2), 0)
+    # Anticipation: consumption rises before the change in `G`
+    assert model.C.ix['1989'] > model.C.ix['1980']
+
+
+def test_solve_stacked_terminal():
+    model = DerivedForward()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = 10
+    model.solve(start='1955', end='2013', method='stacked',
+                terminal='constant')
+    assert np.allclose(get_residuals(model, 1, len(model.full_span) - 2), 0)
+    assert np.isclose(model.Y.ix['2014'], model.Y.ix['2013'])
+    # Steady state: C = 0.25 C + 0.5 (C + 10)
+    assert np.allclose(model.C.ix['2013'], 20, atol=1e-6)
+
+
+def test_solve_stacked_no_leads():
+    # Without leads, the stacked solution matches the period-by-period one
+    model = DerivedSimultaneous()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.G.ix[:] = np.arange(len(model.G)) + 10.0
+    model.solve()
+    expected = model.Y.copy()
+    model.C.ix[:] = 0
+    model.Y.ix[:] = 0
+    model.solve(method='stacked')
+    assert np.allclose(model.Y, expected)
+
+
+@raises(ValueError)
+def test_solve_stacked_invalid_terminal():
+    model = DerivedForward()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.solve(start='1955', end='2013', method='stacked',
+                terminal='linear')
+
+
+@raises(ValueError)
+def test_solve_period_stacked():
+    model = DerivedForward()
+    model.initialise(span=PeriodIndex(start='1954', end='2014'))
+    model.solve_period(1, method='stacked')
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
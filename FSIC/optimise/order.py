@@ -135,3 +135,204 @@ def make_graph(equations, warn=True):
     nx.set_node_attributes(G, 'equations', node_equations)
     # Return
     return G
+
+
+def blocks(equations, warn=True):
+    """Partition `equations` into blocks to be solved in sequence.
+
+    Parameters
+    ==========
+    equations : list of strings
+        List of equations to partition, one equation per element
+    warn : boolean
+        If `True`, print a warning if there is more than one equation with the
+        same endogenous variable
+
+    Returns
+    =======
+    partitioned : list of Dictionaries
+        One Dictionary per block, in solution order, each containing:
+            'equations' : list of strings
+                The equations in the block
+            'simultaneous' : boolean
+                `False` if the block consists of a single endogenous variable
+                that does not depend on itself in the current period (such that
+                the block need only be solved once); `True` if the block must
+                be solved iteratively
+
+    Notes
+    =====
+    The blocks are the strongly connected components of the directed graph
+    representation of `equations`:
+
+    1. Translate `equations` into a directed graph object (a NetworkX DiGraph)
+    2. Identify the strongly connected components of the graph: sets of
+       variables that (directly or indirectly) depend on each other in the
+       current period
+    3. Order the components such that each one only depends on those that come
+       before it (sorting alphabetically as a tie-breaker)
+    4. Reorder the equations within each simultaneous block with `recursive()`
+
+    See also
+    ========
+    make_graph()
+    recursive()
+
+    """
+    if not len(equations):
+        return []
+    # 1. Translate `equations` into a directed graph object
+    #    (a NetworkX DiGraph)
+    G = make_graph(equations, warn=warn)
+    node_equations = nx.get_node_attributes(G, 'equations')
+    # 2. Identify the strongly connected components of the graph
+    components = [sorted(c) for c in nx.strongly_connected_components(G)]
+    membership = {}
+    for i, c in enumerate(components):
+        for n in c:
+            membership[n] = i
+    # 3. Order the components (topological sort, taking the alphabetically
+    #    first available component at each step)
+    predecessors = {i: set() for i in range(len(components))}
+    for u, v in G.edges():
+        if membership[u] != membership[v]:
+            predecessors[membership[v]].add(membership[u])
+    order = []
+    remaining = set(predecessors.keys())
+    while len(remaining):
+        available = [i for i in remaining
+                     if not len(predecessors[i] & remaining)]
+        i = min(available, key=lambda x: components[x])
+        order.append(i)
+        remaining.remove(i)
+    # 4. Collect the equations of each component, reordering those of
+    #    simultaneous blocks
+    partitioned = []
+    for i in order:
+        nodes = [n for n in components[i] if n in node_equations]
+        if not len(nodes):
+            continue
+        block = []
+        for n in nodes:
+            block = block + node_equations[n]
+        simultaneous = len(nodes) > 1 or self_referencing(block)
+        if simultaneous:
+            block = recursive(block, warn=False)
+        partitioned.append({
+            'equations': block,
+            'simultaneous': simultaneous, })
+    # Return
+    return partitioned
+
+
+def self_referencing(equations):
+    """Return `True` if any equation in `equations` depends on itself.
+
+    Parameters
+    ==========
+    equations : list of strings
+        List of equations to check, one equation per element
+
+    Returns
+    =======
+    self_referencing : boolean
+        `True` if the endogenous variable of any equation (with its period
+        index) also appears on the right hand-side of that equation
+
+    Notes
+    =====
+    make_graph() does not add such self-references (loops) to the graph
+    because FSIC.parser.code.identify_variables() removes duplicates.
+
+    """
+    from FSIC.parser.code import identify_variables
+    for e in equations:
+        v = identify_variables(e, suffix=r'\[.+?\]', remove_duplicates=False)
+        if len(set(v['endogenous']) & set(v['exogenous'])):
+            return True
+    return False
+
+
+def epilogue(equations, exclude=None, warn=True):
+    """Return the equations that feed nothing back into the rest of a model.
+
+    Parameters
+    ==========
+    equations : list of strings
+        List of equations to check, one equation per element
+    exclude : `None` or list of strings
+        Equations to keep out of the epilogue regardless (e.g. those that
+        cannot be evaluated over a span of periods at once)
+    warn : boolean
+        If `True`, print a warning if there is more than one equation with the
+        same endogenous variable
+
+    Returns
+    =======
+    epilogue : list of strings
+        The downstream-only ('epilogue') equations, in an order in which they
+        can be solved: each one only depends on the rest of the model and on
+        the epilogue equations before it
+
+    Notes
+    =====
+    An equation is in the epilogue if:
+     - its endogenous variable is the left hand-side variable of no other
+       equation
+     - the equation does not refer to its own endogenous variable
+     - the only equations that refer to its endogenous variable are other
+       epilogue equations, and only in the current period (such that the
+       equation has no lags or leads to carry from one period to the next)
+
+    Starting from the equations whose endogenous variables no other equation
+    refers to, the epilogue grows back through the equation graph until no
+    further equations qualify.
+
+    See also
+    ========
+    make_graph()
+    self_referencing()
+
+    """
+    if exclude is None:
+        exclude = []
+    G = make_graph(equations, warn=warn)
+    # Positions of the equations by left hand-side node and by variable
+    positions = {}
+    counts = {}
+    for i, e in enumerate(equations):
+        lhs = e.split('=', 1)[0].strip()
+        positions.setdefault(lhs, []).append(i)
+        name = lhs.split('[', 1)[0]
+        counts[name] = counts.get(name, 0) + 1
+    # Equations that refer to each variable and variables referred to in
+    # periods other than the current one
+    readers = {}
+    offset = set()
+    for node in G.nodes():
+        name, index = node.split('[', 1)
+        successors = [j for s in G.successors(node)
+                      for j in positions.get(s, [])]
+        if not len(successors):
+            continue
+        readers.setdefault(name, set()).update(successors)
+        if index.replace(' ', '') != 'period]':
+            offset.add(name)
+    # Equations that can never qualify
+    candidates = []
+    for i, e in enumerate(equations):
+        name = e.split('=', 1)[0].strip().split('[', 1)[0]
+        if (e in exclude or counts[name] > 1 or name in offset or
+                self_referencing([e])):
+            continue
+        candidates.append((i, name))
+    # Grow the epilogue back from the downstream end of the graph
+    selected = []
+    while True:
+        added = [i for i, name in candidates
+                 if i not in selected and
+                 readers.get(name, set()) <= set(selected)]
+        if not len(added):
+            break
+        selected = selected + added
+    return [equations[i] for i in reversed(selected)]
@@ -64,6 +64,77 @@ def test_recursive():
     assert FSIC.optimise.order.recursive(equations) == reordered
 
 
+def test_blocks_empty():
+    assert FSIC.optimise.order.blocks([]) == []
+
+
+def test_blocks():
+    equations = [
+        'self.C_d[period] = self.alpha_1[period] * self.YD[period] + self.alpha_2[period] * self.H_h[period-1]',
+        'self.C_s[period] = self.C_d[period]',
+        'self.G_s[period] = self.G_d[period]',
+        'self.T_s[period] = self.T_d[period]',
+        'self.N_s[period] = self.N_d[period]',
+        'self.H_s[period] = self.H_s[period-1] + self.G_d[period] - self.T_d[period]',
+        'self.H_h[period] = self.H_h[period-1] + self.YD[period] - self.C_d[period]',
+        'self.Y[period] = self.C_s[period] + self.G_s[period]',
+        'self.N_d[period] = self.Y[period] / self.W[period]',
+        'self.YD[period] = self.W[period] * self.N_s[period] - self.T_s[period]',
+        'self.T_d[period] = self.theta[period] * self.W[period] * self.N_s[period]',
+    ]
+    partitioned = FSIC.optimise.order.blocks(equations)
+    assert [b['simultaneous'] for b in partitioned] == [
+        False, True, False, False]
+    assert partitioned[0]['equations'] == [
+        'self.G_s[period] = self.G_d[period]']
+    assert sorted(partitioned[1]['equations']) == sorted([
+        equations[0], equations[1], equations[3], equations[4],
+        equations[7], equations[8], equations[9], equations[10]])
+    assert partitioned[2]['equations'] == [equations[6]]
+    assert partitioned[3]['equations'] == [equations[5]]
+
+
+def test_blocks_self_reference():
+    equations = [
+        'self.X[period] = 0.5 * self.X[period] + self.Z[period]',
+        'self.Y[period] = self.X[period]',
+    ]
+    partitioned = FSIC.optimise.order.blocks(equations)
+    assert partitioned == [
+        {'equations': [equations[0]], 'simultaneous': True},
+        {'equations': [equations[1]], 'simultaneous': False}, ]
+
+
+def test_epilogue():
+    equations = [
+        'self.C[period] = 0.5 * self.Y[period]',
+        'self.Y[period] = self.C[period] + self.G[period]',
+        'self.R[period] = self.S[period] / self.Y[period]',
+        'self.S[period] = self.Y[period] - self.C[period]',
+        'self.K[period] = self.K[period-1] + self.S[period]',
+        'self.Z[period] = self.Y[period-1]',
+        'self.W[period] = self.W[period] * 0.5 + self.Y[period]',
+    ]
+    # S feeds K, which carries over from one period to the next; W refers to
+    # itself
+    assert FSIC.optimise.order.epilogue(equations) == [
+        equations[5], equations[2]]
+    # Excluding R leaves nothing for S to feed
+    assert FSIC.optimise.order.epilogue(
+        equations, exclude=[equations[2]]) == [equations[5]]
+
+
+def test_epilogue_chain():
+    equations = [
+        'self.Y[period] = self.G[period]',
+        'self.B[period] = self.A[period] * 2',
+        'self.A[period] = self.Y[period] + 1',
+    ]
+    # Dependencies first
+    assert FSIC.optimise.order.epilogue(equations) == [
+        equations[0], equations[2], equations[1]]
+
+
 @raises(ValueError)
 def test_make_graph_error_zero_endogenous_variables():
     FSIC.optimise.order.make_graph([' = 0.0'])
@@ -56,5 +56,7 @@ Language-specific:
 * `code`, to translate Python code blocks into compatible code and identify
   model variables
 * `ini`, to handle INI-style configuration file strings
+* `symbolic`, to analyse translated equations symbolically e.g. to identify
+  linear systems
 
 """
@@ -35,6 +35,12 @@ def translate(block, period='period'):
     * Adding 'self.' as a prefix
     * Adding a period index as a suffix (accounting for leads and lags where
       appropriate)
+    * Expanding the lag, lead and difference helpers `lag()`, `lead()` and
+      `diff()` into variable references (see `expand()`)
+    * Mapping calls to the functions in FSIC.model.functions (e.g. `max()`)
+      to that module, such that the equations give the same results on
+      scalars and on arrays (generated model scripts import the module as
+      `functions`)
 
     Examples
     ========
@@ -45,10 +51,28 @@ def translate(block, period='period'):
     >>> translate('G_s = G_d', period='time')
     'self.G_s[time] = self.G_d[time]'
 
+    >>> translate('PQ = max(Q, PQ[-1])')
+    'self.PQ[period] = functions.max(self.Q[period], self.PQ[period-1])'
+
     """
+    from FSIC.model.functions import __all__ as functions
     # Remove unnecessary whitespace
     while('  ' in block):
         block = block.replace('  ', ' ')
+    # Expand lag, lead and difference helpers
+    block = expand(block)
+    # Map calls to model functions to the `functions` module
+    function_pattern = re.compile(
+        r'''(?<![\w.])      # Not part of a longer name, nor an attribute
+            (''' + '|'.join(functions) + r''')
+            \s*             # Any whitespace before
+            (?=\()          # Opening bracket of the call
+        ''',
+        re.VERBOSE)
+    block = substitute(
+        function_pattern,
+        lambda x: 'functions.' + x.groups()[0],
+        block)
     split_pattern = re.compile(
         r'''\b              # Open word boundary
             ([A-z_]+[\w]*)  # Valid Python identifier (starts with a letter or
@@ -128,6 +152,59 @@ def translate(block, period='period'):
     return block
 
 
+def expand(block):
+    """Expand the lag, lead and difference helpers in `block`.
+
+    Parameters
+    ==========
+    block : string
+        Code block to expand, before translation
+
+    Returns
+    =======
+    block : string
+        Copy of `block` with each helper replaced with the equivalent
+        variable references:
+            lag(X)     -> X[-1]
+            lag(X, n)  -> X[-n]
+            lead(X, n) -> X[n]
+            diff(X)    -> (X - X[-1])
+            diff(X, n) -> (X - X[-n])
+        where `X` must be a variable name and `n` a whole number
+
+    Examples
+    ========
+    >>> from FSIC.parser.code import expand
+    >>> expand('I = 0.5 * diff(Y) + lag(I)')
+    'I = 0.5 * (Y - Y[-1]) + I[-1]'
+
+    """
+    pattern = re.compile(
+        r'''(?<![\w.])      # Not part of a longer name, nor an attribute
+            (lag|lead|diff) # Helper
+            \s*\(\s*        # Opening bracket
+            ([A-Za-z_]\w*)  # Variable name
+            \s*             # Any whitespace after
+            (?:,\s*(\d+)\s*)?
+                            # Optional offset
+            \)              # Closing bracket
+        ''',
+        re.VERBOSE)
+
+    def replace(m):
+        helper, name, offset = m.groups()
+        offset = 1 if offset is None else int(offset)
+        if helper == 'diff':
+            return '(%s - %s[-%d])' % (name, name, offset)
+        if offset == 0:
+            return name
+        if helper == 'lag':
+            return '%s[-%d]' % (name, offset)
+        return '%s[%d]' % (name, offset)
+
+    return substitute(pattern, replace, block)
+
+
 def substitute(pattern, repl, string, ignore_keywords=True):
     """Modify elements in `string` that match `pattern`, using `repl`.
 
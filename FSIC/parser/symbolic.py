@@ -0,0 +1,796 @@
+# -*- coding: utf-8 -*-
+"""
+symbolic
+========
+FSIC parser to analyse translated model equations (as generated by
+FSIC.parser.code.translate()) symbolically, for example to identify equations
+that are linear in a set of unknowns or to differentiate equations with
+respect to their endogenous variables.
+
+"""
+
+
+import ast
+import sys
+
+
+# Functions that `derivative()` can differentiate, by name (ignoring any
+# module prefix, such that 'exp' and 'np.exp' are treated alike)
+FUNCTIONS = ['max', 'min', 'exp', 'log', 'abs', 'where']
+
+# Node types of literals (numbers, strings etc): `ast.Constant` from Python
+# 3.8, and the separate types it replaced before
+if sys.version_info >= (3, 8):
+    LITERALS = (ast.Constant, )
+else:
+    LITERALS = tuple([getattr(ast, n)
+                      for n in ('Num', 'Str', 'Bytes', 'NameConstant')
+                      if hasattr(ast, n)])
+
+# Node types to allow for subscripts, other than expressions: before Python
+# 3.9, the index of a subscript is wrapped in an `ast.Index` node
+if sys.version_info < (3, 9):
+    INDEXES = (ast.Index, )
+else:
+    INDEXES = ()
+
+# Operators and their precedence (higher binds more tightly), for
+# `to_source()`, as in the standard library's `unparse()`
+BINARY_OPERATORS = {
+    ast.BitOr: ('|', 7), ast.BitXor: ('^', 8), ast.BitAnd: ('&', 9),
+    ast.LShift: ('<<', 10), ast.RShift: ('>>', 10),
+    ast.Add: ('+', 11), ast.Sub: ('-', 11),
+    ast.Mult: ('*', 12), ast.Div: ('/', 12), ast.FloorDiv: ('//', 12),
+    ast.Mod: ('%', 12),
+    ast.Pow: ('**', 14), }
+UNARY_OPERATORS = {
+    ast.Not: ('not ', 5),
+    ast.UAdd: ('+', 13), ast.USub: ('-', 13), ast.Invert: ('~', 13), }
+BOOLEAN_OPERATORS = {ast.Or: ('or', 3), ast.And: ('and', 4)}
+COMPARISON_OPERATORS = {
+    ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>',
+    ast.GtE: '>=', ast.Is: 'is', ast.IsNot: 'is not', ast.In: 'in',
+    ast.NotIn: 'not in', }
+
+
+def linearise(equation, unknowns, period='period'):
+    """Express `equation` as a linear function of `unknowns`, if possible.
+
+    Parameters
+    ==========
+    equation : string
+        Translated model equation, of the form:
+            self.Y[period] = self.C[period] + self.G[period]
+    unknowns : list of strings
+        Names of the unknowns (with 'self.' prefix): only references to these
+        variables in the current period (indexed by `period` exactly) are
+        treated as unknowns; all other terms, including lags and leads of the
+        unknowns, are treated as known
+    period : string
+        Name of the period index in `equation`
+
+    Returns
+    =======
+    If the residual of `equation` (right hand-side less left hand-side) is
+    linear in `unknowns`, a tuple:
+        coefficients : Dictionary
+            Python expression (string) for the coefficient on each unknown
+            that appears in `equation`
+        constant : string
+            Python expression for the remaining (known) terms
+    Otherwise, `None`.
+
+    Examples
+    ========
+    >>> from FSIC.parser.symbolic import linearise
+    >>> linearise('self.Y[period] = self.C[period] + self.G[period]',
+    ...           ['self.C', 'self.Y'])
+    ({'self.C': '1', 'self.Y': '-1'}, 'self.G[period]')
+
+    >>> linearise('self.Y[period] = self.C[period] * self.Y[period]',
+    ...           ['self.C', 'self.Y']) is None
+    True
+
+    """
+    lhs, rhs = equation.split('=', 1)
+    try:
+        residual = ast.parse(
+            '(%s) - (%s)' % (rhs.strip(), lhs.strip()), mode='eval').body
+    except SyntaxError:
+        return None
+    terms = collect(residual, unknowns, period)
+    if terms is None:
+        return None
+    constant = terms.pop(None, '0')
+    return terms, constant
+
+
+def linear_system(equations, unknowns, period='period'):
+    """Express `equations` as a linear system in `unknowns`, if possible.
+
+    Parameters
+    ==========
+    equations : list of strings
+        Translated model equations (see `linearise()`)
+    unknowns : list of strings
+        Names of the unknowns (with 'self.' prefix)
+    period : string
+        Name of the period index in `equations`
+
+    Returns
+    =======
+    If every equation is linear in `unknowns`, a tuple:
+        coefficients : list of lists of strings
+            Python expression for each element of the coefficient matrix,
+            `A`: one row per equation and one column per unknown ('0' where
+            the unknown does not appear in the equation)
+        constants : list of strings
+            Python expression for each element of the vector `b`, one per
+            equation
+    such that the equations hold where:
+        A x + b = 0
+    for `x` the values of the unknowns. Otherwise, `None`.
+
+    See also
+    ========
+    linearise()
+
+    """
+    coefficients = []
+    constants = []
+    for e in equations:
+        linear = linearise(e, unknowns, period)
+        if linear is None:
+            return None
+        terms, constant = linear
+        coefficients.append([terms.get(u, '0') for u in unknowns])
+        constants.append(constant)
+    return coefficients, constants
+
+
+def jacobian(equation, unknowns, period='period'):
+    """Return the partial derivatives of `equation` with respect to `unknowns`.
+
+    Parameters
+    ==========
+    equation : string
+        Translated model equation, of the form:
+            self.Y[period] = self.C[period] + self.G[period]
+    unknowns : list of strings
+        Names of the unknowns (with 'self.' prefix): only references to these
+        variables in the current period (indexed by `period` exactly) are
+        differentiated; all other terms are treated as constants
+    period : string
+        Name of the period index in `equation`
+
+    Returns
+    =======
+    If every term of `equation` can be differentiated (see `derivative()`), a
+    Dictionary:
+        Python expression (string) for the partial derivative of the residual
+        of `equation` (right hand-side less left hand-side) with respect to
+        each unknown that appears in `equation`, omitting derivatives that
+        simplify to zero
+    Otherwise, `None`.
+
+    Examples
+    ========
+    >>> from FSIC.parser.symbolic import jacobian
+    >>> jacobian('self.C[period] = 0.5 * self.Y[period] ** 2',
+    ...          ['self.C', 'self.Y'])
+    {'self.C': '-1', 'self.Y': '0.5 * (2 * self.Y[period])'}
+
+    """
+    lhs, rhs = equation.split('=', 1)
+    try:
+        residual = ast.parse(
+            '(%s) - (%s)' % (rhs.strip(), lhs.strip()), mode='eval').body
+    except SyntaxError:
+        return None
+    derivatives = {}
+    for u in unknowns:
+        if not depends(residual, [u], period):
+            continue
+        d = derivative(residual, u, period)
+        if d is None:
+            return None
+        if d != '0':
+            derivatives[u] = d
+    return derivatives
+
+
+def derivative(node, name, period='period'):
+    """Return a Python expression for the derivative of `node`.
+
+    Parameters
+    ==========
+    node : `ast` expression node
+        Expression to differentiate
+    name : string
+        Name of the variable (with 'self.' prefix) to differentiate with
+        respect to, in the current period (see `unknown()`)
+    period : string
+        Name of the period index
+
+    Returns
+    =======
+    derivative : string or `None`
+        Python expression for the derivative of `node` with respect to `name`;
+        `None` if `node` contains an operation or function (other than those
+        in `FUNCTIONS`) that depends on `name`
+
+    Notes
+    =====
+    The derivatives of the functions in `FUNCTIONS` are:
+        exp(u) : exp(u) * du
+        log(u) : du / u
+        abs(u) : (du if u >= 0 else -du)
+        max(a, b) : (da if a >= b else db)
+        min(a, b) : (da if a <= b else db)
+        where(c, a, b) : (da if c else db)
+    with `abs()`, `max()` and `min()` taking the derivative of the first
+    branch at a tie and `where()` treating the condition as fixed. A power
+    with an exponent that depends on `name` uses `np.log()`, as available in
+    generated model scripts.
+
+    """
+    if not depends(node, [name], period):
+        return '0'
+    if unknown(node, [name], period) is not None:
+        return '1'
+    if isinstance(node, ast.UnaryOp) and isinstance(
+            node.op, (ast.UAdd, ast.USub)):
+        d = derivative(node.operand, name, period)
+        if d is None or isinstance(node.op, ast.UAdd):
+            return d
+        return negate(d)
+    if isinstance(node, ast.BinOp):
+        a, b = unparse(node.left), unparse(node.right)
+        da = derivative(node.left, name, period)
+        db = derivative(node.right, name, period)
+        if da is None or db is None:
+            return None
+        if isinstance(node.op, ast.Add):
+            return combine(da, '+', db)
+        if isinstance(node.op, ast.Sub):
+            return combine(da, '-', db)
+        if isinstance(node.op, ast.Mult):
+            return combine(multiply(da, b), '+', multiply(a, db))
+        if isinstance(node.op, ast.Div):
+            return combine(
+                combine(da, '/', b), '-',
+                combine(multiply(a, db), '/', combine(b, '**', '2')))
+        if isinstance(node.op, ast.Pow):
+            power = multiply(
+                multiply(b, combine(a, '**', combine(b, '-', '1'))), da)
+            if db == '0':
+                return power
+            return combine(power, '+', multiply(
+                multiply(unparse(node), 'np.log(%s)' % (a)), db))
+        return None
+    if isinstance(node, ast.Call) and not node.keywords:
+        function = unparse(node.func).split('.')[-1]
+        if function not in FUNCTIONS:
+            return None
+        arguments = [unparse(a) for a in node.args]
+        derivatives = [derivative(a, name, period) for a in node.args]
+        if function == 'where':
+            # The condition is fixed: only differentiate the values
+            derivatives[0] = '0'
+        if None in derivatives:
+            return None
+        if function in ('exp', 'log', 'abs'):
+            if len(arguments) != 1:
+                return None
+            if function == 'exp':
+                return multiply(unparse(node), derivatives[0])
+            if function == 'abs':
+                return '(%s if %s >= 0 else %s)' % (
+                    derivatives[0], parenthesise(arguments[0]),
+                    negate(derivatives[0]))
+            return combine(derivatives[0], '/', arguments[0])
+        if function == 'where':
+            if len(arguments) != 3:
+                return None
+            if derivatives[1] == derivatives[2]:
+                return derivatives[1]
+            return '(%s if %s else %s)' % (
+                derivatives[1], arguments[0], derivatives[2])
+        if len(arguments) != 2:
+            return None
+        if derivatives[0] == derivatives[1]:
+            return derivatives[0]
+        return '(%s if %s %s %s else %s)' % (
+            derivatives[0], parenthesise(arguments[0]),
+            '>=' if function == 'max' else '<=',
+            parenthesise(arguments[1]), derivatives[1])
+    return None
+
+
+def vectorisable(equation, period='period'):
+    """Return `True` if `equation` can be evaluated over many periods at once.
+
+    Parameters
+    ==========
+    equation : string
+        Translated model equation, of the form:
+            self.Y[period] = self.C[period] + self.G[period]
+    period : string
+        Name of the period index in `equation`
+
+    Returns
+    =======
+    vectorisable : boolean
+        `True` if `equation` consists only of arithmetic operations on
+        numbers and on variables indexed by `period` (with or without a fixed
+        offset, e.g. `self.Y[period-1]`), and of calls to the functions in
+        FSIC.model.functions (e.g. `functions.max()`, as mapped by
+        FSIC.parser.code.translate()), such that it gives the same results
+        with every variable reference replaced by an array of values over a
+        span of periods; `False` otherwise (e.g. if it calls any other
+        function)
+
+    """
+    lhs, rhs = equation.split('=', 1)
+    try:
+        target = ast.parse(lhs.strip(), mode='eval').body
+        node = ast.parse(rhs.strip(), mode='eval').body
+    except SyntaxError:
+        return False
+    if not (isinstance(target, ast.Subscript) and
+            unparse(index(target)) == period):
+        return False
+    return arithmetic(node, period)
+
+
+def arithmetic(node, period='period'):
+    """Return `True` if `node` is arithmetic on numbers and variables only.
+
+    Parameters
+    ==========
+    node : `ast` expression node
+        Expression to analyse
+    period : string
+        Name of the period index
+
+    Returns
+    =======
+    arithmetic : boolean
+        `True` if `node` consists only of arithmetic operations on numbers and
+        on variables indexed by `period`, with or without a fixed offset, and
+        of calls to the functions in FSIC.model.functions, with single
+        (rather than chained) comparisons for their arguments (see
+        `vectorisable()`)
+
+    """
+    from FSIC.model.functions import __all__ as names
+    functions = [n.func for n in ast.walk(node) if isinstance(n, ast.Call)]
+    for n in ast.walk(node):
+        if isinstance(n, ast.Call):
+            if n.keywords or not (
+                    isinstance(n.func, ast.Attribute) and
+                    isinstance(n.func.value, ast.Name) and
+                    n.func.value.id == 'functions' and
+                    n.func.attr in names):
+                return False
+        elif isinstance(n, ast.Compare):
+            if len(n.ops) != 1:
+                return False
+        elif isinstance(n, ast.Subscript):
+            if not isinstance(n.value, ast.Attribute):
+                return False
+            offset = index(n)
+            if isinstance(offset, ast.BinOp) and isinstance(
+                    offset.op, (ast.Add, ast.Sub)):
+                if not (isinstance(offset.right, LITERALS) and
+                        isinstance(literal(offset.right), int)):
+                    return False
+                offset = offset.left
+            if not (isinstance(offset, ast.Name) and offset.id == period):
+                return False
+        elif isinstance(n, ast.Attribute):
+            if n in functions:
+                continue
+            if not (isinstance(n.value, ast.Name) and n.value.id == 'self'):
+                return False
+        elif isinstance(n, ast.Name):
+            if n.id not in ('self', period, 'functions'):
+                return False
+        elif isinstance(n, ast.Not):
+            return False
+        elif not isinstance(n, (ast.BinOp, ast.UnaryOp, ast.operator,
+                                ast.unaryop, ast.cmpop, ast.expr_context) +
+                            LITERALS + INDEXES):
+            return False
+    # Variables outside a subscript (e.g. `self.X` alone) are not covered
+    attributes = [n for n in ast.walk(node)
+                  if isinstance(n, ast.Attribute) and n not in functions]
+    subscripted = [n.value for n in ast.walk(node)
+                   if isinstance(n, ast.Subscript)]
+    return len(attributes) == len(subscripted)
+
+
+def lift(equations, endogenous, name='precomputed', period='period'):
+    """Replace the exogenous subexpressions of `equations` with lookups.
+
+    Parameters
+    ==========
+    equations : list of strings
+        Translated model equations, of the form:
+            self.Y[period] = self.C[period] + self.G[period]
+    endogenous : list of strings
+        Names of the endogenous variables (with 'self.' prefix): references
+        to these variables, at any offset, are never lifted
+    name : string
+        Name of the array to look the values of the subexpressions up in
+    period : string
+        Name of the period index in `equations`
+
+    Returns
+    =======
+    lifted : list of strings
+        Copy of `equations`, with each largest right hand-side subexpression
+        that only refers to exogenous variables replaced with a lookup of the
+        form `precomputed[0, period]` (equations with nothing to lift are
+        unchanged)
+    expressions : list of strings
+        The lifted subexpressions, in the order of their rows in `name` (a
+        subexpression that appears more than once is only stored once)
+
+    Notes
+    =====
+    A subexpression is lifted if it consists only of arithmetic operations on
+    numbers and on at least one exogenous variable (see `arithmetic()`), such
+    that it can be evaluated for all the periods to solve before the solution
+    starts. For example:
+        self.N[period] = self.theta[period] * self.W[period] * self.E[period]
+    becomes:
+        self.N[period] = precomputed[0, period] * self.E[period]
+    with `self.theta[period] * self.W[period]` as expression 0.
+
+    Terms are not reordered: `self.E[period] * self.theta[period] *
+    self.W[period]` is evaluated as `(E * theta) * W` and has nothing to lift.
+
+    """
+    expressions = []
+    replaced = []
+
+    def exogenous(node):
+        if not isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            return False
+        if not arithmetic(node, period):
+            return False
+        references = [unparse(n.value) for n in ast.walk(node)
+                      if isinstance(n, ast.Subscript)]
+        return (len(references) > 0 and
+                not any(r in endogenous for r in references))
+
+    def replace(node):
+        if exogenous(node):
+            expression = unparse(node)
+            if expression not in expressions:
+                expressions.append(expression)
+            replaced.append(expression)
+            return ast.parse('%s[%d, %s]' % (
+                name, expressions.index(expression), period),
+                mode='eval').body
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, ast.expr):
+                setattr(node, field, replace(value))
+            elif isinstance(value, list):
+                setattr(node, field, [replace(v) if isinstance(v, ast.expr)
+                                      else v for v in value])
+        return node
+
+    lifted = []
+    for e in equations:
+        lhs, rhs = e.split('=', 1)
+        del replaced[:]
+        try:
+            node = replace(ast.parse(rhs.strip(), mode='eval').body)
+        except SyntaxError:
+            node = None
+        if len(replaced):
+            lifted.append('%s = %s' % (lhs.strip(), unparse(node)))
+        else:
+            lifted.append(e)
+    return lifted, expressions
+
+
+def collect(node, unknowns, period='period'):
+    """Collect the terms of the expression `node` by unknown.
+
+    Parameters
+    ==========
+    node : `ast` expression node
+        Expression to analyse
+    unknowns : list of strings
+        Names of the unknowns (see `linearise()`)
+    period : string
+        Name of the period index
+
+    Returns
+    =======
+    terms : Dictionary or `None`
+        Python expression for the coefficient on each unknown in `node`, plus
+        any known terms under the key `None`; `None` if `node` is not linear
+        in `unknowns`
+
+    """
+    if not depends(node, unknowns, period):
+        return {None: unparse(node)}
+    name = unknown(node, unknowns, period)
+    if name is not None:
+        return {name: '1'}
+    if isinstance(node, ast.UnaryOp) and isinstance(
+            node.op, (ast.UAdd, ast.USub)):
+        operand = collect(node.operand, unknowns, period)
+        if operand is None or isinstance(node.op, ast.UAdd):
+            return operand
+        return {k: negate(v) for k, v in operand.items()}
+    if not isinstance(node, ast.BinOp):
+        return None
+    left = collect(node.left, unknowns, period)
+    right = collect(node.right, unknowns, period)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, (ast.Add, ast.Sub)):
+        subtract = isinstance(node.op, ast.Sub)
+        terms = dict(left)
+        for k, v in right.items():
+            if k in terms:
+                terms[k] = combine(terms[k], '-' if subtract else '+', v)
+            elif subtract:
+                terms[k] = negate(v)
+            else:
+                terms[k] = v
+        return terms
+    if isinstance(node.op, ast.Mult):
+        if list(left.keys()) == [None]:
+            return {k: multiply(left[None], v) for k, v in right.items()}
+        if list(right.keys()) == [None]:
+            return {k: multiply(v, right[None]) for k, v in left.items()}
+        return None
+    if isinstance(node.op, ast.Div):
+        if list(right.keys()) == [None]:
+            return {k: combine(v, '/', right[None]) for k, v in left.items()}
+        return None
+    return None
+
+
+def depends(node, unknowns, period='period'):
+    """Return `True` if the expression `node` refers to any of `unknowns`."""
+    for n in ast.walk(node):
+        if unknown(n, unknowns, period) is not None:
+            return True
+    return False
+
+
+def unknown(node, unknowns, period='period'):
+    """Return the name of the unknown that `node` refers to, or `None`."""
+    if not isinstance(node, ast.Subscript):
+        return None
+    if unparse(index(node)) != period:
+        return None
+    name = unparse(node.value)
+    if name in unknowns:
+        return name
+    return None
+
+
+def negate(expression):
+    """Return a Python expression for minus `expression`."""
+    return combine('0', '-', expression)
+
+
+def multiply(a, b):
+    """Return a Python expression for the product of `a` and `b`."""
+    return combine(a, '*', b)
+
+
+def combine(a, operator, b):
+    """Return a Python expression for `a` `operator` `b`.
+
+    Parameters
+    ==========
+    a, b : strings
+        Python expressions
+    operator : string
+        One of '+', '-', '*', '/' or '**'
+
+    Returns
+    =======
+    expression : string
+        Python expression for the result: if `a` and `b` are both numbers,
+        the result itself; otherwise, the operation, simplified where `a` or
+        `b` is zero or one
+
+    """
+    x, y = number(a), number(b)
+    if x is not None and y is not None:
+        if operator == '+':
+            return format_number(x + y)
+        elif operator == '-':
+            return format_number(x - y)
+        elif operator == '*':
+            return format_number(x * y)
+        elif operator == '**':
+            if x > 0 or y == int(y):
+                return format_number(x ** y)
+        elif y != 0:
+            return format_number(x / y)
+    if operator == '+' and x == 0:
+        return b
+    if operator in ('+', '-') and y == 0:
+        return a
+    if operator == '-' and x == 0:
+        return '-%s' % (parenthesise(b))
+    if operator == '*' and x == 1:
+        return b
+    if operator in ('*', '/', '**') and y == 1:
+        return a
+    if operator == '*' and (x == 0 or y == 0):
+        return '0'
+    if operator == '/' and x == 0:
+        return '0'
+    if operator == '**' and y == 0:
+        return '1'
+    return '%s %s %s' % (parenthesise(a), operator, parenthesise(b))
+
+
+def parenthesise(expression):
+    """Return `expression`, in parentheses unless a name, number or call."""
+    node = ast.parse(expression, mode='eval').body
+    if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript,
+                         ast.Call) + LITERALS):
+        return expression
+    return '(%s)' % (expression)
+
+
+def number(expression):
+    """Return `expression` as a float if a numeric literal, else `None`."""
+    try:
+        return float(expression)
+    except ValueError:
+        return None
+
+
+def format_number(value):
+    """Return `value` as a Python literal, dropping any trailing '.0'."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def unparse(node):
+    """Return the Python source code for the expression `node`.
+
+    Uses `unparse()` where available (Python 3.9 and later) and
+    `to_source()` otherwise.
+
+    """
+    if hasattr(ast, 'unparse'):
+        return ast.unparse(node)
+    return to_source(node)
+
+
+def to_source(node, context=2):
+    """Return the Python source code for the expression `node`.
+
+    Parameters
+    ==========
+    node : `ast` expression node
+        Expression to convert back to source code
+    context : integer
+        Precedence of the surrounding expression: `node` is put in
+        parentheses if its own operator binds less tightly
+
+    Returns
+    =======
+    source : string
+        Python source code, formatted (and parenthesised) as by
+        `unparse()` in Python 3.9 and later
+
+    Notes
+    =====
+    This covers the expressions that make up model equations: names,
+    attributes, subscripts, literals, arithmetic, comparisons, boolean
+    operations, conditional expressions, calls, tuples and lists. Other
+    expressions raise a `ValueError`.
+
+    """
+    def wrap(source, precedence):
+        if context > precedence:
+            return '(%s)' % (source)
+        return source
+
+    def key(node):
+        elements = getattr(node, 'dims', None)
+        if isinstance(node, ast.Tuple):
+            elements = node.elts
+        if elements:
+            return ', '.join([key(e) for e in elements]) + (
+                ',' if len(elements) == 1 else '')
+        if isinstance(node, ast.Slice):
+            return ':'.join(['' if n is None else to_source(n)
+                             for n in (node.lower, node.upper)]) + (
+                '' if node.step is None else ':' + to_source(node.step))
+        return to_source(node)
+
+    if isinstance(node, INDEXES):
+        return to_source(node.value, context)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, LITERALS):
+        value = literal(node)
+        if value is Ellipsis:
+            return '...'
+        if isinstance(value, float) and value in (float('inf'),
+                                                  -float('inf')):
+            return repr(value).replace('inf', '1e309')
+        return repr(value)
+    if isinstance(node, ast.Attribute):
+        value = to_source(node.value, 16)
+        if (isinstance(node.value, LITERALS) and
+                isinstance(literal(node.value), int)):
+            value = value + ' '
+        return '%s.%s' % (value, node.attr)
+    if isinstance(node, ast.Subscript):
+        return '%s[%s]' % (to_source(node.value, 16), key(index(node)))
+    if isinstance(node, ast.BinOp):
+        operator, precedence = BINARY_OPERATORS[type(node.op)]
+        if isinstance(node.op, ast.Pow):
+            left, right = precedence + 1, precedence
+        else:
+            left, right = precedence, precedence + 1
+        return wrap('%s %s %s' % (to_source(node.left, left), operator,
+                                  to_source(node.right, right)), precedence)
+    if isinstance(node, ast.UnaryOp):
+        operator, precedence = UNARY_OPERATORS[type(node.op)]
+        return wrap(operator + to_source(node.operand, precedence),
+                    precedence)
+    if isinstance(node, ast.BoolOp):
+        operator, precedence = BOOLEAN_OPERATORS[type(node.op)]
+        return wrap((' %s ' % (operator)).join(
+            [to_source(v, precedence + 1 + i)
+             for i, v in enumerate(node.values)]), precedence)
+    if isinstance(node, ast.Compare):
+        source = [to_source(node.left, 7)]
+        for operator, comparator in zip(node.ops, node.comparators):
+            source = source + [COMPARISON_OPERATORS[type(operator)],
+                               to_source(comparator, 7)]
+        return wrap(' '.join(source), 6)
+    if isinstance(node, ast.IfExp):
+        return wrap('%s if %s else %s' % (
+            to_source(node.body, 3), to_source(node.test, 3),
+            to_source(node.orelse, 2)), 2)
+    if isinstance(node, ast.Call):
+        arguments = [to_source(a) for a in node.args] + [
+            '**' + to_source(k.value) if k.arg is None else
+            '%s=%s' % (k.arg, to_source(k.value)) for k in node.keywords]
+        return '%s(%s)' % (to_source(node.func, 16), ', '.join(arguments))
+    if isinstance(node, ast.Tuple):
+        elements = [to_source(e) for e in node.elts]
+        if len(elements) == 1:
+            return '(%s,)' % (elements[0])
+        return '(%s)' % (', '.join(elements))
+    if isinstance(node, ast.List):
+        return '[%s]' % (', '.join([to_source(e) for e in node.elts]))
+    raise ValueError(
+        'Unable to convert \'%s\' node to source code' % (
+            type(node).__name__))
+
+
+def literal(node):
+    """Return the value of the literal `node` (see `LITERALS`)."""
+    for field in ('value', 'n', 's'):
+        if hasattr(node, field):
+            return getattr(node, field)
+    return None
+
+
+def index(node):
+    """Return the index expression of the subscript `node`."""
+    if isinstance(node.slice, INDEXES):
+        return node.slice.value
+    return node.slice
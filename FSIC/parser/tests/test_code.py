@@ -30,7 +30,24 @@ def test_one_line_hardcoded_parameter():
 def test_one_line_with_function():
     block = 'PQ = max(Q, PQ[-1])'
     assert FSIC.parser.code.translate(block) == (
-        'self.PQ[period] = max(self.Q[period], self.PQ[period-1])')
+        'self.PQ[period] = functions.max(self.Q[period], self.PQ[period-1])')
+
+
+def test_one_line_with_helpers():
+    block = 'I = 0.5 * diff(Y) + lag(I, 2) + abs(lead(G))'
+    assert FSIC.parser.code.translate(block) == (
+        'self.I[period] = 0.5 * (self.Y[period] - self.Y[period-1]) + '
+        'self.I[period-2] + functions.abs(self.G[period+1])')
+
+
+def test_expand():
+    assert FSIC.parser.code.expand('I = 0.5 * diff(Y) + lag(I)') == (
+        'I = 0.5 * (Y - Y[-1]) + I[-1]')
+    assert FSIC.parser.code.expand('Z = diff(Y, 4) + lead(X, 0)') == (
+        'Z = (Y - Y[-4]) + X')
+    # Not a helper call
+    assert FSIC.parser.code.expand('Z = lagged(Y) + x.lag(Y)') == (
+        'Z = lagged(Y) + x.lag(Y)')
 
 
 def test_one_line_no_lag_custom_period():
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+
+import ast
+
+import numpy as np
+from numpy import exp, log
+
+from FSIC.model import functions
+from FSIC.parser.symbolic import jacobian, linearise, linear_system
+from FSIC.parser.symbolic import lift, to_source, vectorisable
+
+
+def test_linearise():
+    assert linearise(
+        'self.Y[period] = self.C[period] + self.G[period]',
+        ['self.C', 'self.Y']) == (
+            {'self.C': '1', 'self.Y': '-1'}, 'self.G[period]')
+
+
+def test_linearise_coefficients():
+    coefficients, constant = linearise(
+        'self.T_d[period] = self.theta[period] * self.W[period] * '
+        'self.N_s[period]',
+        ['self.N_s', 'self.T_d'])
+    assert coefficients == {
+        'self.N_s': 'self.theta[period] * self.W[period]',
+        'self.T_d': '-1'}
+    assert constant == '0'
+
+
+def test_linearise_division():
+    coefficients, constant = linearise(
+        'self.N_d[period] = self.Y[period] / self.W[period]',
+        ['self.N_d', 'self.Y'])
+    assert coefficients == {'self.N_d': '-1', 'self.Y': '1 / self.W[period]'}
+
+
+def test_linearise_collect_terms():
+    coefficients, constant = linearise(
+        'self.X[period] = -self.Y[period] + '
+        '3 * (self.Y[period] - self.X[period]) + 2',
+        ['self.X', 'self.Y'])
+    assert coefficients == {'self.X': '-4', 'self.Y': '2'}
+    assert constant == '2'
+
+
+def test_linearise_lags():
+    # Lagged values of the unknowns are known
+    coefficients, constant = linearise(
+        'self.H_h[period] = self.H_h[period - 1] + self.YD[period] - '
+        'self.C_d[period]',
+        ['self.C_d', 'self.H_h', 'self.YD'])
+    assert coefficients == {
+        'self.C_d': '-1', 'self.H_h': '-1', 'self.YD': '1'}
+    assert constant == 'self.H_h[period - 1]'
+
+
+def test_linearise_non_linear():
+    unknowns = ['self.C', 'self.Y']
+    for equation in [
+            'self.Y[period] = self.C[period] * self.Y[period]',
+            'self.Y[period] = 1 / self.C[period]',
+            'self.Y[period] = self.C[period] ** 2',
+            'self.Y[period] = max(self.C[period], 0)', ]:
+        assert linearise(equation, unknowns) is None
+
+
+def test_linear_system():
+    equations = [
+        'self.C[period] = 0.5 * self.Y[period]',
+        'self.Y[period] = self.C[period] + self.G[period]', ]
+    coefficients, constants = linear_system(equations, ['self.C', 'self.Y'])
+    assert coefficients == [['-1', '0.5'], ['1', '-1']]
+    assert constants == ['0', 'self.G[period]']
+    assert linear_system(
+        equations + ['self.X[period] = self.Y[period] ** 2'],
+        ['self.C', 'self.X', 'self.Y']) is None
+
+
+class Values:
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, {'period': value})
+
+
+def check_jacobian(equation, unknowns, values, step=1.0e-6):
+    # Compare the analytic derivatives with central differences
+    derivatives = jacobian(equation, ['self.' + u for u in unknowns])
+    lhs, rhs = equation.split('=', 1)
+    residual = '(%s) - (%s)' % (rhs, lhs)
+    for u in unknowns:
+        expected = []
+        for shift in [step, -step]:
+            shifted = dict(values)
+            shifted[u] = values[u] + shift
+            expected.append(eval(residual, {'self': Values(**shifted),
+                                            'period': 'period', 'np': np,
+                                            'exp': exp, 'log': log,
+                                            'functions': functions}))
+        expected = (expected[0] - expected[1]) / (2 * step)
+        actual = eval(derivatives.get('self.' + u, '0'),
+                      {'self': Values(**values), 'period': 'period',
+                       'np': np, 'exp': exp, 'log': log,
+                       'functions': functions})
+        assert np.isclose(actual, expected, rtol=1.0e-5, atol=1.0e-8)
+
+
+def test_jacobian():
+    assert jacobian('self.Y[period] = self.C[period] + self.G[period]',
+                    ['self.C', 'self.Y']) == {'self.C': '1', 'self.Y': '-1'}
+    # Lags are constants
+    assert jacobian('self.H[period] = self.H[period - 1] + self.Y[period]',
+                    ['self.H', 'self.Y']) == {'self.H': '-1', 'self.Y': '1'}
+    # Terms that cancel are omitted
+    assert jacobian('self.Y[period] = self.C[period] - self.C[period]',
+                    ['self.C', 'self.Y']) == {'self.Y': '-1'}
+
+
+def test_jacobian_numerical():
+    values = {'C': 1.5, 'G': 0.5, 'Y': 2.0}
+    for equation in [
+            'self.Y[period] = self.C[period] * self.G[period] * '
+            'self.Y[period]',
+            'self.Y[period] = self.C[period] / (1 + self.Y[period])',
+            'self.Y[period] = -self.C[period] ** 2 + self.Y[period] ** 0.5',
+            'self.Y[period] = self.C[period] ** self.Y[period]',
+            'self.Y[period] = exp(0.5 * self.C[period]) + log(self.Y[period])',
+            'self.Y[period] = np.exp(self.C[period] / self.Y[period])',
+            'self.Y[period] = max(self.C[period], 2 * self.G[period])',
+            'self.Y[period] = min(self.C[period], self.Y[period] ** 2)',
+            'self.Y[period] = functions.max(self.C[period], self.G[period])',
+            'self.Y[period] = functions.abs(self.G[period] - self.C[period])',
+            'self.Y[period] = functions.where(self.C[period] > 1, '
+            'self.C[period] * self.Y[period], self.G[period])', ]:
+        check_jacobian(equation, ['C', 'G', 'Y'], values)
+
+
+def test_jacobian_unsupported():
+    assert jacobian('self.Y[period] = f(self.C[period])',
+                    ['self.C', 'self.Y']) is None
+    assert jacobian('self.Y[period] = self.C[period] % 2',
+                    ['self.C', 'self.Y']) is None
+    # Unsupported functions of known terms are fine
+    assert jacobian('self.Y[period] = f(self.G[period]) + self.C[period]',
+                    ['self.C', 'self.Y']) == {'self.C': '1', 'self.Y': '-1'}
+
+
+def test_vectorisable():
+    for equation in [
+            'self.R[period] = self.S[period] / self.Y[period]',
+            'self.Z[period] = -2 * self.Y[period-1] + self.X[period + 1]',
+            'self.Z[period] = self.Y[period] ** 0.5',
+            'self.Z[period] = functions.max(self.Y[period], 0)',
+            'self.Z[period] = functions.where(self.Y[period] > 0, '
+            'functions.log(self.Y[period]), 0)', ]:
+        assert vectorisable(equation)
+    for equation in [
+            'self.Z[period] = max(self.Y[period], 0)',
+            'self.Z[period] = self.Y[2000]',
+            'self.Z[period] = self.Y[period - self.k[period]]',
+            'self.Z[period] = self.Y',
+            'self.Z[period] = self.Y[period] if self.X[period] else 0',
+            'self.Z[period] = functions.round(self.Y[period])',
+            'self.Z[period] = functions.where(0 < self.Y[period] < 1, 1, 0)',
+            'self.Z[period] = functions.max(self.Y[period], key=abs)', ]:
+        assert not vectorisable(equation)
+
+
+def test_lift():
+    equations = [
+        'self.T[period] = self.tau[period] * self.W[period] * self.N[period]',
+        'self.N[period] = (1 - self.alpha[period]) * self.G[period] + '
+        'self.T[period-1]',
+        'self.Y[period] = max(-self.G[period-1], self.N[period])',
+        'self.Z[period] = self.N[period] * self.tau[period] * self.W[period]',
+        'self.R[period] = self.tau[period] * self.W[period] / self.N[period]',
+        'self.S[period] = self.G[period]', ]
+    lifted, expressions = lift(
+        equations, ['self.N', 'self.R', 'self.S', 'self.T', 'self.Y',
+                    'self.Z'])
+    assert expressions == [
+        'self.tau[period] * self.W[period]',
+        '(1 - self.alpha[period]) * self.G[period]',
+        '-self.G[period - 1]']
+    assert lifted == [
+        'self.T[period] = precomputed[0, period] * self.N[period]',
+        'self.N[period] = precomputed[1, period] + self.T[period - 1]',
+        'self.Y[period] = max(precomputed[2, period], self.N[period])',
+        # Terms are not reordered: nothing to lift
+        equations[3],
+        # Shared with the first equation
+        'self.R[period] = precomputed[0, period] / self.N[period]',
+        # A variable on its own is not worth lifting
+        equations[5], ]
+
+
+def test_to_source():
+    # Expressions as formatted by `ast.unparse()` in Python 3.9 and later
+    for expression in [
+            'self.Y[period - 1] + 0.5 * self.C[period]',
+            '(1 - self.alpha[period]) * self.G[period]',
+            'self.alpha[period] ** (-1) - (-self.Y[period]) ** 2',
+            '-self.Y[period] ** 2',
+            'a - (b - c) / (d * e) // f % g',
+            'a ** b ** c + (a ** b) ** c',
+            'functions.where(self.Y[period] > 0, 1e309, 1.5e-08)',
+            'functions.max(self.Y[period], key=abs, **kwargs)',
+            'a if not b or (c and d) else e if 0 < f <= 1 else g',
+            "1 .real + x[1:2, ::3] + x['a',] + x[a, b]",
+            '(a, b) + (c,) + [d, e]', ]:
+        node = ast.parse(expression, mode='eval').body
+        assert to_source(node) == expression
+    # Redundant parentheses are dropped
+    for expression, expected in [
+            ('(self.Y[period])', 'self.Y[period]'),
+            ('(a + b) + c', 'a + b + c'),
+            ('(-a) + (b * c)', '-a + b * c'), ]:
+        node = ast.parse(expression, mode='eval').body
+        assert to_source(node) == expected
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
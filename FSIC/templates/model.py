@@ -10,6 +10,7 @@ ___FSIC_VERSION___
 
 import argparse
 import os
+import time
 
 import numpy as np
 from pandas import Period, PeriodIndex
@@ -19,6 +20,7 @@ import pandas as pd
 from FSIC import __version__ as version
 
 from FSIC.model.model import Model
+from FSIC.model import functions
 from FSIC.settings import dtype
 import FSIC.cli.parsers
 
@@ -31,25 +33,30 @@ class ___MODEL___(Model):
 
     """
 
+    ___VARIABLES___
+
     def __init__(self):
         Model.__init__(self)
         ___MODEL_VERSION___
 
-    def initialise(self, span, past=None, default=0.0):
+    def initialise(self, span, past=None, default=0.0, scenarios=None):
         """Initialise the model for solution.
 
         Parameters
         ==========
-        span : pandas PeriodIndex object
+        span : pandas PeriodIndex object, or list or range of integers
             The index to set the principal span of the model (used as part of
             the index for individual variable Series objects)
-        past : pandas PeriodIndex object or `None`
+        past : pandas PeriodIndex object, list or range of integers, or `None`
             The index to set the preceding span of the model (may be necessary
             to supply enough lags for dynamic models; added to the beginning of
             `span`)
             If `None`, only use `span` to set the span of the model solution
         default : float
             Value to initialise variable Series objects with
+        scenarios : integer, list or `None`
+            Number of scenarios, or a list of scenario labels, to solve at once
+            (only used in 'batch' storage mode: if `None`, solve one scenario)
 
         Notes
         =====
@@ -57,10 +64,25 @@ class ___MODEL___(Model):
         as an example):
             self.C_d = Series(default, index=self.full_span, dtype=np.float64)
 
+        In 'array' storage mode, all variables are held in a single array,
+        `self.values`, with one row per variable (in the order of
+        `ENDOGENOUS + EXOGENOUS`) and one column per period. The variables are
+        then Series views of the rows of that array:
+            self.C_d = Series(self.values[0], index=self.full_span, copy=False)
+
+        In 'batch' storage mode, `self.values` has a third axis, for scenarios,
+        and the variables are DataFrame views, with one column per scenario:
+            self.C_d = DataFrame(self.values[0], index=self.full_span,
+                                 columns=self.scenarios, copy=False)
+
         Note that, in the calls below, the value passed as an argument to
         `dtype` is imported from FSIC, to centralise the preferred numeric
         variable type.
 
+        If `span` (and `past`) are integers (e.g. years) rather than periods,
+        the model index is a range of integers, which is faster to convert
+        to and from positions (see FSIC.model.model.Model.get_position()).
+
         """
         # Store function arguments
         self.span = span
@@ -70,9 +92,12 @@ class ___MODEL___(Model):
             start = min(self.span)
         else:
             start = min(self.past)
-        self.full_span = PeriodIndex(
-            start=start,
-            end=max(self.span))
+        if isinstance(start, (int, np.integer)):
+            self.full_span = pd.Index(range(start, max(self.span) + 1))
+        else:
+            self.full_span = PeriodIndex(
+                start=start,
+                end=max(self.span))
         # Initialise `iter`
         self.iter = Series(default, index=self.full_span, dtype=dtype)
         # Initialise model variables
@@ -86,24 +111,37 @@ class ___MODEL___(Model):
 
         Parameters
         ==========
-        period : Series index
-            The identifier of the period to solve
+        period : integer
+            The position of the period to solve in `self.full_span`
 
         Notes
         =====
         Equation statements take the form (usng the variable C_s as an example):
-            self.C_s[period] = self.C_d[period]
+            self.C_s.iat[period] = self.C_d.iat[period]
+
+        In 'array' storage mode, equations operate on the rows of
+        `self.values`, with `period` as the column position:
+            values[1, period] = values[0, period]
+
+        If the model was built with a kernel, this method instead passes
+        `self.values` and the column position to the static `kernel()` method,
+        which solves the equations on local variables:
+            _C_s = _C_d
 
         """
         ___SOLVE_EQUATIONS___
 
+    ___SOLVE_KERNEL___
+
+    ___SOLVE_BLOCKS___
+
     def get_endogenous_variable_values(self, period):
         """Return the current values of the endogenous variables.
 
         Parameters
         ==========
-        period : Series index
-            The identifier of the period to solve
+        period : integer
+            The position of the period in `self.full_span`
 
         Returns
         =======
@@ -114,12 +152,78 @@ class ___MODEL___(Model):
         =====
         Endogenous variable value-extraction statements take the form (using the
         variable C_d as an example):
-            values['C_d'] = self.C_d[period]
+            values['C_d'] = self.C_d.iat[period]
+
+        In 'array' storage mode, the values are a slice of `self.values`.
 
         """
-        values = {}
         ___GET_ENDOGENOUS_VARIABLE_VALUES___
-        return Series(values)
+
+    def store_endogenous_variable_values(self, period, out):
+        """Copy the current values of the endogenous variables into `out`.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to copy values from
+        out : NumPy array
+            Preallocated array with one element per endogenous variable, in the
+            order of `ENDOGENOUS`
+
+        Notes
+        =====
+        Endogenous variable value-copying statements take the form (using the
+        variable C_d as an example):
+            out[0] = self.C_d.iat[period]
+
+        In 'array' storage mode, the values are copied in a single slice
+        assignment from `self.values`.
+
+        """
+        ___STORE_ENDOGENOUS_VARIABLE_VALUES___
+
+    def load_endogenous_variable_values(self, period, values):
+        """Set the endogenous variables for `period` to the contents of `values`.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to update
+        values : NumPy array
+            Array with one element per endogenous variable, in the order of
+            `ENDOGENOUS`
+
+        Notes
+        =====
+        Endogenous variable value-setting statements take the form (using the
+        variable C_d as an example):
+            self.C_d.iat[period] = values[0]
+
+        """
+        ___LOAD_ENDOGENOUS_VARIABLE_VALUES___
+
+    def get_residuals(self, period, out):
+        """Evaluate the model equations for `period` as residuals.
+
+        Parameters
+        ==========
+        period : integer
+            The position of the period to evaluate
+        out : NumPy array
+            Preallocated array with one element per equation, to store the
+            differences between the right and left hand-sides of the equations
+
+        Notes
+        =====
+        Unlike `solve_equations()`, this method does not modify the model
+        variables. Residual statements take the form (using the variable C_s as
+        an example):
+            out[1] = (self.C_d.iat[period]) - self.C_s.iat[period]
+
+        """
+        ___GET_RESIDUALS___
+
+    ___GET_JACOBIAN___
 
     def get_results(self):
         """Return the results from the model solution.
@@ -140,10 +244,11 @@ class ___MODEL___(Model):
                 'C_d': self.C_d,
                 'C_s': self.C_s,})
 
+        In 'batch' storage mode, the results of the individual scenarios are
+        stacked, with the scenario labels as the first level of the index.
+
         """
         ___GET_RESULTS___
-        results['iter'] = self.iter
-        return results
 
 
 # Create top-level parser
@@ -243,7 +348,12 @@ if __name__ == '__main__' and get_ipython() == None:
             exec(expressions)
         # Solve
         if model.initialised:
-            model.solve()
+            model.solve(diagnostics=args.verbose,
+                        mode='static' if args.static else 'dynamic')
+            if args.verbose:
+                with pd.option_context('display.max_rows', None,
+                                       'display.width', 120):
+                    print(model.diagnostics.to_frame())
         # Write results
         if args.output is not None:
             if model.initialised:
@@ -10,10 +10,17 @@ macroeconomic model.
 
 import configparser
 import os
+import re
 
 from FSIC import __version__ as version
 
 
+# Statement to define the timer for the profiling counters of generated
+# methods (see `Build.instrument()`): `time.perf_counter()` is only available
+# from Python 3.3
+TIMER = 'timer = getattr(time, \'perf_counter\', time.time)'
+
+
 class Build:
     """FSIC class to generate macroeconomic models from user-supplied inputs.
 
@@ -98,7 +105,10 @@ class Build:
         """
         self.chunks = self.chunks + chunks
 
-    def build(self, optimise=True):
+    def build(self, optimise=True, storage='series', blocks=False,
+              kernel=False, profile=False, linear=False, jacobian=False,
+              worklist=False, epilogue=False, precompute=False,
+              static=False):
         """Build the final model script and return as a string.
 
         Parameters
@@ -107,6 +117,76 @@ class Build:
             If `True`, attempt to optimise the equation order to achieve a
             'more-recursive' system, to reduce the number of iterations to
             convergence.
+        storage : string
+            How to store the model variables:
+                'series' : one pandas Series per variable (the default)
+                'array' : a single (variables x periods) NumPy array,
+                          `self.values`, with one row per variable; the
+                          variable attributes (e.g. `self.C_d`) are Series
+                          views of the corresponding rows
+                'batch' : as for 'array' but with a third (scenario) axis,
+                          such that the model solves multiple scenarios at
+                          once; the number (or labels) of the scenarios are
+                          set in the call to `initialise()` and the variable
+                          attributes are DataFrame views, with one column per
+                          scenario
+        blocks : boolean
+            If `True`, partition the model into blocks (the strongly connected
+            components of the equation graph) such that only the simultaneous
+            blocks are solved iteratively.
+        kernel : boolean
+            If `True`, generate a static `kernel()` method to solve the model
+            equations on local variables, rather than by indexing into the
+            model variables, and use it in `solve_equations()` (and any block
+            methods); only available in 'array' and 'batch' storage modes (see
+            `build_kernel()`)
+        profile : boolean
+            If `True`, instrument each equation in the generated solution code
+            with counters of the number of evaluations, the time taken and the
+            change in the left hand-side variable (see `instrument()` and
+            FSIC.model.model.Model.get_profile()); the default, uninstrumented,
+            build is unaffected. Epilogue equations (see `epilogue`) are not
+            instrumented
+        linear : boolean
+            If `True`, identify the simultaneous blocks that are linear in
+            their endogenous variables and generate code to set up each one as
+            a system of linear equations, to be solved directly rather than
+            iteratively (see `build_blocks()` and
+            FSIC.model.model.Model.solve_linear()); requires `blocks=True`
+        jacobian : boolean
+            If `True`, differentiate the model equations with respect to the
+            endogenous variables and generate a `get_jacobian()` method to
+            evaluate the (sparse) Jacobian analytically, for the Newton and
+            Broyden solution methods (see `build_jacobian()` and
+            FSIC.model.model.Model.estimate_jacobian()); not available in
+            'batch' storage mode
+        worklist : boolean
+            If `True`, generate one method per equation, and an index of the
+            equations that depend on each one, for dependency-driven
+            Gauss-Seidel iteration (see `build_worklist()` and
+            FSIC.model.model.Model.worklist())
+        epilogue : boolean
+            If `True`, take the equations that feed nothing back into the rest
+            of the model (e.g. reporting aggregates and ratios) out of the
+            period-by-period solution and generate a `solve_epilogue()` method
+            to solve them once, over the whole solution span at once, after
+            the rest of the model (see `build_epilogue()` and
+            FSIC.optimise.order.epilogue())
+        precompute : boolean
+            If `True`, replace the subexpressions of the equations that only
+            refer to exogenous variables (e.g. `(1 - alpha) * G`) with
+            lookups of values calculated once, over all the periods to solve,
+            before the solution starts, rather than in every iteration of
+            every period (see `build_precompute()` and
+            FSIC.parser.symbolic.lift())
+        static : boolean
+            If `True`, generate a `sweep_static()` method to solve the model
+            equations for a span of periods at once, with lags and leads fixed
+            at their values before the solution, for static (one-step-ahead)
+            simulation with `Model.solve(mode='static')` (see `build_static()`
+            and FSIC.model.model.Model.solve_static()); requires every
+            equation to be vectorisable (see
+            FSIC.parser.symbolic.vectorisable())
 
         See also
         ========
@@ -118,13 +198,20 @@ class Build:
         with open(self.model_template, 'rt') as f:
             script = f.read()
         # Insert code and other information into template
-        script = self.insert_code(script, optimise=optimise)
+        script = self.insert_code(
+            script, optimise=optimise, storage=storage, blocks=blocks,
+            kernel=kernel, profile=profile, linear=linear, jacobian=jacobian,
+            worklist=worklist, epilogue=epilogue, precompute=precompute,
+            static=static)
         # Insert other information
         script = self.insert_info(script)
         # Return
         return script
 
-    def insert_code(self, script, optimise=True):
+    def insert_code(self, script, optimise=True, storage='series',
+                    blocks=False, kernel=False, profile=False, linear=False,
+                    jacobian=False, worklist=False, epilogue=False,
+                    precompute=False, static=False):
         """Insert Python code blocks into script.
 
         Parameters
@@ -135,6 +222,35 @@ class Build:
             If `True`, attempt to optimise the equation order to achieve a
             'more-recursive' system, to reduce the number of iterations to
             convergence.
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch' (see `build()`)
+        blocks : boolean
+            If `True`, partition the model into separately-solved blocks (see
+            `build()`)
+        kernel : boolean
+            If `True`, solve the model equations with a generated `kernel()`
+            method (see `build()`)
+        profile : boolean
+            If `True`, instrument the equations with profiling counters (see
+            `build()`)
+        linear : boolean
+            If `True`, generate code to solve linear simultaneous blocks
+            directly (see `build()`)
+        jacobian : boolean
+            If `True`, generate code to evaluate the Jacobian analytically
+            (see `build()`)
+        worklist : boolean
+            If `True`, generate code for dependency-driven iteration (see
+            `build()`)
+        epilogue : boolean
+            If `True`, solve the downstream-only equations over the whole
+            span, after the rest of the model (see `build()`)
+        precompute : boolean
+            If `True`, calculate the exogenous subexpressions of the equations
+            before the solution starts (see `build()`)
+        static : boolean
+            If `True`, generate code to solve the model equations over a span
+            of periods at once, with fixed lags and leads (see `build()`)
 
         Returns
         =======
@@ -144,14 +260,43 @@ class Build:
         See also
         ========
         parse_chunks()
+        build_variables()
         build_initialise()
+        build_equations()
         build_endogenous_variables()
+        build_store_endogenous_variables()
+        build_load_endogenous_variables()
+        build_residuals()
+        build_jacobian()
+        build_blocks()
+        build_worklist()
+        build_epilogue()
+        build_precompute()
+        build_static()
+        build_kernel()
         build_results()
+        parse_sources()
+        instrument()
 
         FSIC.optimise.order.recursive()
+        FSIC.optimise.order.blocks()
+        FSIC.optimise.order.epilogue()
+        FSIC.parser.symbolic.lift()
         FSIC.utilities.string.indent_lines()
 
         """
+        if storage not in ('series', 'array', 'batch'):
+            raise ValueError(
+                'Unrecognised storage argument \'%s\'' % (storage))
+        if kernel and storage == 'series':
+            raise ValueError(
+                'Kernel generation requires \'array\' or \'batch\' storage')
+        if linear and not blocks:
+            raise ValueError(
+                'Linear block solution requires `blocks=True`')
+        if jacobian and storage == 'batch':
+            raise ValueError(
+                'Analytic Jacobian requires \'series\' or \'array\' storage')
         # Generate class code, optimising as necessary
         equations = self.parse_chunks()
         if optimise:
@@ -163,20 +308,178 @@ class Build:
                 equations = equations.splitlines()
                 equations = recursive(equations)
                 equations = '\n'.join(equations)
-        initialise = self.build_initialise(equations)
-        endogenous = self.build_endogenous_variables(equations)
-        results = self.build_results(equations)
+        if blocks:
+            from FSIC.optimise.order import blocks as partition
+            partitioned = partition(equations.splitlines())
+            equations = '\n'.join(['\n'.join(b['equations'])
+                                   for b in partitioned])
+        else:
+            partitioned = []
+        # Separate the epilogue (downstream-only) equations from those to
+        # solve period by period
+        if epilogue:
+            from FSIC.optimise.order import epilogue as downstream
+            from FSIC.parser.symbolic import vectorisable
+            lines = equations.splitlines()
+            moved = downstream(
+                lines, exclude=[e for e in lines if not vectorisable(e)],
+                warn=False)
+            core = '\n'.join([e for e in lines if e not in moved])
+            partitioned = [
+                {'equations': [e for e in b['equations'] if e not in moved],
+                 'simultaneous': b['simultaneous']}
+                for b in partitioned]
+            partitioned = [b for b in partitioned if len(b['equations'])]
+        else:
+            moved = []
+            core = equations
+        # Position of each equation to solve period by period in the
+        # profiling array (one row per equation, including any repeats)
+        rows = [i for i, e in enumerate(equations.splitlines())
+                if e not in moved]
+        # Lift the exogenous subexpressions out of the equations to solve
+        # period by period
+        if precompute:
+            from FSIC.parser.code import identify_variables
+            from FSIC.parser.symbolic import lift
+            lines = core.splitlines()
+            lifted, expressions = lift(
+                lines, identify_variables(equations)['endogenous'])
+            substitutions = dict(zip(lines, lifted))
+            core = '\n'.join(lifted)
+        else:
+            expressions = []
+            substitutions = {}
+        variables = self.build_variables(equations, storage=storage)
+        initialise = self.build_initialise(equations, storage=storage)
+        if profile:
+            # Source chunk of each equation, in solution order
+            sources = {}
+            for identifier, e in self.parse_sources():
+                sources.setdefault(e, identifier)
+            variables = variables + '\nPROFILE = [\n\t' + ',\n\t'.join(
+                [repr(sources.get(e)) for e in equations.splitlines()]) + ']'
+            solve_code = self.instrument(core, rows, storage=storage)
+            prologue = [TIMER]
+        else:
+            solve_code = core
+            prologue = []
+        if kernel:
+            arguments = 'values, t'
+            solve = 'self.kernel(self.values, period'
+            if len(expressions):
+                arguments = arguments + ', precomputed'
+                solve = solve + ', self.precomputed'
+            if profile:
+                arguments = arguments + ', profile'
+                solve = solve + ', self.profile'
+            solve = solve + ')'
+            kernel_method = '\n'.join([
+                '@staticmethod',
+                'def kernel(%s):' % (arguments),
+                '\t"""Solve the model equations in `values` for column `t`."""',
+                '\t' + '\n'.join(prologue + [self.build_kernel(
+                    solve_code, storage=storage,
+                    variables=self.get_variables(equations))]).replace(
+                        '\n', '\n\t')])
+        else:
+            if profile:
+                prologue = ['profile = self.profile'] + prologue
+            solve = '\n'.join(prologue + [self.build_equations(
+                solve_code, storage=storage,
+                variables=self.get_variables(equations))])
+            kernel_method = ''
+        attributes, methods = self.build_blocks(
+            partitioned, equations, storage=storage, kernel=kernel,
+            profile=profile, linear=linear, substitutions=substitutions,
+            rows=rows)
+        variables = variables + '\n' + attributes
+        if worklist:
+            attributes, equation_methods = self.build_worklist(
+                core, storage=storage,
+                variables=self.get_variables(equations),
+                rows=rows if profile else None)
+            variables = variables + '\n' + attributes
+            methods = '\n\n'.join([m for m in [methods, equation_methods]
+                                   if len(m)])
+        if len(moved):
+            attributes, epilogue_method = self.build_epilogue(
+                '\n'.join(moved), storage=storage,
+                variables=self.get_variables(equations))
+            variables = variables + '\n' + attributes
+            methods = '\n\n'.join([m for m in [methods, epilogue_method]
+                                   if len(m)])
+        if len(expressions):
+            attributes, precompute_method = self.build_precompute(
+                expressions, storage=storage,
+                variables=self.get_variables(equations))
+            variables = variables + '\n' + attributes
+            methods = '\n\n'.join([m for m in [methods, precompute_method]
+                                   if len(m)])
+        if static:
+            attributes, static_method = self.build_static(
+                equations, storage=storage,
+                variables=self.get_variables(equations))
+            variables = variables + '\n' + attributes
+            methods = '\n\n'.join([m for m in [methods, static_method]
+                                   if len(m)])
+        endogenous = self.build_endogenous_variables(
+            equations, storage=storage)
+        store = self.build_store_endogenous_variables(
+            equations, storage=storage)
+        load = self.build_load_endogenous_variables(
+            equations, storage=storage)
+        residuals = self.build_residuals(equations, storage=storage)
+        if jacobian:
+            pattern, jacobian_method = self.build_jacobian(
+                equations, storage=storage)
+            variables = variables + '\n' + pattern
+        else:
+            jacobian_method = ''
+        results = self.build_results(equations, storage=storage)
         # Insert into `script`
         from FSIC.utilities.string import indent_lines
+        script = script.replace(
+            '___VARIABLES___',
+            indent_lines(variables, num_tabs=1, skip_first_line=True))
         script = script.replace(
             '___INITIALISE___',
             indent_lines(initialise, num_tabs=2, skip_first_line=True))
         script = script.replace(
             '___SOLVE_EQUATIONS___',
-            indent_lines(equations, num_tabs=2, skip_first_line=True))
+            indent_lines(solve, num_tabs=2, skip_first_line=True))
+        if len(kernel_method):
+            kernel_method = indent_lines(
+                kernel_method, num_tabs=1, skip_first_line=True)
+            kernel_method = re.sub(r'\n[ ]+\n', '\n\n', kernel_method)
+            script = script.replace('___SOLVE_KERNEL___', kernel_method)
+        else:
+            script = script.replace('    ___SOLVE_KERNEL___\n\n', '')
+        if len(methods):
+            methods = indent_lines(methods, num_tabs=1, skip_first_line=True)
+            methods = re.sub(r'\n[ ]+\n', '\n\n', methods)
+            script = script.replace('___SOLVE_BLOCKS___', methods)
+        else:
+            script = script.replace('    ___SOLVE_BLOCKS___\n\n', '')
         script = script.replace(
             '___GET_ENDOGENOUS_VARIABLE_VALUES___',
             indent_lines(endogenous, num_tabs=2, skip_first_line=True))
+        script = script.replace(
+            '___STORE_ENDOGENOUS_VARIABLE_VALUES___',
+            indent_lines(store, num_tabs=2, skip_first_line=True))
+        script = script.replace(
+            '___LOAD_ENDOGENOUS_VARIABLE_VALUES___',
+            indent_lines(load, num_tabs=2, skip_first_line=True))
+        script = script.replace(
+            '___GET_RESIDUALS___',
+            indent_lines(residuals, num_tabs=2, skip_first_line=True))
+        if len(jacobian_method):
+            jacobian_method = indent_lines(
+                jacobian_method, num_tabs=1, skip_first_line=True)
+            jacobian_method = re.sub(r'\n[ ]+\n', '\n\n', jacobian_method)
+            script = script.replace('___GET_JACOBIAN___', jacobian_method)
+        else:
+            script = script.replace('    ___GET_JACOBIAN___\n\n', '')
         script = script.replace(
             '___GET_RESULTS___',
             indent_lines(results, num_tabs=2, skip_first_line=True))
@@ -311,13 +614,61 @@ self.FSIC_BUILD = \'%s\'
         # Return
         return code
 
-    def build_initialise(self, code):
+    def build_variables(self, code, storage='series'):
+        """Return code to define the variable lists of a model class.
+
+        Parameters
+        ==========
+        code : string
+            Code script containing all model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+
+        Returns
+        =======
+        variables : string
+            Python code to define the class attributes `STORAGE`, `ENDOGENOUS`,
+            `EXOGENOUS`, `MAX_LAG`, `MAX_LEAD` (see `get_offsets()`) and
+            `EQUATIONS` (the translated equations, in solution order)
+
+        Notes
+        =====
+        In 'array' storage mode, the row of each variable in `self.values` is
+        its position in `ENDOGENOUS + EXOGENOUS`.
+
+        See also
+        ========
+        get_offsets()
+
+        FSIC.parser.code.identify_variables()
+
+        """
+        from FSIC.parser.code import identify_variables
+        variables = identify_variables(code)
+        lines = ['STORAGE = \'%s\'' % (storage)]
+        for k in ['endogenous', 'exogenous']:
+            names = [v.replace('self.', '') for v in variables[k]]
+            lines.append(
+                k.upper() + ' = [' +
+                ', '.join(['\'' + n + '\'' for n in names]) + ']')
+        max_lag, max_lead = self.get_offsets(code)
+        lines.append('MAX_LAG = %d' % (max_lag))
+        lines.append('MAX_LEAD = %d' % (max_lead))
+        lines.append(
+            'EQUATIONS = [\n\t' +
+            ',\n\t'.join([repr(e) for e in code.splitlines()]) + ']')
+        variables = '\n'.join(lines)
+        return variables
+
+    def build_initialise(self, code, storage='series'):
         """Return code to initialise the variables of a model.
 
         Parameters
         ==========
         code : string
             Code script containing all model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
 
         Returns
         =======
@@ -332,25 +683,921 @@ self.FSIC_BUILD = \'%s\'
         from FSIC.parser.code import identify_variables
         variables = identify_variables(code)
         variables = variables['endogenous'] + variables['exogenous']
-        initialise = [v + (' = Series(default, '
-                           'index=self.full_span, '
-                           'dtype=dtype)')
-                      for v in variables]
+        if storage == 'array':
+            initialise = [(
+                'self.values = np.full((%d, len(self.full_span)), default, '
+                'dtype=dtype)' % (len(variables)))]
+            initialise = initialise + [
+                v + (' = Series(self.values[%d], '
+                     'index=self.full_span, '
+                     'copy=False)' % (i))
+                for i, v in enumerate(variables)]
+        elif storage == 'batch':
+            initialise = [
+                'if scenarios is None:',
+                '\tscenarios = 1',
+                'if isinstance(scenarios, int):',
+                '\tscenarios = range(scenarios)',
+                'self.scenarios = pd.Index(scenarios)',
+                ('self.iter = DataFrame(default, index=self.full_span, '
+                 'columns=self.scenarios, dtype=dtype)'),
+                ('self.values = np.full((%d, len(self.full_span), '
+                 'len(self.scenarios)), default, dtype=dtype)' % (
+                     len(variables))), ]
+            initialise = initialise + [
+                v + (' = DataFrame(self.values[%d], '
+                     'index=self.full_span, '
+                     'columns=self.scenarios, '
+                     'copy=False)' % (i))
+                for i, v in enumerate(variables)]
+        else:
+            initialise = [v + (' = Series(default, '
+                               'index=self.full_span, '
+                               'dtype=dtype)')
+                          for v in variables]
         initialise = '\n'.join(initialise)
         return initialise
 
-    def build_endogenous_variables(self, code):
+    def build_equations(self, code, storage='series', variables=None):
+        """Return code to solve the model equations for a single period.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate()
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        variables : `None` or list of strings
+            All model variables (with 'self.' prefix), in row order; if `None`,
+            identify the variables from `code`
+
+        Returns
+        =======
+        equations : string
+            Python code to solve the model equations
+
+        Notes
+        =====
+        The generated code takes `period` to be the integer position of the
+        period to solve in `self.full_span`. In 'series' storage mode, variable
+        references of the form:
+            self.C_d[period]
+        are converted to positional lookups:
+            self.C_d.iat[period]
+
+        In 'array' and 'batch' storage modes, they are converted to
+        integer-indexed lookups on `self.values`:
+            values[0, period]
+        In 'batch' storage mode, each such lookup returns an array of values,
+        one per scenario, such that the equations solve all the scenarios at
+        once.
+
+        Lookups of lifted subexpressions (e.g. `precomputed[0, period]`; see
+        FSIC.parser.symbolic.lift()) are left as they are, on a local copy of
+        `self.precomputed`.
+
+        See also
+        ========
+        convert_to_array()
+        convert_to_positional()
+
+        """
+        if variables is None:
+            variables = self.get_variables(code)
+        if storage in ('array', 'batch'):
+            equations = '\n'.join([
+                'values = self.values',
+                self.convert_to_array(code, variables)])
+        else:
+            equations = self.convert_to_positional(code, variables)
+        if re.search(r'\bprecomputed\[', code):
+            equations = 'precomputed = self.precomputed\n' + equations
+        return equations
+
+    def build_blocks(self, partitioned, code, storage='series', kernel=False,
+                     profile=False, linear=False, substitutions=None,
+                     rows=None):
+        """Return code to solve the model block by block.
+
+        Parameters
+        ==========
+        partitioned : list of Dictionaries
+            Blocks of equations, as returned by FSIC.optimise.order.blocks()
+        code : string
+            Code script containing all model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        kernel : boolean
+            If `True`, solve each block on local variables, as for
+            `build_kernel()`
+        profile : boolean
+            If `True`, instrument the equations with profiling counters, as for
+            `instrument()`
+        linear : boolean
+            If `True`, also generate, for each simultaneous block that is
+            linear in its endogenous variables, a method to set up the block
+            as a system of linear equations
+        substitutions : `None` or Dictionary
+            Equations to solve in a different form, keyed by the equations in
+            `partitioned` (e.g. with exogenous subexpressions lifted out, as
+            by FSIC.parser.symbolic.lift()); linear systems are always set up
+            from the equations as given
+        rows : `None` or list of integers
+            With `profile`, the row in the profiling array of each equation in
+            `partitioned`, in order (see `instrument()`); if `None`, the
+            equations in `partitioned` are taken to be all those in `code`,
+            with rows in that order
+
+        Returns
+        =======
+        attributes : string
+            Python code to define the class attribute `BLOCKS`: a list of
+            tuples, one per block, each of the form:
+                (method name, simultaneous, endogenous variable indices)
+            where the indices give the positions of the block's endogenous
+            variables in `ENDOGENOUS`
+            If `linear` is `True`, the code also defines the class attribute
+            `LINEAR`: a Dictionary mapping the method name of each linear
+            block to the name of the method to set up its linear system
+        methods : string
+            Python code to define one method per block (and one more per
+            linear block)
+
+        Notes
+        =====
+        Consecutive non-simultaneous blocks are merged into a single method, to
+        be solved once per period. Each simultaneous block has its own method,
+        to be solved iteratively.
+
+        The method to set up a linear block has the signature:
+            linear_block_N(self, period, coefficients, constants)
+        and fills the non-zero elements of the coefficient matrix, `A`, and of
+        the vector of constants, `b`, such that the block's endogenous
+        variables, `x` (in the order of their indices), solve:
+            A x + b = 0
+        (see FSIC.parser.symbolic.linear_system()).
+
+        See also
+        ========
+        build_equations()
+        build_kernel()
+        instrument()
+
+        FSIC.optimise.order.blocks()
+        FSIC.parser.code.identify_variables()
+        FSIC.parser.symbolic.linear_system()
+
+        """
+        from FSIC.parser.code import identify_variables
+        from FSIC.parser.symbolic import linear_system
+        if substitutions is None:
+            substitutions = {}
+        variables = identify_variables(code)
+        endogenous = variables['endogenous']
+        variables = variables['endogenous'] + variables['exogenous']
+        # Merge consecutive non-simultaneous blocks
+        merged = []
+        for b in partitioned:
+            if (len(merged) and
+                    not b['simultaneous'] and
+                    not merged[-1]['simultaneous']):
+                merged[-1]['equations'] = (
+                    merged[-1]['equations'] + b['equations'])
+            else:
+                merged.append({
+                    'equations': list(b['equations']),
+                    'simultaneous': b['simultaneous'], })
+        if rows is None:
+            rows = list(range(sum([len(b['equations']) for b in merged])))
+        # Generate a method per block
+        attributes = []
+        methods = []
+        systems = []
+        offset = 0
+        for i, b in enumerate(merged):
+            block_rows = rows[offset:offset + len(b['equations'])]
+            offset = offset + len(b['equations'])
+            name = 'solve_block_%d' % (i)
+            block_code = '\n'.join(
+                [substitutions.get(e, e) for e in b['equations']])
+            unknowns = identify_variables(block_code)['endogenous']
+            indices = [endogenous.index(v) for v in unknowns]
+            attributes.append('(\'%s\', %s, %s)' % (
+                name, b['simultaneous'], indices))
+            if b['simultaneous']:
+                description = 'simultaneous: solve iteratively'
+            else:
+                description = 'recursive: solve once'
+            if profile:
+                block_code = self.instrument(
+                    block_code, block_rows, storage=storage)
+                prologue = ['profile = self.profile', TIMER]
+            else:
+                prologue = []
+            if kernel:
+                if re.search(r'\bprecomputed\[', block_code):
+                    prologue = prologue + ['precomputed = self.precomputed']
+                body = '\n'.join(prologue + [
+                    'values = self.values',
+                    't = period',
+                    self.build_kernel(
+                        block_code, storage=storage, variables=variables)])
+            else:
+                body = '\n'.join(prologue + [self.build_equations(
+                    block_code, storage=storage, variables=variables)])
+            methods.append('\n'.join([
+                'def %s(self, period):' % (name),
+                '\t"""Solve block %d (%s) for `period`."""' % (
+                    i, description),
+                '\t' + body.replace('\n', '\n\t')]))
+            # Linear system, if required and possible
+            if not (linear and b['simultaneous']):
+                continue
+            system = linear_system(b['equations'], unknowns)
+            if system is None:
+                continue
+            coefficients, constants = system
+            setup = []
+            for j, row in enumerate(coefficients):
+                for k, c in enumerate(row):
+                    if c != '0':
+                        setup.append('coefficients[%d, %d] = %s' % (j, k, c))
+            for j, c in enumerate(constants):
+                if c != '0':
+                    setup.append('constants[%d] = %s' % (j, c))
+            body = self.build_equations(
+                '\n'.join(setup), storage=storage, variables=variables)
+            systems.append((name, 'linear_block_%d' % (i)))
+            methods.append('\n'.join([
+                'def linear_block_%d(self, period, coefficients, constants):'
+                % (i),
+                '\t"""Set up block %d (linear) for `period`: A x + b = 0."""'
+                % (i),
+                '\t' + body.replace('\n', '\n\t')]))
+        attributes = 'BLOCKS = [' + ',\n\t'.join(attributes) + ']'
+        if linear:
+            attributes = attributes + '\nLINEAR = {' + ',\n\t'.join(
+                ['\'%s\': \'%s\'' % (n, m) for n, m in systems]) + '}'
+        methods = '\n\n'.join(methods)
+        return attributes, methods
+
+    def build_worklist(self, code, storage='series', variables=None,
+                       rows=None):
+        """Return code to solve the model equations one at a time.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate(), in
+            solution order
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        variables : `None` or list of strings
+            All model variables (with 'self.' prefix), in row order; if `None`,
+            identify the variables from `code`
+        rows : `None` or list of integers
+            If not `None`, instrument each equation with profiling counters,
+            in the row of the profiling array given by the corresponding
+            element of `rows` (see `instrument()`)
+
+        Returns
+        =======
+        attributes : string
+            Python code to define the class attribute `WORKLIST`: a list of
+            tuples, one per equation, each of the form:
+                (method name, dependents)
+            where the dependents are the positions of the equations that refer
+            to the equation's left hand-side variable in the current period
+            (the reverse-dependency index of the equation graph), including
+            the equation itself if it refers to its own left hand-side
+            variable
+        methods : string
+            Python code to define one method per equation, to solve the
+            equation for `period` and return the absolute change in its left
+            hand-side variable
+
+        Notes
+        =====
+        An equation of the form:
+            self.Y[period] = self.C[period] + self.G[period]
+        becomes (before conversion by `build_equations()`):
+            def solve_equation_1(self, period):
+                previous = self.Y[period]
+                self.Y[period] = self.C[period] + self.G[period]
+                return abs(self.Y[period] - previous)
+
+        See also
+        ========
+        build_equations()
+
+        FSIC.optimise.order.make_graph()
+        FSIC.optimise.order.self_referencing()
+
+        """
+        from FSIC.optimise.order import make_graph, self_referencing
+        equations = code.splitlines()
+        if variables is None:
+            variables = self.get_variables(code)
+        G = make_graph(equations, warn=False)
+        # Equations by left hand-side variable
+        positions = {}
+        for i, e in enumerate(equations):
+            positions.setdefault(e.split('=', 1)[0].strip(), []).append(i)
+        # In 'batch' storage mode, copy the previous values out of the array
+        if storage == 'batch':
+            previous = 'previous = %s.copy()'
+        else:
+            previous = 'previous = %s'
+        attributes = []
+        methods = []
+        for i, e in enumerate(equations):
+            lhs = e.split('=', 1)[0].strip()
+            dependents = set(
+                [j for n in G.successors(lhs) for j in positions.get(n, [])])
+            # The graph has no loops: add any self-reference explicitly
+            if self_referencing([e]):
+                dependents.add(i)
+            dependents = sorted(dependents)
+            name = 'solve_equation_%d' % (i)
+            attributes.append('(\'%s\', %s)' % (name, dependents))
+            if rows is None:
+                prologue = []
+                solve = e
+            else:
+                prologue = ['profile = self.profile', TIMER]
+                solve = self.instrument(e, [rows[i]], storage=storage)
+            body = '\n'.join(prologue + [self.build_equations(
+                '\n'.join([previous % (lhs),
+                           solve,
+                           'return abs(%s - previous)' % (lhs)]),
+                storage=storage, variables=variables)])
+            methods.append('\n'.join([
+                'def %s(self, period):' % (name),
+                '\t"""Solve equation %d for `period`, returning the change."""'
+                % (i),
+                '\t' + body.replace('\n', '\n\t')]))
+        attributes = 'WORKLIST = [' + ',\n\t'.join(attributes) + ']'
+        methods = '\n\n'.join(methods)
+        return attributes, methods
+
+    def build_epilogue(self, code, storage='series', variables=None):
+        """Return code to solve `code` over a span of periods at once.
+
+        Parameters
+        ==========
+        code : string
+            Epilogue equations, as generated by FSIC.parser.code.translate(),
+            in solution order (see FSIC.optimise.order.epilogue())
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        variables : `None` or list of strings
+            All model variables (with 'self.' prefix), in row order; if `None`,
+            identify the variables from `code`
+
+        Returns
+        =======
+        attributes : string
+            Python code to define the class attribute `EPILOGUE`: the list of
+            equations in `code`
+        method : string
+            Python code to define the method `solve_epilogue(self, start,
+            end)`, which solves the equations in `code` for all the periods
+            from position `start` to position `end` at once, with NumPy array
+            operations (see `convert_to_span()`)
+
+        See also
+        ========
+        convert_to_span()
+
+        FSIC.model.model.Model.solve()
+
+        """
+        if variables is None:
+            variables = self.get_variables(code)
+        body = self.convert_to_span(code, variables, storage=storage)
+        if storage in ('array', 'batch'):
+            body = 'values = self.values\n' + body
+        attributes = 'EPILOGUE = [' + ',\n\t'.join(
+            [repr(e) for e in code.splitlines()]) + ']'
+        method = '\n'.join([
+            'def solve_epilogue(self, start, end):',
+            '\t"""Solve the epilogue equations from `start` to `end`."""',
+            '\t' + body.replace('\n', '\n\t')])
+        return attributes, method
+
+    def build_precompute(self, expressions, storage='series', variables=None):
+        """Return code to evaluate `expressions` over a span of periods.
+
+        Parameters
+        ==========
+        expressions : list of strings
+            Subexpressions lifted out of the model equations, which refer only
+            to exogenous variables (see FSIC.parser.symbolic.lift())
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        variables : `None` or list of strings
+            All model variables (with 'self.' prefix), in row order; if `None`,
+            identify the variables from `expressions`
+
+        Returns
+        =======
+        attributes : string
+            Python code to define the class attribute `PRECOMPUTED`: the list
+            of `expressions`
+        method : string
+            Python code to define the method `precompute(self, start, end)`,
+            which sets `self.precomputed` to an array with one row per
+            expression and one column per period (and, in 'batch' storage
+            mode, a third axis for scenarios), holding the values of the
+            expressions for all the periods from position `start` to position
+            `end` (and NaN elsewhere)
+
+        See also
+        ========
+        convert_to_span()
+
+        FSIC.model.model.Model.solve()
+
+        """
+        if variables is None:
+            variables = self.get_variables('\n'.join(expressions))
+        if storage in ('array', 'batch'):
+            shape = '(%d, ) + self.values.shape[1:]' % (len(expressions))
+        else:
+            shape = '(%d, len(self.full_span))' % (len(expressions))
+        body = self.convert_to_span('\n'.join(
+            ['precomputed[%d, start:end + 1] = %s' % (k, e)
+             for k, e in enumerate(expressions)]), variables, storage=storage)
+        body = '\n'.join(
+            ['precomputed = np.full(%s, np.nan, dtype=dtype)' % (shape),
+             body,
+             'self.precomputed = precomputed'])
+        if storage in ('array', 'batch'):
+            body = 'values = self.values\n' + body
+        attributes = 'PRECOMPUTED = [' + ',\n\t'.join(
+            [repr(e) for e in expressions]) + ']'
+        method = '\n'.join([
+            'def precompute(self, start, end):',
+            '\t"""Evaluate `PRECOMPUTED` from `start` to `end`."""',
+            '\t' + body.replace('\n', '\n\t')])
+        return attributes, method
+
+    def build_static(self, code, storage='series', variables=None):
+        """Return code to solve `code` over a span of periods, with fixed lags.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate(), in
+            solution order
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        variables : `None` or list of strings
+            All model variables (with 'self.' prefix), in row order; if `None`,
+            identify the variables from `code`
+
+        Returns
+        =======
+        attributes : string
+            Python code to define the class attribute `STATIC`: the list of
+            equations in `code`
+        method : string
+            Python code to define the method `sweep_static(self, start, end)`,
+            which solves each equation in `code` once, in order, for all the
+            periods from position `start` to position `end` at once, reading
+            all lags and leads from the array `self.frozen` (see
+            `convert_to_span()`)
+
+        Notes
+        =====
+        `self.frozen` holds the values of all the model variables (one row per
+        variable, in the order of `ENDOGENOUS + EXOGENOUS`) from before the
+        solution, such that the periods solve independently of one another:
+        a static (one-step-ahead) simulation. Repeated calls to
+        `sweep_static()` then iterate all the periods at once (see
+        FSIC.model.model.Model.solve_static()).
+
+        See also
+        ========
+        convert_to_span()
+
+        FSIC.parser.symbolic.vectorisable()
+
+        """
+        from FSIC.parser.symbolic import vectorisable
+        equations = code.splitlines()
+        unsupported = [e for e in equations if not vectorisable(e)]
+        if len(unsupported):
+            raise ValueError(
+                'Static solution code requires vectorisable equations: '
+                'unable to convert \'%s\'' % (unsupported[0]))
+        if variables is None:
+            variables = self.get_variables(code)
+        body = '\n'.join([
+            'frozen = self.frozen',
+            self.convert_to_span(code, variables, storage=storage,
+                                 frozen=True)])
+        if storage in ('array', 'batch'):
+            body = 'values = self.values\n' + body
+        attributes = 'STATIC = [' + ',\n\t'.join(
+            [repr(e) for e in equations]) + ']'
+        method = '\n'.join([
+            'def sweep_static(self, start, end):',
+            '\t"""Solve the model equations once, from `start` to `end`."""',
+            '\t' + body.replace('\n', '\n\t')])
+        return attributes, method
+
+    def convert_to_span(self, code, variables, storage='series',
+                        frozen=False):
+        """Return `code` with variable references converted to span slices.
+
+        Parameters
+        ==========
+        code : string
+            Translated code, with variables of the form `self.C_d[period]`
+            (see FSIC.parser.symbolic.vectorisable())
+        variables : list of strings
+            Model variables (with 'self.' prefix), in row order
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+        frozen : boolean
+            If `True`, read the right hand-side references with a lag or a
+            lead from the rows of an array, `frozen`, instead (see
+            `build_static()`)
+
+        Returns
+        =======
+        converted : string
+            Copy of `code` with each reference to a period replaced with a
+            slice over the periods from `start` to `end`, offset as necessary
+
+        Notes
+        =====
+        In 'series' storage mode, the left hand-side variable is assigned by
+        position and the right hand-side variables are read as NumPy arrays:
+            self.Y[period] = self.C[period] + self.Y[period-1]
+        becomes:
+            self.Y.iloc[start:end + 1] = (self.C.values[start:end + 1] +
+                                          self.Y.values[start - 1:end])
+        (on a single line). In 'array' and 'batch' storage modes, the
+        variables are slices of the rows of `self.values`:
+            values[1, start:end + 1] = (values[0, start:end + 1] +
+                                        values[1, start - 1:end])
+        With `frozen`, the lag becomes `frozen[1, start - 1:end]` in all
+        storage modes.
+
+        """
+        rows = {v.replace('self.', ''): i for i, v in enumerate(variables)}
+        pattern = re.compile(
+            r'\bself\.([A-Za-z_]\w*)\[\s*period\s*(?:([+-])\s*(\d+)\s*)?\]')
+
+        def span(sign, offset):
+            offset = int(offset) if offset is not None else 0
+            if sign == '-':
+                offset = -offset
+            first = 'start' if offset == 0 else 'start %s %d' % (
+                '+' if offset > 0 else '-', abs(offset))
+            offset = offset + 1
+            last = 'end' if offset == 0 else 'end %s %d' % (
+                '+' if offset > 0 else '-', abs(offset))
+            return '%s:%s' % (first, last)
+
+        def replace(m, target=False):
+            name, sign, offset = m.groups()
+            if frozen and not target and sign is not None and int(offset):
+                return 'frozen[%d, %s]' % (rows[name], span(sign, offset))
+            if storage in ('array', 'batch'):
+                return 'values[%d, %s]' % (rows[name], span(sign, offset))
+            if target:
+                return 'self.%s.iloc[%s]' % (name, span(sign, offset))
+            return 'self.%s.values[%s]' % (name, span(sign, offset))
+
+        converted = []
+        for e in code.splitlines():
+            lhs, rhs = e.split('=', 1)
+            converted.append('%s = %s' % (
+                pattern.sub(lambda m: replace(m, target=True), lhs.strip()),
+                pattern.sub(replace, rhs.strip())))
+        return '\n'.join(converted)
+
+    def build_kernel(self, code, storage='array', variables=None):
+        """Return code to solve `code` on local variables, for one column.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate()
+        storage : string
+            Variable storage mode: 'array' or 'batch'
+        variables : `None` or list of strings
+            All model variables (with 'self.' prefix), in row order; if `None`,
+            identify the variables from `code`
+
+        Returns
+        =======
+        kernel : string
+            Python code to solve the equations in `code`, given the model
+            array, `values`, and an integer column position, `t`
+
+        Notes
+        =====
+        The generated code:
+         1. Unpacks the current column of `values` into one local variable per
+            model variable, with a leading underscore (e.g. `_C_d`), and loads
+            lags and leads of the form `self.C_d[period-1]` into local
+            variables of their own (e.g. `_C_d__lag1`)
+         2. Solves the equations on those local variables, such that an
+            equation of the form:
+                self.C_s[period] = self.C_d[period]
+            becomes:
+                _C_s = _C_d
+         3. Writes the endogenous variables back to `values`
+
+        In 'array' storage mode, the local variables are NumPy scalars, such
+        that the equations give the same results as without the kernel (e.g.
+        `inf` or `nan`, rather than an exception, on division by zero). In
+        'batch' storage mode, the local variables are arrays, with one element
+        per scenario.
+
+        Any other variable references (e.g. with a variable offset) are left as
+        lookups on `values`, with `period` replaced by `t`.
+
+        Lookups of lifted subexpressions (see FSIC.parser.symbolic.lift()) are
+        loaded from the array `precomputed` into local variables of their own,
+        such that `precomputed[0, period]` becomes `_precomputed_0`.
+
+        See also
+        ========
+        get_variables()
+        convert_to_array()
+
+        """
+        from FSIC.parser.code import identify_variables
+        if variables is None:
+            variables = self.get_variables(code)
+        names = [v.replace('self.', '') for v in variables]
+        rows = {n: i for i, n in enumerate(names)}
+        endogenous = [v.replace('self.', '') for v in
+                      identify_variables(code)['endogenous']]
+        pattern = re.compile(
+            r'\bself\.([A-Za-z_]\w*)\[\s*period\s*(?:([+-])\s*(\d+)\s*)?\]')
+        offsets = {}
+
+        def replace(m):
+            name, sign, offset = m.groups()
+            if name not in rows:
+                return m.group(0)
+            if sign is None or int(offset) == 0:
+                return '_' + name
+            key = '%s%d' % ('lag' if sign == '-' else 'lead', int(offset))
+            offsets.setdefault((sign, int(offset)), set()).add(name)
+            return '_%s__%s' % (name, key)
+
+        equations = pattern.sub(replace, code)
+        lifted = sorted(set(int(k) for k in re.findall(
+            r'\bprecomputed\[(\d+), period\]', equations)))
+        equations = re.sub(r'\bprecomputed\[(\d+), period\]',
+                           r'_precomputed_\1', equations)
+        equations = self.convert_to_array(equations, variables)
+        equations = re.sub(r'\bperiod\b', 't', equations)
+        column = 'values[:, t%s]'
+        # Load current values
+        lines = ['(%s,) = %s' % (
+            ', '.join(['_' + n for n in names]), column % (''))]
+        # Load lags and leads
+        for sign, offset in sorted(offsets):
+            key = '%s%d' % ('lag' if sign == '-' else 'lead', offset)
+            lines.append('%s = %s' % (
+                key, column % (' %s %d' % (sign, offset))))
+            lines = lines + ['_%s__%s = %s[%d]' % (n, key, key, rows[n])
+                             for n in sorted(offsets[(sign, offset)])]
+        # Load lifted subexpressions
+        if len(lifted):
+            lines.append('(%s,) = precomputed[%s, t]' % (
+                ', '.join(['_precomputed_%d' % (k) for k in lifted]), lifted))
+        # Solve
+        lines.append(equations)
+        # Store endogenous values, in a single slice assignment if possible
+        written = [n for n in names if n in endogenous]
+        if storage != 'batch' and written == names[:len(written)]:
+            lines.append('values[:%d, t] = (%s,)' % (
+                len(written), ', '.join(['_' + n for n in written])))
+        else:
+            lines = lines + ['values[%d, t] = _%s' % (rows[n], n)
+                             for n in written]
+        kernel = '\n'.join(lines)
+        return kernel
+
+    def parse_sources(self, classes=['python']):
+        """Return the translated equations in `self.chunks`, by source chunk.
+
+        Parameters
+        ==========
+        classes : string or list of strings
+            Classes to match against those in `self.chunks`
+
+        Returns
+        =======
+        sources : list of (string, string) tuples
+            One tuple per equation, of the form:
+                (chunk identifier, translated equation)
+            where the chunk identifier is the name given in the attributes
+            block of the chunk (e.g. 'consumption' for '{#consumption
+            .python}') or, if the chunk has no identifier, a label of the form
+            'chunk_N', with `N` the position of the chunk
+
+        See also
+        ========
+        parse_chunks()
+
+        FSIC.parser.chunk.parse()
+        FSIC.parser.code.translate()
+
+        """
+        from FSIC.parser.chunk import parse
+        from FSIC.parser.code import translate
+        if type(classes) is not list:
+            classes = [classes]
+        sources = []
+        chunks = list(sorted(list(set(self.chunks))))
+        for i, c in enumerate(chunks):
+            block = parse(c)
+            if not len(set(block['classes']) & set(classes)):
+                continue
+            identifier = block['identifier']
+            if identifier is None:
+                identifier = 'chunk_%d' % (i)
+            for e in translate(block['code']).splitlines():
+                sources.append((identifier, e))
+        return sources
+
+    def instrument(self, code, rows, storage='series'):
+        """Return `code` with profiling counters around each equation.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate()
+        rows : list of integers
+            Row of each equation in `code`, in order, in the profiling array
+            (the position of the equation in the full list of model
+            equations, `EQUATIONS`)
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+
+        Returns
+        =======
+        instrumented : string
+            Copy of `code` with counters added around each equation
+
+        Notes
+        =====
+        An equation of the form:
+            self.C_s[period] = self.C_d[period]
+        becomes:
+            profile_before = self.C_s[period]
+            profile_start = timer()
+            self.C_s[period] = self.C_d[period]
+            profile_end = timer()
+            profile[0, 0] += 1
+            profile[0, 1] += profile_end - profile_start
+            profile[0, 2] += abs(self.C_s[period] - profile_before)
+        accumulating, in the array `profile`, the number of evaluations, the
+        time taken and the absolute change in the left hand-side variable.
+        The generated code must define `profile` and `timer` beforehand.
+
+        In 'batch' storage mode, the change is summed across scenarios.
+
+        The instrumented code can then be passed to `build_equations()` or
+        `build_kernel()`.
+
+        """
+        instrumented = []
+        for k, e in zip(rows, code.splitlines()):
+            lhs = e.split('=', 1)[0].strip()
+            if storage == 'batch':
+                before = 'np.copy(%s)' % (lhs)
+                change = 'np.abs(%s - profile_before).sum()' % (lhs)
+            else:
+                before = lhs
+                change = 'abs(%s - profile_before)' % (lhs)
+            instrumented = instrumented + [
+                'profile_before = ' + before,
+                'profile_start = timer()',
+                e,
+                'profile_end = timer()',
+                'profile[%d, 0] += 1' % (k),
+                'profile[%d, 1] += profile_end - profile_start' % (k),
+                'profile[%d, 2] += %s' % (k, change)]
+        instrumented = '\n'.join(instrumented)
+        return instrumented
+
+    def convert_to_array(self, code, variables):
+        """Return `code` with variable references converted to array lookups.
+
+        Parameters
+        ==========
+        code : string
+            Translated code, with variables of the form `self.C_d[period]`
+        variables : list of strings
+            Model variables (with 'self.' prefix), in row order
+
+        Returns
+        =======
+        converted : string
+            Copy of `code` with each reference `self.X[...]` replaced with
+            `values[i, ...]`, where `i` is the position of `self.X` in
+            `variables`
+
+        """
+        rows = {v.replace('self.', ''): i for i, v in enumerate(variables)}
+        pattern = re.compile(r'\bself\.([A-Za-z_]\w*)\[')
+
+        def replace(m):
+            name = m.group(1)
+            if name not in rows:
+                return m.group(0)
+            return 'values[%d, ' % (rows[name])
+
+        converted = pattern.sub(replace, code)
+        return converted
+
+    def convert_to_positional(self, code, variables):
+        """Return `code` with variable references converted to positional lookups.
+
+        Parameters
+        ==========
+        code : string
+            Translated code, with variables of the form `self.C_d[period]`
+        variables : list of strings
+            Model variables (with 'self.' prefix)
+
+        Returns
+        =======
+        converted : string
+            Copy of `code` with each reference `self.X[...]` replaced with
+            `self.X.iat[...]`
+
+        """
+        names = set(v.replace('self.', '') for v in variables)
+        pattern = re.compile(r'\bself\.([A-Za-z_]\w*)\[')
+
+        def replace(m):
+            name = m.group(1)
+            if name not in names:
+                return m.group(0)
+            return 'self.%s.iat[' % (name)
+
+        converted = pattern.sub(replace, code)
+        return converted
+
+    def get_offsets(self, code):
+        """Return the longest lag and lead of any variable in `code`.
+
+        Parameters
+        ==========
+        code : string
+            Translated code, with variables of the form `self.C_d[period-1]`
+
+        Returns
+        =======
+        max_lag : integer
+            Largest number of periods that any variable is lagged by
+        max_lead : integer
+            Largest number of periods that any variable is led by
+
+        Notes
+        =====
+        The model can only be solved for periods with at least `max_lag`
+        periods before them and `max_lead` periods after them.
+
+        """
+        pattern = re.compile(
+            r'\bself\.[A-Za-z_]\w*\[\s*period\s*([+-])\s*(\d+)\s*\]')
+        max_lag = 0
+        max_lead = 0
+        for sign, offset in pattern.findall(code):
+            if sign == '-':
+                max_lag = max(max_lag, int(offset))
+            else:
+                max_lead = max(max_lead, int(offset))
+        return max_lag, max_lead
+
+    def build_endogenous_variables(self, code, storage='series'):
         """Return code to store endogenous variable values.
 
         Parameters
         ==========
         code : string
             Code script containing endogenous model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
 
         Returns
         =======
         variables : string
-            Python code to insert endogenous variable values into a Dictionary
+            Python code to return endogenous variable values as a Series (a
+            DataFrame in 'batch' storage mode, with one column per scenario)
 
         See also
         ========
@@ -360,15 +1607,216 @@ self.FSIC_BUILD = \'%s\'
         from FSIC.parser.code import identify_variables
         variables = identify_variables(code)
         variables = variables['endogenous']
-        variables = [('values[\'' +
-                      v.replace('self.', '') +
-                      '\'] = ' + v + '[period]')
-                     for v in variables]
+        if storage == 'array':
+            variables = [
+                ('return Series(self.values[:%d, period], '
+                 'index=self.ENDOGENOUS)' % (len(variables)))]
+        elif storage == 'batch':
+            variables = [
+                ('return DataFrame(self.values[:%d, period], '
+                 'index=self.ENDOGENOUS, '
+                 'columns=self.scenarios)' % (len(variables)))]
+        else:
+            variables = ['values = {}'] + [
+                ('values[\'' +
+                 v.replace('self.', '') +
+                 '\'] = ' + v + '.iat[period]')
+                for v in variables] + ['return Series(values)']
         variables = '\n'.join(variables)
         return variables
 
-    def build_results(self, code):
-        """Return code to return model results as a DataFrame.
+    def build_store_endogenous_variables(self, code, storage='series'):
+        """Return code to copy endogenous variable values into an array.
+
+        Parameters
+        ==========
+        code : string
+            Code script containing endogenous model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+
+        Returns
+        =======
+        variables : string
+            Python code to copy endogenous variable values into the
+            preallocated array `out`
+
+        See also
+        ========
+        FSIC.parser.code.identify_variables()
+        FSIC.model.model.Model.solve_period()
+
+        """
+        from FSIC.parser.code import identify_variables
+        variables = identify_variables(code)
+        variables = variables['endogenous']
+        if storage in ('array', 'batch'):
+            variables = ['out[:] = self.values[:%d, period]' % (
+                len(variables))]
+        else:
+            variables = ['out[%d] = %s.iat[period]' % (i, v)
+                         for i, v in enumerate(variables)]
+        variables = '\n'.join(variables)
+        return variables
+
+    def build_load_endogenous_variables(self, code, storage='series'):
+        """Return code to set endogenous variable values from an array.
+
+        Parameters
+        ==========
+        code : string
+            Code script containing endogenous model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+
+        Returns
+        =======
+        variables : string
+            Python code to copy the contents of the array `values` into the
+            endogenous variables
+
+        See also
+        ========
+        build_store_endogenous_variables()
+
+        """
+        from FSIC.parser.code import identify_variables
+        variables = identify_variables(code)
+        variables = variables['endogenous']
+        if storage in ('array', 'batch'):
+            variables = ['self.values[:%d, period] = values' % (
+                len(variables))]
+        else:
+            variables = ['%s.iat[period] = values[%d]' % (v, i)
+                         for i, v in enumerate(variables)]
+        variables = '\n'.join(variables)
+        return variables
+
+    def build_residuals(self, code, storage='series'):
+        """Return code to evaluate the model equations as residuals.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate()
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+
+        Returns
+        =======
+        residuals : string
+            Python code to store, in the array `out`, the difference between
+            the right and left hand-sides of each equation (one element per
+            equation, in the order of `code`)
+
+        Notes
+        =====
+        An equation of the form:
+            self.Y[period] = self.C[period] + self.G[period]
+        becomes (before conversion by `build_equations()`):
+            out[0] = (self.C[period] + self.G[period]) - self.Y[period]
+
+        See also
+        ========
+        build_equations()
+
+        """
+        residuals = []
+        for e in code.splitlines():
+            lhs, rhs = e.split('=', 1)
+            residuals.append('out[%d] = (%s) - %s' % (
+                len(residuals), rhs.strip(), lhs.strip()))
+        residuals = self.build_equations(
+            '\n'.join(residuals), storage=storage,
+            variables=self.get_variables(code))
+        return residuals
+
+    def build_jacobian(self, code, storage='series'):
+        """Return code to evaluate the Jacobian of the model equations.
+
+        Parameters
+        ==========
+        code : string
+            Model equations, as generated by FSIC.parser.code.translate()
+        storage : string
+            Variable storage mode: 'series' or 'array'
+
+        Returns
+        =======
+        attributes : string
+            Python code to define the class attribute `JACOBIAN`: the sparsity
+            pattern of the Jacobian, as a list of tuples, one per (possibly)
+            non-zero element, of the form:
+                (equation, endogenous variable)
+            where the equation is the position of the residual in
+            `get_residuals()` and the endogenous variable is the position of
+            the variable in `ENDOGENOUS`
+        method : string
+            Python code to define the method `get_jacobian(self, period, out)`
+            which stores, in the array `out`, the partial derivative of each
+            residual with respect to each endogenous variable, in the order of
+            `JACOBIAN`
+
+        Notes
+        =====
+        An equation of the form:
+            self.C[period] = 0.5 * self.Y[period] ** 2
+        becomes (before conversion by `build_equations()`):
+            out[0] = -1
+            out[1] = 0.5 * (2 * self.Y[period])
+        with `JACOBIAN` entries `(0, 0)` and `(0, 1)`, for `C` and `Y`
+        respectively. Lags and leads of the endogenous variables are treated as
+        constants.
+
+        Raises a `ValueError` if any equation cannot be differentiated (see
+        FSIC.parser.symbolic.derivative() for the operations and functions
+        covered).
+
+        See also
+        ========
+        build_residuals()
+        build_equations()
+
+        FSIC.parser.symbolic.jacobian()
+
+        """
+        from FSIC.parser.code import identify_variables
+        from FSIC.parser.symbolic import jacobian
+        endogenous = identify_variables(code)['endogenous']
+        pattern = []
+        lines = []
+        for i, e in enumerate(code.splitlines()):
+            derivatives = jacobian(e, endogenous)
+            if derivatives is None:
+                raise ValueError(
+                    'Unable to differentiate equation: \'%s\'' % (e))
+            for j, v in enumerate(endogenous):
+                if v in derivatives:
+                    lines.append('out[%d] = %s' % (
+                        len(pattern), derivatives[v]))
+                    pattern.append('(%d, %d)' % (i, j))
+        attributes = 'JACOBIAN = [' + ', '.join(pattern) + ']'
+        body = self.build_equations(
+            '\n'.join(lines), storage=storage,
+            variables=self.get_variables(code))
+        method = '\n'.join([
+            'def get_jacobian(self, period, out):',
+            '\t"""Evaluate the non-zero Jacobian elements for `period`.',
+            '',
+            '\tParameters',
+            '\t==========',
+            '\tperiod : integer',
+            '\t    The position of the period to evaluate',
+            '\tout : NumPy array',
+            '\t    Preallocated array with one element per entry in '
+            '`JACOBIAN`',
+            '',
+            '\t"""',
+            '\t' + body.replace('\n', '\n\t')])
+        return attributes, method
+
+    def get_variables(self, code):
+        """Return the model variables in `code`, in row order.
 
         Parameters
         ==========
@@ -377,8 +1825,9 @@ self.FSIC_BUILD = \'%s\'
 
         Returns
         =======
-        results : string
-            Python code to generate a results DataFrame
+        variables : list of strings
+            Endogenous variables followed by exogenous variables, each sorted
+            alphabetically (and with 'self.' prefix)
 
         See also
         ========
@@ -388,10 +1837,56 @@ self.FSIC_BUILD = \'%s\'
         from FSIC.parser.code import identify_variables
         variables = identify_variables(code)
         variables = variables['endogenous'] + variables['exogenous']
-        results = 'results = DataFrame({' + '\n\t' + (
-            ',\n\t'.join(
-                ['\'' + v.replace('self.', '') + '\': ' + v
-                 for v in variables]) + '})')
+        return variables
+
+    def build_results(self, code, storage='series'):
+        """Return code to return model results as a DataFrame.
+
+        Parameters
+        ==========
+        code : string
+            Code script containing all model variables
+        storage : string
+            Variable storage mode: 'series', 'array' or 'batch'
+
+        Returns
+        =======
+        results : string
+            Python code to generate a results DataFrame
+
+        Notes
+        =====
+        In 'batch' storage mode, the results for each scenario are stacked,
+        with the scenario labels as the first level of the (row) index, such
+        that `results.ix[scenario]` returns the results for that scenario.
+
+        See also
+        ========
+        FSIC.parser.code.identify_variables()
+
+        """
+        variables = self.get_variables(code)
+        if storage == 'batch':
+            results = '\n'.join([
+                'results = {}',
+                'for i, s in enumerate(self.scenarios):',
+                '\tresults[s] = DataFrame(',
+                '\t\tself.values[:, :, i].T,',
+                '\t\tindex=self.full_span,',
+                '\t\tcolumns=self.ENDOGENOUS + self.EXOGENOUS)',
+                '\tresults[s][\'iter\'] = self.iter[s]',
+                ('results = pd.concat([results[s] for s in self.scenarios], '
+                 'keys=self.scenarios)'),
+                'return results'])
+        else:
+            results = 'results = DataFrame({' + '\n\t' + (
+                ',\n\t'.join(
+                    ['\'' + v.replace('self.', '') + '\': ' + v
+                     for v in variables]) + '})')
+            results = '\n'.join([
+                results,
+                'results[\'iter\'] = self.iter',
+                'return results'])
         return results
 
     def get_descriptors(self, cfg, section='DEFAULT'):
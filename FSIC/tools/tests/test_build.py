@@ -1,9 +1,554 @@
 # -*- coding: utf-8 -*-
 
 
+from nose.tools import raises
+
+import numpy as np
+from pandas import DataFrame, PeriodIndex
+
 import FSIC.tools.build
 
 
+def test_convert_to_array():
+    b = FSIC.tools.build.Build()
+    code = 'self.Y[period] = self.C[period] + self.Y[period-1]'
+    assert b.convert_to_array(code, ['self.C', 'self.Y']) == (
+        'values[1, period] = values[0, period] + values[1, period-1]')
+
+
+def test_build_equations_array():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C_s[period] = self.C_d[period]',
+        'self.Y[period] = self.C_s[period] + self.G[period]'])
+    expected = '\n'.join([
+        'values = self.values',
+        'values[0, period] = values[2, period]',
+        'values[1, period] = values[0, period] + values[3, period]'])
+    assert b.build_equations(code, storage='array') == expected
+
+
+def test_build_store_endogenous_variables():
+    b = FSIC.tools.build.Build()
+    code = 'self.Y[period] = self.C[period] + self.G[period]'
+    assert b.build_store_endogenous_variables(code) == (
+        'out[0] = self.Y.iat[period]')
+    assert b.build_store_endogenous_variables(code, storage='array') == (
+        'out[:] = self.values[:1, period]')
+
+
+def test_build_residuals():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C[period] = 0.5 * self.Y[period]',
+        'self.Y[period] = self.C[period] + self.G[period]'])
+    assert b.build_residuals(code) == '\n'.join([
+        'out[0] = (0.5 * self.Y.iat[period]) - self.C.iat[period]',
+        ('out[1] = (self.C.iat[period] + self.G.iat[period]) - '
+         'self.Y.iat[period]')])
+
+
+def test_convert_to_positional():
+    b = FSIC.tools.build.Build()
+    code = 'self.Y[period] = self.C[period] + self.Y[period-1] + self.f[0]'
+    assert b.convert_to_positional(code, ['self.C', 'self.Y']) == (
+        'self.Y.iat[period] = self.C.iat[period] + self.Y.iat[period-1] + '
+        'self.f[0]')
+
+
+def test_get_offsets():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C[period] = self.Y[period-1] + self.Y[period - 2]',
+        'self.Y[period] = self.C[period] + self.G[period+1]'])
+    assert b.get_offsets(code) == (2, 1)
+    assert b.get_offsets('self.Y[period] = self.G[period]') == (0, 0)
+
+
+def test_build_equations_batch():
+    b = FSIC.tools.build.Build()
+    code = 'self.Y[period] = self.C[period] + self.G[period]'
+    assert (b.build_equations(code, storage='batch') ==
+            b.build_equations(code, storage='array'))
+
+
+@raises(ValueError)
+def test_insert_code_invalid_storage():
+    FSIC.tools.build.Build().insert_code('', storage='dict')
+
+
+def test_build_kernel():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C[period] = 0.5 * self.Y[period-1]',
+        'self.Y[period] = self.C[period] + self.G[period]'])
+    assert b.build_kernel(code) == '\n'.join([
+        '(_C, _Y, _G,) = values[:, t]',
+        'lag1 = values[:, t - 1]',
+        '_Y__lag1 = lag1[1]',
+        '_C = 0.5 * _Y__lag1',
+        '_Y = _C + _G',
+        'values[:2, t] = (_C, _Y,)'])
+
+
+def test_build_kernel_solve():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C[period] = 0.5 * self.Y[period-1]',
+        'self.Y[period] = self.C[period] + self.G[period]'])
+    values = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 5.0]])
+    exec(b.build_kernel(code), {}, {'values': values, 't': 1})
+    assert np.allclose(values[:, 1], [5.0, 10.0, 5.0])
+
+
+@raises(ValueError)
+def test_insert_code_kernel_series_storage():
+    FSIC.tools.build.Build().insert_code('', storage='series', kernel=True)
+
+
+script = '''
+~~~{.ini}
+NAME = Test
+DESCRIPTION = Test model
+REFERENCE = None
+MAJOR = 0
+MINOR = 0
+PATCH = 0
+DEV = No
+~~~
+
+~~~{#consumption .python}
+C = 0.5 * Y
+~~~
+
+~~~{#income .python}
+Y = C + G
+~~~
+'''
+
+
+def test_parse_sources():
+    b = FSIC.tools.build.Build()
+    b.read_string(script)
+    assert sorted(b.parse_sources()) == [
+        ('consumption', 'self.C[period] = 0.5 * self.Y[period]'),
+        ('income', 'self.Y[period] = self.C[period] + self.G[period]')]
+
+
+def test_instrument():
+    b = FSIC.tools.build.Build()
+    equations = [
+        'self.C[period] = 0.5 * self.Y[period]',
+        'self.Y[period] = self.C[period] + self.G[period]']
+    assert b.instrument(equations[1], [1]) == '\n'.join([
+        'profile_before = self.Y[period]',
+        'profile_start = timer()',
+        'self.Y[period] = self.C[period] + self.G[period]',
+        'profile_end = timer()',
+        'profile[1, 0] += 1',
+        'profile[1, 1] += profile_end - profile_start',
+        'profile[1, 2] += abs(self.Y[period] - profile_before)'])
+
+
+def test_build_kernel_failure():
+    # The kernel gives the same non-finite results as plain array storage,
+    # which the failure policy then reports period by period
+    singular = script.replace(
+        'C = 0.5 * Y', 'C = 0.5 * Y + G / alpha + 0 * alpha ** 0.5')
+    for kernel in [False, True]:
+        b = FSIC.tools.build.Build()
+        b.read_string(singular)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage='array', kernel=kernel), namespace)
+        model = namespace['Test']()
+        model.initialise(span=PeriodIndex(start='2000', end='2010'))
+        model.G.ix[:] = 10
+        model.alpha.ix[:] = 1
+        model.alpha.ix['2003'] = 0
+        model.alpha.ix['2006'] = -1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            model.solve(on_failure='mark')
+        assert [str(e.period) for e in model.failures] == ['2003', '2006']
+        assert model.iter.isnull().sum() == 2
+        assert np.allclose(model.Y.ix['2007':], 40)
+
+
+def test_build_profile():
+    for storage, kernel in [('series', False), ('array', False),
+                            ('array', True)]:
+        b = FSIC.tools.build.Build()
+        b.read_string(script)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage=storage, kernel=kernel, profile=True), namespace)
+        model = namespace['Test']()
+        model.initialise(span=PeriodIndex(start='2000', end='2010'))
+        model.G.ix[:] = 10
+        model.solve()
+        assert np.allclose(model.Y, 20)
+        profile = model.get_profile()
+        assert list(profile['equation']) == model.EQUATIONS
+        assert (profile['evaluations'] == model.iter.sum()).all()
+        profile = model.get_profile(by_chunk=True)
+        assert sorted(profile.index) == ['consumption', 'income']
+        assert (profile['change'] > 0).all()
+
+
+def test_build_profile_duplicates():
+    # Repeated equations each keep their own counters
+    repeated = script.replace(
+        'C = 0.5 * Y', 'C = 0.5 * Y\nX = 2 * G\nX = 2 * G')
+    b = FSIC.tools.build.Build()
+    b.read_string(repeated)
+    namespace = {'__name__': 'test'}
+    exec(b.build(profile=True), namespace)
+    model = namespace['Test']()
+    model.initialise(span=PeriodIndex(start='2000', end='2010'))
+    model.G.ix[:] = 10
+    model.solve()
+    profile = model.get_profile()
+    rows = [i for i, e in enumerate(model.EQUATIONS) if e.startswith('self.X')]
+    assert len(rows) == 2
+    assert (profile['evaluations'][rows] == model.iter.sum()).all()
+
+
+def test_build_profile_worklist():
+    b = FSIC.tools.build.Build()
+    b.read_string(script)
+    namespace = {'__name__': 'test'}
+    exec(b.build(worklist=True, profile=True), namespace)
+    model = namespace['Test']()
+    model.initialise(span=PeriodIndex(start='2000', end='2010'))
+    model.G.ix[:] = 10
+    model.solve(method='worklist')
+    assert np.allclose(model.Y, 20)
+    assert (model.get_profile()['evaluations'] > 0).all()
+
+
+def test_build_no_profile():
+    b = FSIC.tools.build.Build()
+    b.read_string(script)
+    namespace = {'__name__': 'test'}
+    code = b.build()
+    assert 'timer()' not in code
+    exec(code, namespace)
+    assert namespace['Test']().profile is None
+
+
+@raises(ValueError)
+def test_insert_code_linear_without_blocks():
+    FSIC.tools.build.Build().insert_code('', linear=True)
+
+
+def test_build_linear():
+    for storage in ['series', 'array']:
+        b = FSIC.tools.build.Build()
+        b.read_string(script)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage=storage, blocks=True, linear=True), namespace)
+        model = namespace['Test']()
+        assert model.LINEAR == {'solve_block_0': 'linear_block_0'}
+        model.initialise(span=PeriodIndex(start='2000', end='2010'))
+        model.G.ix[:] = 10
+        model.G.ix['2005':] = 20
+        model.solve()
+        assert np.allclose(model.Y.ix[:'2004'], 20)
+        assert np.allclose(model.Y.ix['2005':], 40)
+        assert (model.iter == 1).all()
+        assert np.allclose(
+            model.factorisations['solve_block_0']['inverse'],
+            np.linalg.inv([[-1, 0.5], [1, -1]]))
+
+
+def test_build_linear_non_linear_block():
+    b = FSIC.tools.build.Build()
+    b.read_string(script.replace('C = 0.5 * Y', 'C = 0.5 * max(Y, 0)'))
+    namespace = {'__name__': 'test'}
+    code = b.build(blocks=True, linear=True)
+    assert 'linear_block' not in code
+    exec(code, namespace)
+    model = namespace['Test']()
+    assert model.LINEAR == {}
+    model.initialise(span=PeriodIndex(start='2000', end='2010'))
+    model.G.ix[:] = 10
+    model.solve()
+    assert np.allclose(model.Y, 20)
+    assert (model.iter > 1).all()
+
+
+def test_build_jacobian():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C[period] = 0.5 * self.Y[period] ** 2',
+        'self.Y[period] = self.C[period] + self.G[period]'])
+    pattern, method = b.build_jacobian(code)
+    assert pattern == 'JACOBIAN = [(0, 0), (0, 1), (1, 0), (1, 1)]'
+    assert method.splitlines()[-4:] == [
+        '\tout[0] = -1',
+        '\tout[1] = 0.5 * (2 * self.Y.iat[period])',
+        '\tout[2] = 1',
+        '\tout[3] = -1', ]
+
+
+@raises(ValueError)
+def test_build_jacobian_error():
+    b = FSIC.tools.build.Build()
+    b.build_jacobian('\n'.join([
+        'self.C[period] = f(self.Y[period])',
+        'self.Y[period] = self.C[period] + self.G[period]']))
+
+
+@raises(ValueError)
+def test_build_jacobian_batch_error():
+    b = FSIC.tools.build.Build()
+    b.read_string(script)
+    b.build(storage='batch', jacobian=True)
+
+
+def test_build_jacobian_newton():
+    for storage in ['series', 'array']:
+        b = FSIC.tools.build.Build()
+        b.read_string(script)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage=storage, jacobian=True), namespace)
+        model = namespace['Test']()
+        assert model.JACOBIAN == [(0, 0), (0, 1), (1, 0), (1, 1)]
+        model.initialise(span=PeriodIndex(start='2000', end='2010'))
+        model.G.ix[:] = 10
+        model.solve(method='newton')
+        assert np.allclose(model.Y, 20)
+        # Exact derivatives: one step to the solution, one to confirm
+        assert (model.iter == 2).all()
+        assert np.allclose(model.jacobian.toarray(), [[-1, 0.5], [1, -1]])
+
+
+def test_build_worklist():
+    b = FSIC.tools.build.Build()
+    code = '\n'.join([
+        'self.C[period] = 0.5 * self.Y[period]',
+        'self.Y[period] = self.C[period] + self.G[period]',
+        'self.Z[period] = self.Y[period-1]'])
+    attributes, methods = b.build_worklist(code)
+    assert attributes == '\n'.join([
+        'WORKLIST = [(\'solve_equation_0\', [1]),',
+        '\t(\'solve_equation_1\', [0]),',
+        '\t(\'solve_equation_2\', [])]'])
+    assert methods.splitlines()[:5] == [
+        'def solve_equation_0(self, period):',
+        '\t"""Solve equation 0 for `period`, returning the change."""',
+        '\tprevious = self.C.iat[period]',
+        '\tself.C.iat[period] = 0.5 * self.Y.iat[period]',
+        '\treturn abs(self.C.iat[period] - previous)', ]
+    # Self-referencing equations are their own dependents
+    attributes, methods = b.build_worklist(
+        'self.Y[period] = 0.5 * self.Y[period] + self.G[period]')
+    assert attributes == 'WORKLIST = [(\'solve_equation_0\', [0])]'
+
+
+def test_build_worklist_solve():
+    for storage in ['series', 'array', 'batch']:
+        b = FSIC.tools.build.Build()
+        b.read_string(script)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage=storage, worklist=True), namespace)
+        model = namespace['Test']()
+        model.initialise(span=PeriodIndex(start='2000', end='2010'))
+        model.G.ix[:] = 10
+        model.G.ix['2005':] = 20
+        model.solve(method='worklist')
+        assert np.allclose(model.Y.ix[:'2004'], 20)
+        assert np.allclose(model.Y.ix['2005':], 40)
+        assert not model.iter.isnull().any().any()
+
+
+def test_convert_to_span():
+    b = FSIC.tools.build.Build()
+    code = 'self.Y[period] = self.C[period] + self.Y[period-1]'
+    assert b.convert_to_span(code, ['self.C', 'self.Y']) == (
+        'self.Y.iloc[start:end + 1] = '
+        'self.C.values[start:end + 1] + self.Y.values[start - 1:end]')
+    assert b.convert_to_span(code, ['self.C', 'self.Y'], 'array') == (
+        'values[1, start:end + 1] = '
+        'values[0, start:end + 1] + values[1, start - 1:end]')
+    code = 'self.Y[period] = self.C[period+2]'
+    assert b.convert_to_span(code, ['self.C', 'self.Y'], 'batch') == (
+        'values[1, start:end + 1] = values[0, start + 2:end + 3]')
+    # Lags and leads from `frozen`
+    code = 'self.Y[period] = self.C[period] + self.Y[period-1]'
+    assert b.convert_to_span(code, ['self.C', 'self.Y'], frozen=True) == (
+        'self.Y.iloc[start:end + 1] = '
+        'self.C.values[start:end + 1] + frozen[1, start - 1:end]')
+
+
+def test_build_epilogue():
+    reporting = script + '''
+~~~{#reporting .python}
+S = Y - C
+R = S / Y
+Z = Y[-1] + R
+~~~
+'''
+    for storage in ['series', 'array', 'batch']:
+        results = []
+        for epilogue in [False, True]:
+            b = FSIC.tools.build.Build()
+            b.read_string(reporting)
+            code = b.build(storage=storage, epilogue=epilogue)
+            namespace = {'__name__': 'test'}
+            exec(code, namespace)
+            model = namespace['Test']()
+            if epilogue:
+                assert model.EPILOGUE == [
+                    'self.S[period] = self.Y[period] - self.C[period]',
+                    'self.R[period] = self.S[period] / self.Y[period]',
+                    'self.Z[period] = self.Y[period-1] + self.R[period]']
+                # Not solved period by period
+                solve = code[code.index('_C_s = _C_d'):
+                             code.index('def solve_epilogue')]
+                assert 'self.R' not in solve and 'values[1, ' not in solve
+            else:
+                assert model.EPILOGUE == []
+            model.initialise(span=PeriodIndex(start='2000', end='2010'),
+                             past=PeriodIndex(start='1999', end='1999'))
+            model.G.ix[:] = 10
+            model.G.ix['2005':] = 20
+            model.solve()
+            results.append(model.get_results())
+        assert np.allclose(results[0].values, results[1].values)
+        assert np.allclose(model.R.ix['2001':], 0.5)
+
+
+def test_build_precompute():
+    exogenous = script.replace('C = 0.5 * Y', 'C = 0.5 * Y + (1 - alpha) * G')
+    for storage, kernel in [('series', False), ('array', False),
+                            ('array', True), ('batch', True)]:
+        results = []
+        for precompute in [False, True]:
+            b = FSIC.tools.build.Build()
+            b.read_string(exogenous)
+            code = b.build(storage=storage, blocks=True, kernel=kernel,
+                           profile=True, precompute=precompute)
+            namespace = {'__name__': 'test'}
+            exec(code, namespace)
+            model = namespace['Test']()
+            if precompute:
+                assert model.PRECOMPUTED == [
+                    '(1 - self.alpha[period]) * self.G[period]']
+                assert '(1 - ' not in code[code.index('_C_s = _C_d'):
+                                           code.index('def precompute')]
+            else:
+                assert model.PRECOMPUTED == []
+            model.initialise(span=PeriodIndex(start='2000', end='2010'))
+            model.G.ix[:] = 10
+            model.alpha.ix[:] = 0.25
+            model.solve(start='2002')
+            assert model.precomputed is None
+            # Solving a period directly uses the current exogenous variables
+            model.alpha.ix[:] = 0.5
+            model.solve_period(model.get_position('2005'))
+            assert model.precomputed is None
+            results.append(model.get_results())
+        assert np.allclose(results[0].values, results[1].values)
+        assert np.allclose(model.Y.ix['2002':'2004'], 35)
+        assert np.allclose(model.Y.ix['2005'], 30)
+        # Only calculated over the span to precompute
+        model.precompute(2, 10)
+        assert np.isnan(model.precomputed[0, :2]).all()
+        assert np.allclose(model.precomputed[0, 2:], 5)
+
+
+def test_build_precompute_failure():
+    # Precomputed values are discarded even if the solution fails
+    exogenous = script.replace('C = 0.5 * Y', 'C = 0.5 * Y + (1 - alpha) * G')
+    b = FSIC.tools.build.Build()
+    b.read_string(exogenous)
+    namespace = {'__name__': 'test'}
+    exec(b.build(storage='array', precompute=True), namespace)
+    model = namespace['Test']()
+    model.initialise(span=PeriodIndex(start='2000', end='2010'))
+    model.G.ix[:] = 10
+    model.G.ix['2005'] = np.nan
+    model.alpha.ix[:] = 0.25
+    try:
+        model.solve(on_failure='raise')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('SolutionError not raised')
+    assert model.precomputed is None
+    model.alpha.ix[:] = 0.5
+    model.solve_period(model.get_position('2006'))
+    assert np.allclose(model.Y.ix['2006'], 30)
+
+
+def test_build_static():
+    lagged = script.replace('C = 0.5 * Y', 'C = 0.5 * Y + 0.25 * Y[-1]')
+    for storage in ['series', 'array', 'batch']:
+        b = FSIC.tools.build.Build()
+        b.read_string(lagged)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage=storage, static=True), namespace)
+        results = []
+        for vectorised in [True, False]:
+            model = namespace['Test']()
+            assert len(model.STATIC) == 2
+            if not vectorised:
+                # Solve period by period instead
+                model.STATIC = []
+            model.initialise(span=PeriodIndex(start='2000', end='2010'),
+                             past=PeriodIndex(start='1999', end='1999'))
+            model.G.ix[:] = 10
+            model.Y.ix[:] = 20
+            model.solve(mode='static')
+            results.append(model.get_results())
+            assert model.frozen is None
+            # Y = 0.5 Y + 0.25 * 20 + 10 in every period
+            assert np.allclose(model.Y.ix['2000':], 30)
+            assert np.all(np.asarray(model.iter.ix['2000':]) > 0)
+        assert np.allclose(results[0].values, results[1].values)
+
+
+@raises(ValueError)
+def test_build_static_error():
+    b = FSIC.tools.build.Build()
+    b.read_string(script.replace('C = 0.5 * Y', 'C = round(0.5 * Y)'))
+    b.build(static=True)
+
+
+def test_build_functions():
+    # `max()` gives the same results on scalars and arrays
+    floor = script.replace('C = 0.5 * Y', 'C = max(0.5 * Y, 2 * G[-1])')
+    for storage, kernel, static in [
+            ('series', False, False), ('array', True, False),
+            ('batch', False, False), ('batch', True, False),
+            ('batch', False, True)]:
+        b = FSIC.tools.build.Build()
+        b.read_string(floor)
+        namespace = {'__name__': 'test'}
+        exec(b.build(storage=storage, kernel=kernel, static=static),
+             namespace)
+        model = namespace['Test']()
+        if storage == 'batch':
+            model.initialise(span=PeriodIndex(start='2000', end='2010'),
+                             scenarios=['low', 'high'])
+        else:
+            model.initialise(span=PeriodIndex(start='2000', end='2010'))
+        model.update_data(DataFrame({'G': 10.0}, index=model.full_span))
+        if storage == 'batch':
+            model.update_data(
+                DataFrame({'G': 20.0}, index=model.full_span[:5]),
+                scenario='high')
+        model.update_data(
+            DataFrame({'G': 40.0}, index=model.full_span[5:]))
+        model.solve(start='2001', mode='static' if static else 'dynamic')
+        expected = [30, 30, 30, 30, 80, 120, 120, 120, 120, 120]
+        if storage == 'batch':
+            assert np.allclose(model.Y['low'].ix[1:], expected)
+            assert np.allclose(model.Y['high'].ix[1:5], 60)
+            assert np.allclose(model.Y['high'].ix[5:], expected[4:])
+        else:
+            assert np.allclose(model.Y.ix[1:], expected)
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark
+=========
+Script to compare the solution options of FSIC models on the bundled examples,
+reporting, for each model and set of options, the total number of iterations
+over the solution span (for the stacked method, which solves the whole span at
+once, the number of iterations of that one solution), the number of periods
+that failed to converge and the time taken.
+
+Usage (from this folder):
+    python benchmark.py
+
+"""
+
+
+import os
+import time
+
+from pandas import PeriodIndex
+
+from FSIC.tools.build import Build
+
+
+examples_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Clock to time each solution: `time.perf_counter()` is only available from
+# Python 3.3
+clock = getattr(time, 'perf_counter', time.time)
+
+# Models to solve: Markdown file, and exogenous variables/parameters
+models = {
+    'SIM': (
+        os.path.join(examples_dir, 'gl2007', '3_SIM.md'),
+        {'G_d': 20, 'W': 1, 'theta': 0.2, 'alpha_1': 0.6, 'alpha_2': 0.4}),
+    'AMI': (
+        os.path.join(examples_dir, 'almon', 'AMI.md'),
+        {'G': 400, 'R': 100, 'X': 600}),
+    }
+
+# Solution options to compare, as keyword arguments to `Model.solve()`
+schemes = [
+    ('Gauss-Seidel', {}),
+    ('Under-relaxed (0.8)', {'relax': 0.8}),
+    ('Over-relaxed (1.2)', {'relax': 1.2}),
+    ('Adaptive (1.2)', {'relax': 1.2, 'adaptive': True}),
+    ('Warm start (previous)', {'warm_start': 'previous'}),
+    ('Warm start (extrap.)', {'warm_start': 'extrapolate'}),
+    ('Aitken', {'aitken': True}),
+    ('Anderson', {'method': 'anderson'}),
+    ('Newton', {'method': 'newton'}),
+    ('Broyden', {'method': 'broyden'}),
+    ('Broyden, warm start', {'method': 'broyden',
+                             'warm_start': 'extrapolate'}),
+    ('Worklist', {'method': 'worklist'}),
+    ('Stacked', {'method': 'stacked'}),
+    ]
+
+
+def build(path):
+    """Build the model defined in `path` and return the model class.
+
+    The model is built with one method per equation, for the 'worklist'
+    method, which leaves the other methods unaffected.
+
+    """
+    b = Build()
+    b.read_file(path)
+    name = b.get_descriptors(b.parse_chunks(classes='ini', language='ini'))
+    namespace = {'__name__': 'benchmark'}
+    exec(b.build(worklist=True), namespace)
+    return namespace[name['name']]
+
+
+def run(model_class, parameters, repeat=5, **kwargs):
+    """Solve `model_class` `repeat` times and return the solution statistics.
+
+    Returns
+    =======
+    iterations : integer
+        Total number of iterations over the solution span or, with
+        `method='stacked'`, the number of iterations of the single solution
+        of the whole span (which the model stores in every period)
+    failures : integer
+        Number of periods that failed to converge
+    seconds : float
+        Shortest time taken to solve, in seconds
+
+    """
+    seconds = None
+    for i in range(repeat):
+        model = model_class()
+        model.initialise(span=PeriodIndex(start='1945', end='2010'),
+                         past=PeriodIndex(start='1943', end='1944'))
+        for name, value in parameters.items():
+            getattr(model, name).iloc[:] = value
+        start = clock()
+        model.solve(max_iter=250, **kwargs)
+        elapsed = clock() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+    solved = model.iter.iloc[model.get_position(min(model.span)):]
+    if kwargs.get('method') == 'stacked':
+        iterations = solved.fillna(0).max()
+    else:
+        iterations = solved.sum()
+    return (int(iterations), int(solved.isnull().sum()), seconds)
+
+
+if __name__ == '__main__':
+    print('%-6s %-22s %10s %9s %10s' % (
+        'Model', 'Scheme', 'Iterations', 'Failures', 'Time (s)'))
+    for name, (path, parameters) in sorted(models.items()):
+        model_class = build(path)
+        for label, kwargs in schemes:
+            iterations, failures, seconds = run(
+                model_class, parameters, **kwargs)
+            print('%-6s %-22s %10d %9d %10.4f' % (
+                name, label, iterations, failures, seconds))
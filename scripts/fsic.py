@@ -38,6 +38,58 @@ parser_build.add_argument(
     type=str,
     required=False,
     help='set model name (exclude file extension)')
+parser_build.add_argument(
+    '--storage',
+    choices=['series', 'array', 'batch'],
+    default='series',
+    help='set how to store the model variables: one Series per variable '
+         '(default), a single array with one row per variable or, to solve '
+         'multiple scenarios at once, an array with an additional scenario '
+         'axis')
+parser_build.add_argument(
+    '--blocks',
+    action='store_true',
+    help='partition the model into blocks, to only iterate over the '
+         'simultaneous parts of the model')
+parser_build.add_argument(
+    '--kernel',
+    action='store_true',
+    help='solve the model equations on local variables in a generated '
+         'kernel function (requires array or batch storage)')
+parser_build.add_argument(
+    '--profile',
+    action='store_true',
+    help='instrument the model equations with profiling counters')
+parser_build.add_argument(
+    '--linear',
+    action='store_true',
+    help='solve linear simultaneous blocks directly, rather than iteratively '
+         '(requires --blocks)')
+parser_build.add_argument(
+    '--jacobian',
+    action='store_true',
+    help='generate code to evaluate the Jacobian of the model equations '
+         'analytically (requires series or array storage)')
+parser_build.add_argument(
+    '--worklist',
+    action='store_true',
+    help='generate code to solve the model equations one at a time, for '
+         'dependency-driven iteration')
+parser_build.add_argument(
+    '--epilogue',
+    action='store_true',
+    help='solve the equations that feed nothing back into the rest of the '
+         'model once, over the whole span, after the rest of the model')
+parser_build.add_argument(
+    '--precompute',
+    action='store_true',
+    help='calculate the subexpressions of the equations that only refer to '
+         'exogenous variables once, over the whole span, before solving')
+parser_build.add_argument(
+    '--static',
+    action='store_true',
+    help='generate code to solve the model over the whole span at once, with '
+         'lags fixed at their data values, for static simulation')
 parser_build.add_argument(
     'files',
     nargs='+',
@@ -53,7 +105,12 @@ if __name__ == '__main__':
         from FSIC.tools.build import Build
         b = Build()
         b.read_files(list(args.files))
-        script = b.build()
+        script = b.build(
+            storage=args.storage, blocks=args.blocks, kernel=args.kernel,
+            profile=args.profile, linear=args.linear,
+            jacobian=args.jacobian, worklist=args.worklist,
+            epilogue=args.epilogue, precompute=args.precompute,
+            static=args.static)
         if args.output is None:
             print(script)
         else: